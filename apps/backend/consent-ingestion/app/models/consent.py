@@ -13,6 +13,8 @@ class Consent(Base):
     status = Column(String, nullable=False)  # active, revoked, expired
     confidence_score = Column(Numeric(3, 2))
     created_at = Column(DateTime, server_default=func.now())
+    # Bumped on every change; researcher-service tails it to replicate revocations
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
 
 class ConsentVersion(Base):
     __tablename__ = "consent_versions"
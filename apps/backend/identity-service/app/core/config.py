@@ -39,6 +39,35 @@ class Settings(BaseSettings):
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30, ge=1)
     
+    # Password hashing
+    password_hash_rounds: int = Field(
+        default=29000,
+        ge=1000,
+        description="pbkdf2_sha256 rounds; raising it re-hashes passwords on next login"
+    )
+    password_hash_workers: int = Field(
+        default=2,
+        ge=1,
+        description="Processes used for password hashing and verification"
+    )
+    password_hash_max_pending: int = Field(
+        default=64,
+        ge=1,
+        description="Hash/verify operations in flight before further callers wait"
+    )
+    
+    # Audit outbox
+    audit_flush_interval_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="How often queued audit entries are moved from audit_outbox to audit_logs"
+    )
+    audit_flush_batch_size: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum audit entries moved per flush transaction"
+    )
+    
     # CORS
     cors_origins: str = Field(
         default="http://localhost:3000,http://localhost:5173",
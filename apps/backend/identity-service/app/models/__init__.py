@@ -6,6 +6,7 @@ from app.models.organization import Organization, OrgType
 from app.models.patient import Patient
 from app.models.patient_record import PatientRecord
 from app.models.audit_log import AuditLog
+from app.models.audit_outbox import AuditOutbox
 
 __all__ = [
     "User",
@@ -15,4 +16,5 @@ __all__ = [
     "Patient",
     "PatientRecord",
     "AuditLog",
+    "AuditOutbox",
 ]
@@ -4,7 +4,7 @@ Audit log model for tracking all create operations.
 import uuid
 from typing import Optional, Any
 from datetime import datetime
-from sqlalchemy import String, DateTime, JSON, func
+from sqlalchemy import String, Text, DateTime, JSON, Computed, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
@@ -24,10 +24,24 @@ class AuditLog(Base):
         resource_id: UUID of the created/modified resource
         timestamp: When the action occurred
         extra_data: Additional JSON metadata about the action
+        patient_id: Patient the action concerns (generated from extra_data,
+            or resource_id for patient resources)
+        consent_id: Consent the action was checked against (generated from extra_data)
+    
+    Indexes lead with the filter column and end with (timestamp, id), so a
+    filtered, newest-first keyset page is a single index range scan.
     """
     
     __tablename__ = "audit_logs"
     
+    __table_args__ = (
+        Index("ix_audit_logs_actor_ts", "actor_id", "timestamp", "id"),
+        Index("ix_audit_logs_resource_ts", "resource_type", "resource_id", "timestamp", "id"),
+        Index("ix_audit_logs_action_ts", "action", "timestamp", "id"),
+        Index("ix_audit_logs_patient_ts", "patient_id", "timestamp", "id"),
+        Index("ix_audit_logs_consent_ts", "consent_id", "timestamp", "id"),
+    )
+    
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
         default=uuid.uuid4,
@@ -36,25 +50,21 @@ class AuditLog(Base):
     
     actor_id: Mapped[Optional[uuid.UUID]] = mapped_column(
         nullable=True,
-        index=True,
         comment="User ID from X-User-Id header"
     )
     
     action: Mapped[str] = mapped_column(
         String(100),
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     resource_type: Mapped[str] = mapped_column(
         String(50),
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     resource_id: Mapped[Optional[uuid.UUID]] = mapped_column(
-        nullable=True,
-        index=True
+        nullable=True
     )
     
     timestamp: Mapped[datetime] = mapped_column(
@@ -70,5 +80,21 @@ class AuditLog(Base):
         comment="Additional metadata about the action"
     )
     
+    patient_id: Mapped[Optional[str]] = mapped_column(
+        Text,
+        Computed(
+            "COALESCE(extra_data ->> 'patient_id', "
+            "CASE WHEN resource_type = 'patient' THEN resource_id::text END)",
+            persisted=True
+        ),
+        comment="Generated from extra_data.patient_id (or resource_id for patients)"
+    )
+    
+    consent_id: Mapped[Optional[str]] = mapped_column(
+        Text,
+        Computed("extra_data ->> 'consent_id'", persisted=True),
+        comment="Generated from extra_data.consent_id"
+    )
+    
     def __repr__(self) -> str:
         return f"<AuditLog(id={self.id}, action={self.action}, resource={self.resource_type}/{self.resource_id})>"
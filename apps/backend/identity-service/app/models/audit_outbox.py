@@ -0,0 +1,77 @@
+"""
+Audit outbox model for staging audit log entries.
+"""
+import uuid
+from typing import Optional, Any
+from datetime import datetime
+from sqlalchemy import BigInteger, String, Text, DateTime, JSON, Identity, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class AuditOutbox(Base):
+    """
+    Transactional outbox for audit log entries.
+    
+    Request handlers insert here, in the same transaction as the change
+    being audited, so an entry is durable exactly when the change is.
+    The table has no secondary indexes, keeping that insert cheap; the
+    audit flusher moves entries into the indexed audit_logs table in
+    batches (see app.services.audit_service). An entry that cannot be
+    moved on its own is dead-lettered in place: failed_at is set and the
+    flusher skips it from then on.
+    
+    Attributes:
+        id: Monotonic sequence number, used to flush in insertion order
+        audit_id: ID the entry will have in audit_logs
+        actor_id: UUID of the user performing the action
+        action: Action name (e.g., "create_user", "create_patient")
+        resource_type: Type of resource (e.g., "user", "patient")
+        resource_id: UUID of the created/modified resource
+        timestamp: When the action occurred
+        extra_data: Additional JSON metadata about the action
+        failed_at: When the entry was dead-lettered (None while pending)
+        last_error: Why the entry could not be moved to audit_logs
+    """
+    
+    __tablename__ = "audit_outbox"
+    
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Identity(),
+        primary_key=True
+    )
+    
+    audit_id: Mapped[uuid.UUID] = mapped_column(
+        default=uuid.uuid4,
+        nullable=False
+    )
+    
+    actor_id: Mapped[Optional[uuid.UUID]] = mapped_column(nullable=True)
+    
+    action: Mapped[str] = mapped_column(String(100), nullable=False)
+    
+    resource_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    
+    resource_id: Mapped[Optional[uuid.UUID]] = mapped_column(nullable=True)
+    
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    extra_data: Mapped[Optional[dict[str, Any]]] = mapped_column(
+        JSON,
+        nullable=True
+    )
+    
+    failed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+    
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<AuditOutbox(id={self.id}, action={self.action}, resource={self.resource_type}/{self.resource_id})>"
@@ -0,0 +1,101 @@
+"""
+Audit log API endpoints.
+"""
+import uuid
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.schemas.audit_log import AuditLogRead, AuditLogPage
+from app.services import audit_service
+
+
+router = APIRouter(prefix="/audit-logs", tags=["audit-logs"])
+
+
+@router.get(
+    "",
+    response_model=AuditLogPage,
+    summary="Search audit logs",
+    description="List audit log entries newest first, filtered by actor, resource, action, patient and time range."
+)
+async def list_audit_logs(
+    actor_id: Optional[uuid.UUID] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[uuid.UUID] = None,
+    action: Optional[str] = None,
+    patient_id: Optional[uuid.UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+) -> AuditLogPage:
+    """
+    Search audit logs.
+    
+    - **since** / **until**: Time range (inclusive / exclusive)
+    - **cursor**: `next_cursor` from the previous page
+    
+    Entries reach this endpoint when the audit outbox is flushed, normally
+    within a second of the audited change.
+    """
+    entries, next_cursor = await audit_service.list_audit_logs(
+        db,
+        actor_id=actor_id,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        action=action,
+        patient_id=patient_id,
+        since=since,
+        until=until,
+        limit=limit,
+        cursor=cursor
+    )
+    return AuditLogPage(
+        items=[AuditLogRead.model_validate(e) for e in entries],
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/patients/{patient_id}",
+    response_model=AuditLogPage,
+    summary="Audit trail for a patient",
+    description="Everything that happened to a patient and their clinical data, newest first."
+)
+async def list_patient_audit_logs(
+    patient_id: uuid.UUID,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+) -> AuditLogPage:
+    entries, next_cursor = await audit_service.list_audit_logs(
+        db,
+        patient_id=patient_id,
+        since=since,
+        until=until,
+        limit=limit,
+        cursor=cursor
+    )
+    return AuditLogPage(
+        items=[AuditLogRead.model_validate(e) for e in entries],
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/{audit_id}",
+    response_model=AuditLogRead,
+    summary="Get audit log entry by ID",
+    description="Retrieve a single audit log entry."
+)
+async def get_audit_log(
+    audit_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+) -> AuditLogRead:
+    entry = await audit_service.get_audit_log(db, audit_id)
+    return AuditLogRead.model_validate(entry)
@@ -96,7 +96,12 @@ async def create_encounter_enforced(
         resource_type="encounter",
         resource_id=resource.id,
         actor_id=actor_id,
-        extra_data={"consent_id": str(consent_id), "purpose": purpose, "policy": app_log.policy_snapshot},
+        extra_data={
+            "patient_id": str(patient_id),
+            "consent_id": str(consent_id),
+            "purpose": purpose,
+            "policy": app_log.policy_snapshot,
+        },
     )
     await db.commit()
     return EncounterRead.model_validate(resource)
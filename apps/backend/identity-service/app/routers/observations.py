@@ -98,7 +98,12 @@ async def create_observation_enforced(
         resource_type="observation",
         resource_id=resource.id,
         actor_id=actor_id,
-        extra_data={"consent_id": str(consent_id), "purpose": purpose, "policy": app_log.policy_snapshot},
+        extra_data={
+            "patient_id": str(patient_id),
+            "consent_id": str(consent_id),
+            "purpose": purpose,
+            "policy": app_log.policy_snapshot,
+        },
     )
     await db.commit()
     return ObservationRead.model_validate(resource)
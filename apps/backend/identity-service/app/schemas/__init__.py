@@ -6,7 +6,7 @@ from app.schemas.user import UserCreate, UserUpdate, UserRead
 from app.schemas.organization import OrganizationCreate, OrganizationRead
 from app.schemas.patient import PatientCreate, PatientRead
 from app.schemas.patient_record import PatientRecordCreate, PatientRecordRead
-from app.schemas.audit_log import AuditLogRead
+from app.schemas.audit_log import AuditLogRead, AuditLogPage
 
 __all__ = [
     # Enums
@@ -28,4 +28,5 @@ __all__ = [
     "PatientRecordRead",
     # Audit Log
     "AuditLogRead",
+    "AuditLogPage",
 ]
@@ -48,3 +48,22 @@ class AuditLogRead(BaseModel):
         None,
         description="Additional metadata about the action"
     )
+    
+    patient_id: Optional[uuid.UUID] = Field(
+        None,
+        description="Patient the action concerns, if any"
+    )
+
+
+class AuditLogPage(BaseModel):
+    """Schema for a page of audit log entries, newest first."""
+    
+    items: list[AuditLogRead] = Field(
+        ...,
+        description="Audit log entries"
+    )
+    
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
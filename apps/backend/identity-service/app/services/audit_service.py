@@ -1,10 +1,33 @@
 """
 Audit service for logging system operations.
+
+Entries are written to the audit_outbox table inside the caller's
+transaction (no extra flush or index maintenance on the request path). A
+background flusher moves them into audit_logs in batches, so the audit_logs
+index updates happen once per batch instead of once per request. If a batch
+fails, its entries are moved one at a time and any entry that fails on its
+own is dead-lettered (failed_at set) instead of blocking the outbox.
 """
+import asyncio
+import base64
+import json
+import logging
 import uuid
-from typing import Optional, Any
+from datetime import datetime, timezone
+from typing import Optional, Any, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, literal, select, tuple_
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.database import AsyncSessionLocal
 from app.models.audit_log import AuditLog
+from app.models.audit_outbox import AuditOutbox
+
+
+logger = logging.getLogger(__name__)
+
+_flusher_task: Optional[asyncio.Task] = None
 
 
 async def log_action(
@@ -14,10 +37,14 @@ async def log_action(
     resource_id: Optional[uuid.UUID] = None,
     actor_id: Optional[uuid.UUID] = None,
     extra_data: Optional[dict[str, Any]] = None
-) -> AuditLog:
+) -> AuditOutbox:
     """
     Create an audit log entry.
     
+    The entry is staged in audit_outbox and inserted when the caller's
+    transaction is flushed/committed; it reaches audit_logs (with ID
+    `audit_id`) on the next outbox flush.
+    
     Args:
         db: Database session
         action: Action performed (e.g., "create_user")
@@ -27,9 +54,10 @@ async def log_action(
         extra_data: Additional metadata
         
     Returns:
-        Created audit log entry
+        Staged outbox entry
     """
-    audit_log = AuditLog(
+    entry = AuditOutbox(
+        audit_id=uuid.uuid4(),
         actor_id=actor_id,
         action=action,
         resource_type=resource_type,
@@ -37,7 +65,232 @@ async def log_action(
         extra_data=extra_data
     )
     
-    db.add(audit_log)
-    await db.flush()
+    db.add(entry)
+    
+    return entry
+
+
+def _encode_cursor(entry: AuditLog) -> str:
+    payload = json.dumps([entry.timestamp.isoformat(), str(entry.id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        timestamp, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), uuid.UUID(entry_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def get_audit_log(db: AsyncSession, audit_id: uuid.UUID) -> AuditLog:
+    """
+    Get an audit log entry by ID.
+    
+    Args:
+        db: Database session
+        audit_id: Audit log entry UUID
+        
+    Returns:
+        AuditLog object
+        
+    Raises:
+        HTTPException: If the entry is not found (or still in the outbox)
+    """
+    entry = await db.get(AuditLog, audit_id)
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Audit log entry {audit_id} not found"
+        )
+    return entry
+
+
+async def list_audit_logs(
+    db: AsyncSession,
+    actor_id: Optional[uuid.UUID] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[uuid.UUID] = None,
+    action: Optional[str] = None,
+    patient_id: Optional[uuid.UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[list[AuditLog], Optional[str]]:
+    """
+    List audit log entries, newest first, with keyset pagination.
+    
+    Each filter maps onto a (column, timestamp, id) index, so a page is an
+    index range scan however deep it is.
     
-    return audit_log
+    Args:
+        db: Database session
+        actor_id: Only actions by this user
+        resource_type: Only this resource type
+        resource_id: Only this resource
+        action: Only this action
+        patient_id: Only actions concerning this patient
+        since: Only entries at or after this time
+        until: Only entries before this time
+        limit: Maximum number of entries to return
+        cursor: next_cursor from the previous page
+        
+    Returns:
+        Tuple of (entries, next_cursor); next_cursor is None on the last page
+        
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    query = select(AuditLog)
+    if actor_id is not None:
+        query = query.where(AuditLog.actor_id == actor_id)
+    if resource_type is not None:
+        query = query.where(AuditLog.resource_type == resource_type)
+    if resource_id is not None:
+        query = query.where(AuditLog.resource_id == resource_id)
+    if action is not None:
+        query = query.where(AuditLog.action == action)
+    if patient_id is not None:
+        query = query.where(AuditLog.patient_id == str(patient_id))
+    if since is not None:
+        query = query.where(AuditLog.timestamp >= since)
+    if until is not None:
+        query = query.where(AuditLog.timestamp < until)
+    if cursor:
+        after_timestamp, after_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(
+                literal(after_timestamp, AuditLog.timestamp.type),
+                literal(after_id, AuditLog.id.type)
+            )
+        )
+    
+    result = await db.execute(
+        query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1)
+    )
+    entries = list(result.scalars().all())
+    
+    next_cursor = _encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def _audit_row(entry: AuditOutbox) -> dict:
+    return {
+        "id": entry.audit_id,
+        "actor_id": entry.actor_id,
+        "action": entry.action,
+        "resource_type": entry.resource_type,
+        "resource_id": entry.resource_id,
+        "timestamp": entry.timestamp,
+        "extra_data": entry.extra_data,
+    }
+
+
+def _is_row_error(error: Exception) -> bool:
+    """Whether a failed insert is caused by the row itself, not the connection."""
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return False
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return False
+    return isinstance(error, StatementError)
+
+
+async def flush_outbox(batch_size: Optional[int] = None) -> int:
+    """
+    Move one batch of entries from audit_outbox to audit_logs.
+    
+    Runs in a single transaction. Rows are locked with SKIP LOCKED, so
+    several service instances can flush concurrently without moving an
+    entry twice. If the batch insert fails, entries are inserted one at a
+    time (each in a savepoint); entries rejected on their own are
+    dead-lettered, the rest are moved. Connection errors abort the flush
+    and leave the batch for the next attempt.
+    
+    Args:
+        batch_size: Maximum entries to process (defaults to settings)
+        
+    Returns:
+        Number of entries processed (moved or dead-lettered)
+    """
+    batch_size = batch_size or settings.audit_flush_batch_size
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            result = await db.execute(
+                select(AuditOutbox)
+                .where(AuditOutbox.failed_at.is_(None))
+                .order_by(AuditOutbox.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            entries = result.scalars().all()
+            if not entries:
+                return 0
+            
+            moved = list(entries)
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(AuditLog), [_audit_row(entry) for entry in entries])
+            except Exception as e:
+                if not _is_row_error(e):
+                    raise
+                logger.warning(f"Audit outbox batch of {len(entries)} failed, moving entries one at a time: {e}")
+                moved = []
+                for entry in entries:
+                    try:
+                        async with db.begin_nested():
+                            await db.execute(insert(AuditLog), [_audit_row(entry)])
+                    except Exception as row_error:
+                        if not _is_row_error(row_error):
+                            raise
+                        entry.failed_at = datetime.now(timezone.utc)
+                        entry.last_error = str(row_error)
+                        logger.error(f"Dead-lettered audit outbox entry {entry.id}: {row_error}")
+                    else:
+                        moved.append(entry)
+            
+            if moved:
+                await db.execute(
+                    delete(AuditOutbox).where(AuditOutbox.id.in_([entry.id for entry in moved]))
+                )
+    return len(entries)
+
+
+async def _flush_loop() -> None:
+    while True:
+        try:
+            # Drain full batches back to back, then wait for more entries
+            while await flush_outbox() == settings.audit_flush_batch_size:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Audit outbox flush failed")
+        await asyncio.sleep(settings.audit_flush_interval_seconds)
+
+
+def start_outbox_flusher() -> None:
+    """Start the background audit outbox flusher (called on application startup)."""
+    global _flusher_task
+    if _flusher_task is None or _flusher_task.done():
+        _flusher_task = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def stop_outbox_flusher() -> None:
+    """Stop the flusher and move whatever is left in the outbox (called on shutdown)."""
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+    try:
+        while await flush_outbox():
+            pass
+    except Exception:
+        logger.exception("Final audit outbox flush failed")
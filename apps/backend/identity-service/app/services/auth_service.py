@@ -1,8 +1,13 @@
 """
 Authentication service handling user registration, login, and token generation.
+
+Password hashing is CPU-bound (tens of milliseconds per hash), so the async
+code paths run it in a bounded process pool instead of on the event loop.
 """
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
@@ -15,8 +20,45 @@ from app.core.config import settings
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, Token
 
-# Password hashing context - utilizing pbkdf2_sha256 for better compatibility
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Password hashing context - utilizing pbkdf2_sha256 for better compatibility.
+# min_rounds = default_rounds marks hashes made with fewer rounds as needing
+# an update, so raising PASSWORD_HASH_ROUNDS upgrades hashes on next login.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.password_hash_rounds,
+    pbkdf2_sha256__min_rounds=settings.password_hash_rounds,
+)
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+async def _run_hashing(fn, *args):
+    """Run a hashing function in the process pool, bounding queued work."""
+    global _hash_pool, _hash_slots
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        _hash_slots = asyncio.Semaphore(settings.password_hash_max_pending)
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+
+def shutdown_hash_pool() -> None:
+    """Stop the password hashing workers (called on application shutdown)."""
+    global _hash_pool, _hash_slots
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+        _hash_slots = None
 
 
 class AuthService:
@@ -32,6 +74,25 @@ class AuthService:
         """Verify a password against a hash."""
         return pwd_context.verify(plain_password, hashed_password)
 
+    @staticmethod
+    async def hash_password(password: str) -> str:
+        """Hash a password in the hashing process pool."""
+        return await _run_hashing(_hash_password, password)
+
+    @staticmethod
+    async def verify_and_update_password(
+        plain_password: str,
+        hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password in the hashing process pool.
+        
+        Returns:
+            Tuple[bool, Optional[str]]: Whether it matched, and a replacement
+            hash if the stored one uses outdated parameters
+        """
+        return await _run_hashing(_verify_and_update, plain_password, hashed_password)
+
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> Token:
         """Create a JWT access token."""
@@ -72,7 +133,7 @@ class AuthService:
             )
             
         # Create new user
-        hashed_password = AuthService.get_password_hash(user_create.password)
+        hashed_password = await AuthService.hash_password(user_create.password)
         
         db_user = User(
             email=user_create.email,
@@ -114,7 +175,13 @@ class AuthService:
         if not user:
             return None
             
-        if not AuthService.verify_password(password, user.password_hash):
+        verified, new_hash = await AuthService.verify_and_update_password(password, user.password_hash)
+        if not verified:
             return None
+        
+        # Transparently upgrade hashes made with older cost parameters
+        if new_hash:
+            user.password_hash = new_hash
+            await db.flush()
             
         return user
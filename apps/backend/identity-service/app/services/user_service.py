@@ -34,7 +34,7 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         )
     
     # Hash password using AuthService
-    password_hash = AuthService.get_password_hash(user_data.password)
+    password_hash = await AuthService.hash_password(user_data.password)
     
     # Create user
     user = User(
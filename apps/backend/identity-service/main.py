@@ -9,6 +9,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.database import init_db
+from app.services.auth_service import shutdown_hash_pool
+from app.services.audit_service import start_outbox_flusher, stop_outbox_flusher
 from app.routers import (
     users,
     organizations,
@@ -18,6 +20,7 @@ from app.routers import (
     observations,
     diagnoses,
     medications,
+    audit_logs,
 )
 
 
@@ -29,9 +32,12 @@ async def lifespan(app: FastAPI):
     """
     # Startup: Initialize database tables
     await init_db()
+    # Move audit entries from the outbox into audit_logs in the background
+    start_outbox_flusher()
     yield
-    # Shutdown: cleanup if needed
-    pass
+    # Shutdown: flush remaining audit entries, stop password hashing workers
+    await stop_outbox_flusher()
+    shutdown_hash_pool()
 
 
 # Create FastAPI application
@@ -66,6 +72,7 @@ app.include_router(encounters.router, prefix=settings.api_v1_prefix)
 app.include_router(observations.router, prefix=settings.api_v1_prefix)
 app.include_router(diagnoses.router, prefix=settings.api_v1_prefix)
 app.include_router(medications.router, prefix=settings.api_v1_prefix)
+app.include_router(audit_logs.router, prefix=settings.api_v1_prefix)
 
 
 @app.get("/health", tags=["health"])
@@ -1,7 +1,18 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from .routers import evaluate
+from .services.subject_index import subject_index
 
-app = FastAPI(title="MedIQ Policy Engine Service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Refresh the subject index in the background, not in request threads."""
+    subject_index.start()
+    yield
+    subject_index.stop()
+
+
+app = FastAPI(title="MedIQ Policy Engine Service", lifespan=lifespan)
 
 app.include_router(evaluate.router)
 
@@ -1,9 +1,26 @@
-from fastapi import APIRouter
-from ..schemas.request import PolicyRequest, PolicyDecision
+from fastapi import APIRouter, HTTPException
+from ..schemas.request import PolicyRequest, PolicyDecision, BatchPolicyRequest, BatchPolicyResponse
 from ..services import evaluator
+from ..services.subject_index import subject_index, SubjectIndexUnavailable
 
 router = APIRouter(prefix="/policy", tags=["evaluation"])
 
 @router.post("/evaluate", response_model=PolicyDecision)
-async def evaluate(request: PolicyRequest):
-    return evaluator.evaluate_policy(request)
+def evaluate(request: PolicyRequest):
+    try:
+        return evaluator.evaluate_policy(request)
+    except SubjectIndexUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Sync handler: large batches are CPU-bound and run in the threadpool
+# instead of blocking the event loop
+@router.post("/evaluate:batch", response_model=BatchPolicyResponse)
+def evaluate_batch(batch: BatchPolicyRequest):
+    try:
+        return BatchPolicyResponse(decisions=evaluator.evaluate_batch(batch.requests))
+    except SubjectIndexUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/cache-stats")
+def cache_stats():
+    return {**evaluator.cache_stats(), "subject_index": subject_index.stats()}
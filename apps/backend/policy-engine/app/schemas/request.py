@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
@@ -6,12 +6,30 @@ class PolicyRequest(BaseModel):
     requester_role: str
     purpose: str
     requested_fields: List[str]
-    consent: Dict[str, Any]  # The 'interpreted' object from intelligence service
-    confidence: float
+    # Either the 'interpreted' object from intelligence service with its
+    # confidence, or the subject_id of a consent the engine has on record
+    consent: Optional[Dict[str, Any]] = None
+    confidence: Optional[float] = None
+    subject_id: Optional[str] = None
     request_time: datetime = Field(default_factory=datetime.now)
 
+    @model_validator(mode="after")
+    def check_consent_source(self) -> "PolicyRequest":
+        if self.consent is not None:
+            if self.confidence is None:
+                raise ValueError("confidence is required with an inline consent")
+        elif self.subject_id is None:
+            raise ValueError("Provide either consent or subject_id")
+        return self
+
 class PolicyDecision(BaseModel):
     decision: str  # ALLOW, DENY, PARTIAL
     allowed_fields: List[str]
     denied_fields: List[str]
     reason: str
+
+class BatchPolicyRequest(BaseModel):
+    requests: List[PolicyRequest] = Field(..., max_length=10000)
+
+class BatchPolicyResponse(BaseModel):
+    decisions: List[PolicyDecision]
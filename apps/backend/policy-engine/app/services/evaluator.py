@@ -1,65 +1,137 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 from ..schemas.request import PolicyRequest, PolicyDecision
+from collections import OrderedDict
 from datetime import datetime
+import os
+import threading
 
-def evaluate_policy(request: PolicyRequest) -> PolicyDecision:
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.75"))
+CONSENT_CACHE_SIZE = int(os.getenv("CONSENT_CACHE_SIZE", "4096"))
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "65536"))
+
+# Marks an expiry string that could not be parsed
+INVALID_EXPIRY = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CompiledConsent:
+    """Interpreted consent with purposes, expiry and field sets prepared once."""
+
+    __slots__ = ("key", "purposes", "expiry", "allowed", "denied")
+
+    def __init__(self, key: Tuple, consent: Dict[str, Any]):
+        self.key = key
+        self.purposes = frozenset(p.lower() for p in consent.get("purpose", []))
+        self.allowed = frozenset(consent.get("allowed_data", []))
+        self.denied = frozenset(consent.get("denied_data", []))
+
+        expiry_str = consent.get("expiry")
+        self.expiry = None
+        if expiry_str:
+            try:
+                self.expiry = datetime.fromisoformat(expiry_str)
+            except ValueError:
+                self.expiry = INVALID_EXPIRY
+
+
+_consents = LRUCache(CONSENT_CACHE_SIZE)
+_decisions = LRUCache(DECISION_CACHE_SIZE)
+
+
+def consent_key(consent: Dict[str, Any]) -> Tuple:
+    # Content key over the fields the evaluator reads; cheaper to build and
+    # hash than a serialized digest of the whole document
+    return (
+        tuple(consent.get("purpose", [])),
+        consent.get("expiry"),
+        tuple(consent.get("allowed_data", [])),
+        tuple(consent.get("denied_data", [])),
+    )
+
+
+def compile_consent(consent: Dict[str, Any]) -> CompiledConsent:
+    key = consent_key(consent)
+    compiled = _consents.get(key)
+    if compiled is None:
+        compiled = CompiledConsent(key, consent)
+        _consents.set(key, compiled)
+    return compiled
+
+
+def _deny(requested_fields, reason: str) -> PolicyDecision:
+    return PolicyDecision(
+        decision="DENY",
+        allowed_fields=[],
+        denied_fields=list(requested_fields),
+        reason=reason
+    )
+
+
+def _decide(
+    compiled: CompiledConsent,
+    purpose: str,
+    requested_fields: List[str],
+    confident: bool
+) -> Tuple[PolicyDecision, bool]:
+    """Time-independent part of the decision; the flag says whether expiry still applies."""
     # 1. Confidence check
-    if request.confidence < 0.75:
-        return PolicyDecision(
-            decision="DENY",
-            allowed_fields=[],
-            denied_fields=request.requested_fields,
-            reason="Consent confidence too low for automated decision."
-        )
-
-    consent = request.consent
-    
-    # 2. Purpose binding
-    allowed_purposes = [p.lower() for p in consent.get("purpose", [])]
-    if request.purpose.lower() not in allowed_purposes:
-        return PolicyDecision(
-            decision="DENY",
-            allowed_fields=[],
-            denied_fields=request.requested_fields,
-            reason=f"Purpose '{request.purpose}' not authorized by patient."
-        )
-
-    # 3. Expiry check
-    expiry_str = consent.get("expiry")
-    if expiry_str:
-        try:
-            expiry_date = datetime.fromisoformat(expiry_str)
-            if request.request_time > expiry_date:
-                return PolicyDecision(
-                    decision="DENY",
-                    allowed_fields=[],
-                    denied_fields=request.requested_fields,
-                    reason="Consent has expired."
-                )
-        except ValueError:
-            # If date format is weird, fallback to deny for safety
-            return PolicyDecision(
-                decision="DENY",
-                allowed_fields=[],
-                denied_fields=request.requested_fields,
-                reason="Invalid consent expiry format."
-            )
+    if not confident:
+        return _deny(requested_fields, "Consent confidence too low for automated decision."), False
 
-    # 4. Field-level enforcement
-    requested = set(request.requested_fields)
-    consent_allowed = set(consent.get("allowed_data", []))
-    consent_denied = set(consent.get("denied_data", []))
+    # 2. Purpose binding
+    if purpose.lower() not in compiled.purposes:
+        return _deny(requested_fields, f"Purpose '{purpose}' not authorized by patient."), False
 
-    final_allowed = requested & consent_allowed
-    final_denied = (requested & consent_denied) | (requested - consent_allowed)
+    # 4. Field-level enforcement (3. expiry is checked per request)
+    requested = set(requested_fields)
+    final_allowed = requested & compiled.allowed
+    final_denied = (requested & compiled.denied) | (requested - compiled.allowed)
 
     if not final_allowed:
-        return PolicyDecision(
-            decision="DENY",
-            allowed_fields=[],
-            denied_fields=list(requested),
-            reason="No requested fields are authorized."
-        )
+        return _deny(requested, "No requested fields are authorized."), True
 
     if final_denied:
         return PolicyDecision(
@@ -67,11 +139,72 @@ def evaluate_policy(request: PolicyRequest) -> PolicyDecision:
             allowed_fields=list(final_allowed),
             denied_fields=list(final_denied),
             reason="Some requested fields were restricted by consent."
-        )
+        ), True
 
     return PolicyDecision(
         decision="ALLOW",
         allowed_fields=list(final_allowed),
         denied_fields=[],
         reason="Access granted based on valid consent."
+    ), True
+
+
+def evaluate_compiled(
+    compiled: CompiledConsent,
+    purpose: str,
+    requested_fields: List[str],
+    confidence: float,
+    request_time: datetime
+) -> PolicyDecision:
+    confident = confidence >= CONFIDENCE_THRESHOLD
+    # Compiled consents are interned by content key, so the object itself
+    # stands in for the consent (identity hash, no re-hashing of contents)
+    key = (compiled, purpose, tuple(requested_fields), confident)
+    cached = _decisions.get(key)
+    if cached is None:
+        cached = _decide(compiled, purpose, requested_fields, confident)
+        _decisions.set(key, cached)
+    decision, check_expiry = cached
+
+    # 3. Expiry check (depends on request time, so never cached)
+    if check_expiry and compiled.expiry is not None:
+        if compiled.expiry is INVALID_EXPIRY:
+            # If date format is weird, fallback to deny for safety
+            return _deny(requested_fields, "Invalid consent expiry format.")
+        if request_time > compiled.expiry:
+            return _deny(requested_fields, "Consent has expired.")
+
+    return decision
+
+
+def evaluate_policy(request: PolicyRequest) -> PolicyDecision:
+    if request.consent is not None:
+        compiled, confidence = compile_consent(request.consent), request.confidence
+    else:
+        from .subject_index import subject_index
+
+        entry = subject_index.get(request.subject_id)
+        if entry is None:
+            return _deny(request.requested_fields, "No active consent on record for subject.")
+        compiled, confidence = entry
+
+    return evaluate_compiled(
+        compiled,
+        request.purpose,
+        request.requested_fields,
+        confidence,
+        request.request_time
     )
+
+
+def evaluate_batch(requests: List[PolicyRequest]) -> List[PolicyDecision]:
+    return [evaluate_policy(request) for request in requests]
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {"consents": _consents.stats(), "decisions": _decisions.stats()}
+
+
+def clear_caches() -> None:
+    _consents.clear()
+    _decisions.clear()
@@ -0,0 +1,313 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from datetime import datetime
+from sqlalchemy import JSON, DateTime, String, cast, column, or_, select, table, tuple_
+import logging
+import os
+import threading
+import time
+
+from .evaluator import CompiledConsent, compile_consent
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = float(os.getenv("SUBJECT_INDEX_REFRESH_SECONDS", "5"))
+# Incremental refreshes follow new versions and consent status changes; the
+# periodic full reload only catches rows deleted from the consent store
+FULL_RELOAD_SECONDS = float(os.getenv("CACHE_TTL", "300"))
+
+# consent-ingestion tables; read-only here
+_consents = table(
+    "consents",
+    column("id"),
+    column("patient_id"),
+    column("status"),
+    column("confidence_score"),
+    column("updated_at", DateTime),
+)
+_consent_versions = table(
+    "consent_versions",
+    column("id"),
+    column("consent_id"),
+    column("version_number"),
+    column("extracted_policy", JSON),
+    column("created_at", DateTime),
+)
+
+
+class SubjectIndexUnavailable(RuntimeError):
+    pass
+
+
+class _ConsentEntry(NamedTuple):
+    patient_id: str
+    # (version_number, created_at, version id): newer versions compare greater
+    version: Tuple[int, datetime, str]
+    compiled: CompiledConsent
+    confidence: float
+
+
+class SubjectIndex:
+    """
+    In-memory subject_id -> (compiled consent, confidence) from consent_versions.
+
+    Versions are tracked per consent, and an older version never replaces a
+    newer one of the same consent. A subject with several active consents is
+    served the one with the most recently created version, and drops out only once none of
+    them is active.
+
+    A full load reads only the latest interpreted version of each active
+    consent. Incremental refreshes follow two watermarks: (created_at, id)
+    of consent_versions for new versions, and (updated_at, id) of consents
+    for status changes such as revocations, which add no version. Once
+    start() is called, refreshes run on a background thread and lookups
+    never wait for the database.
+    """
+
+    def __init__(self):
+        self._consents: Dict[str, _ConsentEntry] = {}
+        self._subject_consents: Dict[str, Set[str]] = {}
+        self._entries: Dict[str, Tuple[CompiledConsent, float]] = {}
+        self._watermark: Optional[Tuple[datetime, str]] = None
+        self._status_watermark: Optional[Tuple[datetime, str]] = None
+        # Versions written before consent-intelligence filled in extracted_policy:
+        # version id -> (consent id, version)
+        self._pending: Dict[str, Tuple[str, Tuple[int, datetime, str]]] = {}
+        self._refreshed_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _versions():
+        v, c = _consent_versions.c, _consents.c
+        return select(
+            cast(v.id, String).label("id"),
+            cast(v.consent_id, String).label("consent_id"),
+            v.version_number,
+            v.extracted_policy,
+            v.created_at,
+            cast(c.patient_id, String).label("patient_id"),
+            c.status,
+            c.confidence_score,
+        ).select_from(_consent_versions.join(_consents, c.id == v.consent_id))
+
+    @staticmethod
+    def _interpreted():
+        return cast(_consent_versions.c.extracted_policy, String).notin_(("{}", "null"))
+
+    def _latest_versions(self, consent_ids: Optional[List[str]] = None):
+        """Latest interpreted version of each consent (all active ones, or the given ones)."""
+        v, c = _consent_versions.c, _consents.c
+        query = self._versions().where(self._interpreted())
+        if consent_ids is None:
+            query = query.where(c.status == "active")
+        else:
+            query = query.where(cast(v.consent_id, String).in_(consent_ids))
+        return query.distinct(v.consent_id).order_by(
+            v.consent_id, v.version_number.desc(), v.created_at.desc(), cast(v.id, String).desc()
+        )
+
+    def _new_versions(self):
+        v = _consent_versions.c
+        version_id = cast(v.id, String)
+        query = self._versions().order_by(v.created_at, version_id)
+        if self._watermark is None:
+            return query
+        newer = tuple_(v.created_at, version_id) > tuple_(*self._watermark)
+        return query.where(or_(newer, version_id.in_(list(self._pending))) if self._pending else newer)
+
+    @staticmethod
+    def _max_watermarks(db) -> Tuple[Optional[Tuple[datetime, str]], Optional[Tuple[datetime, str]]]:
+        v, c = _consent_versions.c, _consents.c
+        version = db.execute(
+            select(v.created_at, cast(v.id, String))
+            .order_by(v.created_at.desc(), cast(v.id, String).desc())
+            .limit(1)
+        ).first()
+        status = db.execute(
+            select(c.updated_at, cast(c.id, String))
+            .where(c.updated_at.is_not(None))
+            .order_by(c.updated_at.desc(), cast(c.id, String).desc())
+            .limit(1)
+        ).first()
+        return (tuple(version) if version else None), (tuple(status) if status else None)
+
+    def _status_changes(self, db) -> List[Tuple[datetime, str]]:
+        c = _consents.c
+        consent_id = cast(c.id, String)
+        query = select(c.updated_at, consent_id).where(c.updated_at.is_not(None))
+        if self._status_watermark is not None:
+            query = query.where(tuple_(c.updated_at, consent_id) > tuple_(*self._status_watermark))
+        return [tuple(row) for row in db.execute(query.order_by(c.updated_at, consent_id))]
+
+    @staticmethod
+    def _subject_entries(
+        consents: Dict[str, _ConsentEntry],
+        subject_consents: Dict[str, Set[str]],
+        subject_ids: Iterable[str],
+    ) -> Dict[str, Tuple[CompiledConsent, float]]:
+        entries = {}
+        for subject_id in subject_ids:
+            active = [consents[consent_id] for consent_id in subject_consents.get(subject_id, ())]
+            if active:
+                # Across consents, the most recently created version wins
+                newest = max(active, key=lambda entry: entry.version[1:])
+                entries[subject_id] = (newest.compiled, newest.confidence)
+        return entries
+
+    def _load(self, full: bool) -> None:
+        from ..db.session import SessionLocal
+
+        consents = {} if full else dict(self._consents)
+        subject_consents = {} if full else {k: set(v) for k, v in self._subject_consents.items()}
+        pending = {} if full else dict(self._pending)
+        watermark = None if full else self._watermark
+        status_watermark = None if full else self._status_watermark
+        touched: Set[str] = set()
+
+        db = SessionLocal()
+        try:
+            if full:
+                # Watermarks first: rows written while loading are re-read incrementally
+                watermark, status_watermark = self._max_watermarks(db)
+                rows = db.execute(self._latest_versions()).mappings().all()
+                rows += db.execute(
+                    self._versions().where(~self._interpreted(), _consents.c.status == "active")
+                ).mappings().all()
+            else:
+                changes = self._status_changes(db)
+                rows = db.execute(self._new_versions()).mappings().all()
+                for row in rows:
+                    if watermark is None or (row["created_at"], row["id"]) > watermark:
+                        watermark = (row["created_at"], row["id"])
+                if changes:
+                    status_watermark = changes[-1]
+                    # Re-read the consents whose status (or confidence) changed
+                    rows += db.execute(
+                        self._latest_versions([consent_id for _, consent_id in changes])
+                    ).mappings().all()
+        finally:
+            db.close()
+
+        for row in rows:
+            pending.pop(row["id"], None)
+            consent_id = row["consent_id"]
+            current = consents.get(consent_id)
+            if current is not None:
+                touched.add(current.patient_id)
+            if row["status"] != "active":
+                # status belongs to the consent, not the version
+                if current is not None:
+                    del consents[consent_id]
+                    subject_consents[current.patient_id].discard(consent_id)
+                continue
+            version = (row["version_number"] or 0, row["created_at"], row["id"])
+            if not row["extracted_policy"]:
+                pending[row["id"]] = (consent_id, version)
+                continue
+            if current is not None and current.version > version:
+                # A pending older version filled in after a newer one applied
+                continue
+            if current is not None:
+                subject_consents[current.patient_id].discard(consent_id)
+            confidence = float(row["confidence_score"]) if row["confidence_score"] is not None else 0.0
+            consents[consent_id] = _ConsentEntry(
+                row["patient_id"], version, compile_consent(row["extracted_policy"]), confidence
+            )
+            subject_consents.setdefault(row["patient_id"], set()).add(consent_id)
+            touched.add(row["patient_id"])
+
+        # Pending versions older than the applied one can no longer take effect
+        pending = {
+            version_id: (consent_id, version)
+            for version_id, (consent_id, version) in pending.items()
+            if consent_id not in consents or consents[consent_id].version < version
+        }
+        for subject_id in touched:
+            if not subject_consents.get(subject_id):
+                subject_consents.pop(subject_id, None)
+        if full:
+            entries = self._subject_entries(consents, subject_consents, subject_consents)
+        else:
+            entries = dict(self._entries)
+            for subject_id in touched:
+                entries.pop(subject_id, None)
+            entries.update(self._subject_entries(consents, subject_consents, touched))
+
+        # Swap in the new snapshot; readers never see a partial update
+        self._consents = consents
+        self._subject_consents = subject_consents
+        self._entries = entries
+        self._pending = pending
+        self._watermark = watermark
+        self._status_watermark = status_watermark
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < REFRESH_SECONDS:
+            return
+        # One refresher at a time; other callers keep using the current snapshot
+        # unless nothing has been loaded yet
+        if not self._lock.acquire(blocking=not self._loaded_at):
+            return
+        try:
+            if not force and time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+                return
+            full = not self._loaded_at or now - self._loaded_at >= FULL_RELOAD_SECONDS
+            try:
+                self._load(full)
+            except Exception as e:
+                logger.error(f"Failed to refresh subject index: {e}")
+                if not self._loaded_at:
+                    raise SubjectIndexUnavailable("Consent store unavailable") from e
+                # Keep serving the last snapshot; retry after the next interval
+                self._refreshed_at = time.monotonic()
+                return
+            self._refreshed_at = time.monotonic()
+            if full:
+                self._loaded_at = self._refreshed_at
+        finally:
+            self._lock.release()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh(force=True)
+            except SubjectIndexUnavailable:
+                pass
+            if self._stop.wait(REFRESH_SECONDS):
+                return
+
+    def start(self) -> None:
+        """Refresh on a background thread instead of in request threads."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="subject-index-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get(self, subject_id: str) -> Optional[Tuple[CompiledConsent, float]]:
+        # Without the background thread (scripts), refresh inline; with it,
+        # only the very first lookup waits for the initial load
+        if not self._loaded_at or not (self._thread and self._thread.is_alive()):
+            self.refresh()
+        return self._entries.get(subject_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subjects": len(self._entries),
+            "consents": len(self._consents),
+            "pending_versions": len(self._pending),
+            "watermark": self._watermark[0].isoformat() if self._watermark else None,
+            "status_watermark": self._status_watermark[0].isoformat() if self._status_watermark else None,
+        }
+
+
+subject_index = SubjectIndex()
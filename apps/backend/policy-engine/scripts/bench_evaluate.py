@@ -0,0 +1,107 @@
+"""
+Policy evaluation throughput benchmark.
+
+Run from the policy-engine directory:
+
+    python -m scripts.bench_evaluate [--requests 20000] [--consents 200]
+
+Reports single-core requests/second for:
+- evaluate_policy with caches cleared before every call (no reuse)
+- evaluate_policy with warm consent/decision caches
+- POST /policy/evaluate, one HTTP request per decision
+- POST /policy/evaluate:batch, 1000 decisions per HTTP request
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.request import PolicyRequest
+from app.services import evaluator
+
+FIELDS = ["age", "gender", "diagnosis", "labs", "imaging", "vitals", "medications", "name", "address"]
+PURPOSES = ["research", "care", "public_health", "AI_training"]
+
+
+def make_consents(count: int, rng: random.Random):
+    consents = []
+    for _ in range(count):
+        allowed = rng.sample(FIELDS, rng.randint(2, 6))
+        consents.append({
+            "allowed_data": allowed,
+            "denied_data": [f for f in FIELDS if f not in allowed and rng.random() < 0.5],
+            "purpose": rng.sample(PURPOSES, rng.randint(1, 3)),
+            "expiry": "2030-01-01T00:00:00",
+            "conditions": [],
+            "ambiguity_flags": [],
+        })
+    return consents
+
+
+def make_payloads(count: int, consents, rng: random.Random):
+    return [
+        {
+            "requester_role": "researcher",
+            "purpose": rng.choice(PURPOSES),
+            "requested_fields": rng.sample(FIELDS, 3),
+            "consent": rng.choice(consents),
+            "confidence": rng.choice([0.6, 0.8, 0.9, 0.95]),
+            "request_time": datetime(2026, 1, 1).isoformat(),
+        }
+        for _ in range(count)
+    ]
+
+
+def rate(label: str, count: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42} {count / elapsed:>12,.0f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--consents", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = make_payloads(args.requests, make_consents(args.consents, rng), rng)
+    requests = [PolicyRequest(**p) for p in payloads]
+
+    def cold():
+        for request in requests:
+            evaluator.clear_caches()
+            evaluator.evaluate_policy(request)
+
+    def warm():
+        for request in requests:
+            evaluator.evaluate_policy(request)
+
+    rate("evaluate_policy (no cache reuse)", len(requests), cold)
+    evaluator.clear_caches()
+    warm()
+    rate("evaluate_policy (warm caches)", len(requests), warm)
+
+    client = TestClient(app)
+    http_count = min(len(payloads), 2000)
+
+    def single():
+        for payload in payloads[:http_count]:
+            client.post("/policy/evaluate", json=payload)
+
+    def batch():
+        for i in range(0, len(payloads), 1000):
+            client.post("/policy/evaluate:batch", json={"requests": payloads[i:i + 1000]})
+
+    rate("POST /policy/evaluate", http_count, single)
+    rate("POST /policy/evaluate:batch (1000/request)", len(payloads), batch)
+    print(evaluator.cache_stats())
+
+
+if __name__ == "__main__":
+    main()
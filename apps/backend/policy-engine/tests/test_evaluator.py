@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.request import PolicyRequest
+from app.services import evaluator
+
+
+CONSENT = {
+    "purpose": ["research"],
+    "allowed_data": ["age", "diagnosis"],
+    "denied_data": ["name"],
+    "expiry": "2026-01-01T00:00:00",
+}
+
+BEFORE_EXPIRY = datetime(2025, 6, 1)
+
+
+def setup_function():
+    evaluator.clear_caches()
+
+
+def _evaluate(purpose="research", fields=("age",), confidence=0.9, request_time=BEFORE_EXPIRY):
+    return evaluator.evaluate_policy(PolicyRequest(
+        requester_role="researcher",
+        purpose=purpose,
+        requested_fields=list(fields),
+        consent=dict(CONSENT),
+        confidence=confidence,
+        request_time=request_time,
+    ))
+
+
+def test_decision_cache_keys_on_purpose():
+    assert _evaluate(purpose="research").decision == "ALLOW"
+    assert _evaluate(purpose="marketing").decision == "DENY"
+    assert _evaluate(purpose="research").decision == "ALLOW"
+
+
+def test_decision_cache_keys_on_requested_fields():
+    assert _evaluate(fields=["age"]).decision == "ALLOW"
+    partial = _evaluate(fields=["age", "name"])
+    assert partial.decision == "PARTIAL"
+    assert partial.denied_fields == ["name"]
+    assert _evaluate(fields=["name"]).decision == "DENY"
+
+
+def test_decision_cache_keys_on_confidence():
+    assert _evaluate(confidence=0.9).decision == "ALLOW"
+    low = _evaluate(confidence=0.1)
+    assert low.decision == "DENY"
+    assert "confidence" in low.reason
+
+
+def test_expiry_is_checked_on_cache_hit():
+    assert _evaluate().decision == "ALLOW"
+    expired = _evaluate(request_time=datetime(2026, 6, 1))
+    assert expired.decision == "DENY"
+    assert expired.reason == "Consent has expired."
+    assert evaluator.cache_stats()["decisions"]["hits"] == 1
+
+
+def test_invalid_expiry_denies():
+    consent = {**CONSENT, "expiry": "next spring"}
+    decision = evaluator.evaluate_policy(PolicyRequest(
+        requester_role="researcher",
+        purpose="research",
+        requested_fields=["age"],
+        consent=consent,
+        confidence=0.9,
+    ))
+    assert decision.decision == "DENY"
+
+
+def test_batch_endpoint_returns_decisions_in_request_order():
+    client = TestClient(app)
+    request = {
+        "requester_role": "researcher",
+        "requested_fields": ["age"],
+        "consent": CONSENT,
+        "confidence": 0.9,
+        "request_time": BEFORE_EXPIRY.isoformat(),
+    }
+    response = client.post("/policy/evaluate:batch", json={"requests": [
+        {**request, "purpose": "research"},
+        {**request, "purpose": "marketing"},
+        {**request, "purpose": "research", "confidence": 0.1},
+        {**request, "purpose": "research", "request_time": "2026-06-01T00:00:00"},
+    ]})
+    assert response.status_code == 200
+    assert [d["decision"] for d in response.json()["decisions"]] == ["ALLOW", "DENY", "DENY", "DENY"]
+
+
+def test_batch_rejects_request_without_consent_source():
+    client = TestClient(app)
+    response = client.post("/policy/evaluate:batch", json={"requests": [
+        {"requester_role": "researcher", "purpose": "research", "requested_fields": ["age"]},
+    ]})
+    assert response.status_code == 422
@@ -37,6 +37,26 @@ class Settings(BaseSettings):
     jwt_algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=60, ge=1)
     refresh_token_expire_days: int = Field(default=7, ge=1)
+    auth_claims_cache_size: int = Field(
+        default=4096,
+        ge=1,
+        description="Verified access tokens whose claims are cached per worker"
+    )
+    auth_claims_cache_ttl_seconds: int = Field(
+        default=300,
+        ge=1,
+        description="Upper bound on how long decoded claims are cached (never past exp)"
+    )
+    principal_cache_size: int = Field(
+        default=4096,
+        ge=1,
+        description="Researchers whose id/institution/is_active are cached per worker"
+    )
+    principal_cache_ttl_seconds: int = Field(
+        default=60,
+        ge=1,
+        description="How long a cached researcher principal is trusted"
+    )
     
     # CORS
     cors_origins: str = Field(
@@ -61,6 +81,203 @@ class Settings(BaseSettings):
         default="http://localhost:8003",
         description="Base URL for Policy Engine"
     )
+    
+    # Query rewriting
+    rewrite_plan_cache_size: int = Field(
+        default=1024,
+        ge=1,
+        description="Maximum number of cached rewrite plans"
+    )
+    subject_column: str = Field(
+        default="patient_id",
+        description="Column identifying the data subject in rewritten queries"
+    )
+    record_timestamp_column: str = Field(
+        default="created_at",
+        description="Record timestamp column used for consent time-window predicates"
+    )
+    keyset_column: str = Field(
+        default="id",
+        description="Unique, ordered column used for resumable streamed execution"
+    )
+    queryable_tables: str = Field(
+        default="patient_records,patients",
+        description="Comma-separated tables researcher queries may read"
+    )
+    
+    @property
+    def queryable_tables_list(self) -> list[str]:
+        """Parse queryable tables from comma-separated string."""
+        return [table.strip() for table in self.queryable_tables.split(",") if table.strip()]
+    
+    # Execution of researcher queries
+    query_database_url: Optional[str] = Field(
+        default=None,
+        description="Connection for executing researcher queries (a read-only, least-privilege login); defaults to the main database"
+    )
+    query_role: Optional[str] = Field(
+        default=None,
+        description="Role assumed (SET LOCAL ROLE) while executing researcher queries"
+    )
+    query_statement_timeout_ms: int = Field(
+        default=30000,
+        ge=1,
+        description="statement_timeout for researcher queries"
+    )
 
+    
+    # Consent policy cache
+    policy_cache_size: int = Field(
+        default=10000,
+        ge=1,
+        description="Maximum number of cached (subject_id, purpose) consent policies"
+    )
+    policy_cache_ttl_seconds: int = Field(
+        default=300,
+        ge=0,
+        description="Upper bound on how long a valid policy is served from cache"
+    )
+    policy_negative_cache_ttl_seconds: int = Field(
+        default=30,
+        ge=0,
+        description="How long missing or low-confidence consents are cached as denials"
+    )
+    internal_api_key: Optional[str] = Field(
+        default=None,
+        description="Shared key for service-to-service calls (consent change notifications)"
+    )
+    
+    # Redis (access token store)
+    redis_url: str = Field(
+        default="redis://localhost:6379/0",
+        description="Redis URL for the token store (fakeredis:// = in-process fake)"
+    )
+    redis_max_connections: int = Field(
+        default=50,
+        ge=1,
+        description="Size of the shared Redis connection pool"
+    )
+    redis_connect_timeout_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="Timeout for opening a Redis connection"
+    )
+    redis_socket_timeout_seconds: float = Field(
+        default=0.5,
+        gt=0,
+        description="Timeout for a Redis command round trip"
+    )
+    redis_health_check_interval_seconds: int = Field(
+        default=30,
+        ge=0,
+        description="PING pooled connections idle for longer than this before reuse"
+    )
+    token_ttl_seconds: int = Field(
+        default=300,
+        ge=1,
+        description="How long issued access tokens are tracked in Redis"
+    )
+    
+    # Access token verification cache
+    token_verify_cache_size: int = Field(
+        default=10000,
+        ge=0,
+        description="Verified access tokens cached per worker (0 = always ask Redis)"
+    )
+    
+    # Access audit events (app.services.audit)
+    audit_queue_size: int = Field(
+        default=10000,
+        ge=1,
+        description="Audit events buffered in memory before spilling to file"
+    )
+    audit_batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Maximum audit events per bulk write"
+    )
+    audit_flush_interval_seconds: float = Field(
+        default=0.2,
+        gt=0,
+        description="Longest an audit event waits in memory before being written"
+    )
+    audit_spill_path: str = Field(
+        default="audit_spill.jsonl",
+        description="File receiving audit events that could not be queued or written"
+    )
+    audit_partition_maintenance_interval_seconds: float = Field(
+        default=21600.0,
+        gt=0,
+        description="How often upcoming monthly audit partitions are created"
+    )
+    audit_partition_retention_months: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Detach audit partitions older than this many months for archiving (None = keep all)"
+    )
+    
+    # Session audit logs (group-committed by app.services.session_audit_service)
+    session_audit_queue_size: int = Field(
+        default=10000,
+        ge=1,
+        description="Session audit entries buffered before callers write inline"
+    )
+    session_audit_batch_size: int = Field(
+        default=200,
+        ge=1,
+        description="Maximum session audit entries per multi-row INSERT"
+    )
+    session_audit_flush_interval_seconds: float = Field(
+        default=0.005,
+        gt=0,
+        description="Longest a session audit entry waits to be grouped with others"
+    )
+    
+    # Session access counters (buffered by SessionService.increment_access_count)
+    session_access_queue_size: int = Field(
+        default=10000,
+        ge=1,
+        description="Buffered session accesses before callers update the counter inline"
+    )
+    session_access_flush_interval_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="How often buffered session access counts are written"
+    )
+    
+    # Consent replication (consent-ingestion -> consent_policies)
+    consent_replication_enabled: bool = Field(
+        default=False,
+        description="Run the background consent replication worker"
+    )
+    consent_source_database_url: Optional[str] = Field(
+        default=None,
+        description="Database holding consents/consent_versions (None = this service's database)"
+    )
+    consent_replication_interval_seconds: float = Field(
+        default=15.0,
+        gt=0,
+        description="Polling interval when the replication worker is caught up"
+    )
+    consent_replication_batch_size: int = Field(
+        default=500,
+        ge=1,
+        description="Consent versions applied per replication batch"
+    )
+    consent_replication_settle_seconds: int = Field(
+        default=60,
+        ge=0,
+        description="Only replicate versions older than this, so interpretation has finished"
+    )
+    consent_replication_pending_timeout_seconds: int = Field(
+        default=86400,
+        ge=0,
+        description="How long a version without extracted_policy holds back the watermark before it is skipped"
+    )
+    replicated_policy_default_days: int = Field(
+        default=365,
+        ge=1,
+        description="Policy lifetime when a consent version has no expiry"
+    )
 
 settings = Settings()
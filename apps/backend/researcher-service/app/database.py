@@ -55,6 +55,10 @@ from app.models.data_access_request import DataAccessRequest  # noqa: F401
 from app.models.research_session import ResearchSession  # noqa: F401
 from app.models.session_audit_log import SessionAuditLog  # noqa: F401
 from app.models.eda_models import Dataset, DatasetColumn  # noqa: F401
+from app.models.consent_policy import ConsentPolicy  # noqa: F401
+from app.models.replication_state import ReplicationState  # noqa: F401
+from app.models.consented_cohort import ConsentedSubject  # noqa: F401
+from app.models.access_audit_event import AccessAuditEvent  # noqa: F401
 
 
 # Import models to ensure they're registered with Base
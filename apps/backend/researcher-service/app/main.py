@@ -13,17 +13,62 @@ from app.routers.auth import router as auth_router
 from app.routers.data_access import router as data_access_router
 from app.routers.router import router as consent_router  # Consent-aware data router
 from app.routers.sessions import router as sessions_router  # Research sessions
+from contextlib import asynccontextmanager
 from app.database import Base, engine
 from app.core.config import settings
+from app.utils.cache_invalidation import start_invalidation_listener, stop_invalidation_listener
+from app.utils.token_store import token_store
+from app.services import audit
+from app.services import session_audit_service
+from app.services import session_service
+from app.models.access_audit_event import AccessAuditEvent
+from app.models.session_audit_log import SessionAuditLog
+from app.utils.partitions import PartitionMaintainer
 
 # Create all database tables on startup
 Base.metadata.create_all(bind=engine)
 
+# Keeps monthly audit partitions ahead of time (PostgreSQL only)
+partition_maintainer = PartitionMaintainer(
+    engine,
+    (SessionAuditLog.__table__, AccessAuditEvent.__table__),
+    settings.audit_partition_maintenance_interval_seconds,
+    retention_months=settings.audit_partition_retention_months
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers."""
+    partition_maintainer.run_once()
+    audit.start_audit_writer()
+    session_audit_service.start_session_audit_writer()
+    session_service.start_access_count_writer()
+    partition_maintainer.start()
+    replicator = None
+    if settings.consent_replication_enabled:
+        from app.services.consent_replication import ConsentReplicator
+        replicator = ConsentReplicator()
+        replicator.start()
+    token_store.start_revocation_listener()
+    start_invalidation_listener()
+    yield
+    await stop_invalidation_listener()
+    await token_store.close()
+    if replicator:
+        replicator.stop()
+    partition_maintainer.stop()
+    audit.stop_audit_writer()
+    session_audit_service.stop_session_audit_writer()
+    session_service.stop_access_count_writer()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Researcher Portal Service",
     description="Self-service portal for researchers to access consent-aware patient data for research purposes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
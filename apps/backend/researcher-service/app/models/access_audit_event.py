@@ -0,0 +1,65 @@
+"""
+Access Audit Event Model
+
+Persisted consent-aware access decisions (see app.services.audit).
+The table is append-only: rows are written in bulk by the audit writer and
+never updated; on PostgreSQL a trigger rejects UPDATE and DELETE, and the
+table is range-partitioned by month on timestamp (see app.utils.partitions).
+"""
+from sqlalchemy import DDL, Column, DateTime, Index, JSON, String, event
+
+from app.database import Base
+from app.utils.partitions import ensure_monthly_partitions
+
+
+class AccessAuditEvent(Base):
+    """
+    Access Audit Event Model
+    
+    One row per access request decision, revocation or emergency override.
+    """
+    __tablename__ = "access_audit_events"
+    
+    # The partition key must be part of the primary key
+    event_id = Column(String, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    event_type = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    subject_id = Column(String, nullable=False)
+    purpose = Column(String, nullable=False)
+    decision = Column(String, nullable=False)
+    organization = Column(String, nullable=True)
+    request_id = Column(String, nullable=True)
+    permitted_fields = Column(JSON, nullable=True)
+    justifications = Column(JSON, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_access_audit_events_subject_ts", "subject_id", "timestamp"),
+        Index("ix_access_audit_events_user_ts", "user_id", "timestamp"),
+        Index("ix_access_audit_events_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+    
+    def __repr__(self):
+        return f"<AccessAuditEvent(event_id={self.event_id}, type={self.event_type}, decision={self.decision})>"
+
+
+event.listen(
+    AccessAuditEvent.__table__,
+    "after_create",
+    DDL("""
+        CREATE OR REPLACE FUNCTION access_audit_events_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'access_audit_events is append-only';
+        END;
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER access_audit_events_append_only
+            BEFORE UPDATE OR DELETE ON access_audit_events
+            FOR EACH ROW EXECUTE FUNCTION access_audit_events_append_only();
+    """).execute_if(dialect="postgresql")
+)
+
+
+@event.listens_for(AccessAuditEvent.__table__, "after_create")
+def _create_partitions(target, connection, **kw):
+    ensure_monthly_partitions(connection, target)
@@ -0,0 +1,39 @@
+"""
+Consented Cohort Model
+
+Materialized set of subjects with a usable consent per purpose.
+"""
+from sqlalchemy import Column, String, DateTime, Index
+
+from app.database import Base
+
+
+class ConsentedSubject(Base):
+    """
+    Consented Cohort Model
+    
+    One row per (purpose, subject_id) with an unexpired consent policy that
+    passes the confidence gate. Maintained incrementally from
+    consent_policies by cohort_service, so consent-aware queries join
+    against this compact set instead of re-evaluating consents per row.
+    """
+    __tablename__ = "consented_cohort"
+    
+    purpose = Column(String, primary_key=True)
+    subject_id = Column(String, primary_key=True)
+    
+    # Latest expiry among the subject's usable policies for this purpose
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Covering index for the consent-aware join and expiry sweeps
+        Index(
+            "ix_consented_cohort_purpose_expires",
+            "purpose",
+            "expires_at",
+            postgresql_include=["subject_id"],
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<ConsentedSubject(purpose={self.purpose}, subject_id={self.subject_id})>"
@@ -0,0 +1,28 @@
+"""
+Replication State Model
+
+Watermarks for incremental replication from other services' tables.
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+
+from app.database import Base
+
+
+class ReplicationState(Base):
+    """
+    Replication State Model
+    
+    One row per replication stream. The watermark is the (timestamp, id) of
+    the last source row applied (created_at for consent versions, updated_at
+    for consent status changes), so restarts resume where they stopped.
+    """
+    __tablename__ = "replication_state"
+    
+    name = Column(String, primary_key=True)
+    watermark_created_at = Column(DateTime, nullable=True)
+    watermark_id = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ReplicationState(name={self.name}, watermark={self.watermark_created_at})>"
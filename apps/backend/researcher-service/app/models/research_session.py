@@ -7,7 +7,7 @@ Each session has a specific purpose, scope, and timeline.
 import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, String, Text, DateTime, JSON, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum as SQLEnum, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -57,8 +57,8 @@ class ResearchSession(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Statistics (updated by triggers or application logic)
-    data_access_count = Column(String, nullable=True, default="0")  # Number of data queries
+    # Statistics (buffered and flushed by SessionService.increment_access_count)
+    data_access_count = Column(Integer, nullable=False, default=0, server_default="0")  # Number of data queries
     last_accessed_at = Column(DateTime, nullable=True)  # Last data access time
     
     def __repr__(self):
@@ -80,7 +80,7 @@ class ResearchSession(Base):
             "requested_fields": self.requested_fields,
             "data_scope": self.data_scope,
             "session_metadata": self.session_metadata,
-            "data_access_count": int(self.data_access_count) if self.data_access_count else 0,
+            "data_access_count": self.data_access_count or 0,
             "last_accessed_at": self.last_accessed_at.isoformat() if self.last_accessed_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
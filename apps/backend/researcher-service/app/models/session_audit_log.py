@@ -3,12 +3,17 @@ Session Audit Log Model
 
 Tracks all actions performed within a research session.
 Provides immutable audit trail for compliance and transparency.
+
+On PostgreSQL the table is range-partitioned by month on timestamp (see
+app.utils.partitions), with a BRIN index for time-range scans and
+(owner, timestamp, id) B-tree indexes for keyset pagination.
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, JSON, ForeignKey, Index, event
 
 from app.database import Base
+from app.utils.partitions import ensure_monthly_partitions
 
 
 class SessionAuditLog(Base):
@@ -20,10 +25,10 @@ class SessionAuditLog(Base):
     """
     __tablename__ = "session_audit_logs"
     
-    # Primary identifiers
+    # Primary identifiers (the partition key must be part of the primary key)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = Column(String, ForeignKey("research_sessions.id"), nullable=False, index=True)
-    researcher_id = Column(String, ForeignKey("researcher_users.id"), nullable=False, index=True)
+    session_id = Column(String, ForeignKey("research_sessions.id"), nullable=False)
+    researcher_id = Column(String, ForeignKey("researcher_users.id"), nullable=False)
     
     # Action details
     action = Column(String, nullable=False, index=True)  # e.g., "session_created", "data_accessed"
@@ -34,7 +39,14 @@ class SessionAuditLog(Base):
     user_agent = Column(Text, nullable=True)
     
     # Timestamp (immutable)
-    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_session_audit_logs_session_ts", "session_id", "timestamp", "id"),
+        Index("ix_session_audit_logs_researcher_ts", "researcher_id", "timestamp", "id"),
+        Index("ix_session_audit_logs_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
     def __repr__(self):
         return f"<SessionAuditLog(id={self.id}, action={self.action}, timestamp={self.timestamp})>"
@@ -51,3 +63,8 @@ class SessionAuditLog(Base):
             "user_agent": self.user_agent,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None,
         }
+
+
+@event.listens_for(SessionAuditLog.__table__, "after_create")
+def _create_partitions(target, connection, **kw):
+    ensure_monthly_partitions(connection, target)
@@ -1,7 +1,10 @@
 """
 Authentication router for researcher signup and login.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -9,13 +12,15 @@ from app.schemas.researcher import (
     ResearcherSignup,
     ResearcherLogin,
     ResearcherProfile,
+    ResearcherStatusUpdate,
     ResearcherUpdate,
     TokenResponse
 )
 from app.services import auth_service, researcher_service
 from app.core.config import settings
-from app.utils.dependencies import get_current_researcher
+from app.utils.dependencies import get_current_researcher, get_current_researcher_profile
 from app.models.researcher import Researcher
+from app.services.auth_service import ResearcherPrincipal
 
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -93,7 +98,7 @@ def login(
 
 @router.get("/me", response_model=ResearcherProfile)
 def get_profile(
-    current_researcher: Researcher = Depends(get_current_researcher)
+    current_researcher: Researcher = Depends(get_current_researcher_profile)
 ):
     """
     Get the current authenticated researcher's profile.
@@ -106,7 +111,7 @@ def get_profile(
 @router.put("/profile", response_model=ResearcherProfile)
 def update_profile(
     update_data: ResearcherUpdate,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -121,3 +126,26 @@ def update_profile(
     )
     
     return ResearcherProfile.model_validate(updated_researcher)
+
+
+@router.put("/researchers/{researcher_id}/status", response_model=ResearcherProfile)
+def set_researcher_status(
+    researcher_id: str,
+    status_update: ResearcherStatusUpdate,
+    x_internal_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Activate or deactivate a researcher account.
+    
+    Called by administrative services (authenticated with the shared
+    X-Internal-Key). Every worker drops its cached principal, so a
+    deactivated researcher is rejected on their next request.
+    """
+    if not settings.internal_api_key:
+        raise HTTPException(status_code=503, detail="Researcher administration is not configured")
+    if not x_internal_key or not hmac.compare_digest(x_internal_key, settings.internal_api_key):
+        raise HTTPException(status_code=401, detail="Invalid internal key")
+    
+    researcher = researcher_service.set_researcher_active(db, researcher_id, status_update.is_active)
+    return ResearcherProfile.model_validate(researcher)
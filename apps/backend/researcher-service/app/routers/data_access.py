@@ -3,7 +3,7 @@ Data access router for researchers to query consent-aware patient data.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from app.database import get_db
 from app.schemas.data_access import (
@@ -16,8 +16,9 @@ from app.services.data_access_service import (
     get_researcher_access_requests,
     query_consent_aware_data
 )
+from app.services.cohort_service import get_cohort_sizes
 from app.utils.dependencies import get_current_researcher
-from app.models.researcher import Researcher
+from app.services.auth_service import ResearcherPrincipal
 
 
 router = APIRouter(prefix="/data", tags=["data-access"])
@@ -26,7 +27,7 @@ router = APIRouter(prefix="/data", tags=["data-access"])
 @router.post("/request-access", response_model=DataAccessRequestResponse, status_code=status.HTTP_201_CREATED)
 def request_data_access(
     request_data: DataAccessRequestCreate,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -46,7 +47,7 @@ def request_data_access(
 
 @router.get("/my-requests", response_model=List[DataAccessRequestResponse])
 def get_my_access_requests(
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -62,7 +63,7 @@ def get_my_access_requests(
 @router.post("/query", response_model=Dict[str, Any])
 def query_data(
     query: ConsentAwareDataQuery,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -81,3 +82,19 @@ def query_data(
     )
     
     return result
+
+
+@router.get("/cohort-size", response_model=Dict[str, Any])
+def get_consented_cohort_size(
+    purpose: Optional[str] = None,
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the number of patients with a usable consent, per purpose.
+    
+    Served from the materialized consented cohort, so it does not scan
+    consent policies. Pass `purpose` to count a single purpose.
+    """
+    sizes = get_cohort_sizes(db, purpose.upper() if purpose else None)
+    return {"cohort_sizes": sizes}
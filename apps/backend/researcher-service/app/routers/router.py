@@ -5,18 +5,33 @@ Integrated with researcher authentication system.
 Provides consent-aware query rewriting and policy evaluation.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import hashlib
+import hmac
 import logging
 
 from app.database import get_db
-from app.schemas.access_request import AccessRequest
-from app.services import access_service
+from app.schemas.access_request import (
+    AccessRequest,
+    AccessExecuteRequest,
+    BulkAccessRequest,
+    ConsentChangeNotification,
+)
+from app.services import access_service, query_rewriter, data_access_service, policy_service, cohort_service
+from app.services import auth_service
+from app.services.query_rewriter import KeysetPage
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
 from app.utils import token_store
+from app.utils import auth as eda_auth
 from app.services import audit
+from app.services.session_service import SessionService, access_count_writer
+from app.services.session_audit_service import session_audit_writer
 from app.utils.dependencies import get_current_researcher
-from app.models.researcher import Researcher
+from app.services.auth_service import ResearcherPrincipal
 from datetime import datetime, timedelta
 import uuid
 from jose import jwt as jose_jwt
@@ -25,10 +40,36 @@ from app.core.config import settings
 router = APIRouter(prefix="/router", tags=["consent-aware-data-access"])
 
 
+ACCESS_TOKEN_MINUTES = 15
+
+
+def _issue_access_token(
+    subject: str,
+    researcher_id: str,
+    allowed_fields: list,
+    purpose: str,
+    request_id: str,
+    **claims: Any
+) -> str:
+    """Sign a short-lived data access JWT scoped to permitted fields."""
+    expiry = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_MINUTES)
+    token_payload = {
+        "sub": subject,
+        "researcher_id": researcher_id,
+        "allowed_fields": allowed_fields,
+        "purpose": purpose,
+        "request_id": request_id,
+        "type": "data_access",
+        "exp": int(expiry.timestamp()),
+        **claims
+    }
+    return jose_jwt.encode(token_payload, settings.secret_key, algorithm="HS256")
+
+
 @router.post("/access-request")
 async def handle_access_request(
     request: AccessRequest,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ) -> dict:
     """
@@ -79,34 +120,41 @@ async def handle_access_request(
     }
 
     # Handle access request via service
-    result = access_service.handle_access_request(
+    result = await run_in_threadpool(
+        access_service.handle_access_request,
         request=request,
         user=user,
         db=db,
         request_id=request_id,
     )
 
+    # Current revocation epochs; the token is valid until either is bumped
+    epochs = None
+    try:
+        epochs = await token_store.token_store.current_epochs(request.subject_id, request.purpose)
+    except Exception as e:
+        # non-fatal - log but continue
+        logging.warning(f"Failed to read revocation epochs from Redis: {e}")
+
     # Issue short-lived JWT token scoped to permitted fields
-    expiry = datetime.utcnow() + timedelta(minutes=15)
-    token_payload = {
-        "sub": request.subject_id,
-        "researcher_id": current_researcher.id,
-        "allowed_fields": result.permitted_fields,
-        "purpose": request.purpose,
-        "request_id": request_id,
-        "type": "data_access",
-        "exp": int(expiry.timestamp())
-    }
-    access_token = jose_jwt.encode(token_payload, settings.secret_key, algorithm="HS256")
+    access_token = _issue_access_token(
+        subject=request.subject_id,
+        researcher_id=current_researcher.id,
+        allowed_fields=result.permitted_fields,
+        purpose=request.purpose,
+        request_id=request_id,
+        rev=epochs,
+    )
 
     # Store token in Redis for revocation tracking
     try:
-        token_store.token_store.store_token(
+        await token_store.token_store.store_token(
             token=access_token,
             subject_id=request.subject_id,
             purpose=request.purpose,
             allowed_fields=result.permitted_fields,
             request_id=request_id,
+            epochs=epochs,
         )
     except Exception as e:
         # non-fatal - log but continue
@@ -134,13 +182,355 @@ async def handle_access_request(
         "status": result.decision,
         "access_token": access_token,
         "token_type": "Bearer",
-        "expires_in": 15 * 60,
+        "expires_in": ACCESS_TOKEN_MINUTES * 60,
         "permitted_fields": result.permitted_fields,
         "rewritten_query": result.rewritten_query,
         "justifications": result.justifications,
     }
 
 
+@router.post("/access-request/bulk")
+async def handle_bulk_access_request(
+    request: BulkAccessRequest,
+    background_tasks: BackgroundTasks,
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Consent-aware access request for a whole cohort.
+    
+    Same policy evaluation and rewriting as /access-request, but for many
+    subjects at once: policies are fetched in one query, subjects with the
+    same permitted fields and conditions are grouped, and each group gets
+    one rewritten query (scoped with subject IN (...)) and one token.
+    
+    The cohort is either `subject_ids` or `cohort_id`, the id of one of the
+    researcher's sessions whose data_scope.subject_ids lists the subjects.
+    
+    Args:
+        request: BulkAccessRequest with subject_ids or cohort_id, purpose,
+            requested_fields, query
+        background_tasks: Per-subject audit events are emitted after responding
+        current_researcher: Authenticated researcher from JWT token
+        db: Database session
+    
+    Returns:
+        dict: Per-group tokens and rewritten queries, plus denied subjects
+    
+    Raises:
+        HTTPException: If request invalid or cohort cannot be resolved
+    """
+    
+    err = access_service.validate_access_request(request)
+    if err:
+        raise HTTPException(status_code=400, detail=err)
+    
+    # Resolve the cohort
+    if request.cohort_id is not None:
+        session = SessionService.get_session(db, request.cohort_id, current_researcher.id)
+        subject_ids = (session.data_scope or {}).get("subject_ids")
+        if not isinstance(subject_ids, list):
+            raise HTTPException(status_code=400, detail="Cohort data_scope has no subject_ids")
+        subject_ids = [str(s) for s in subject_ids]
+    else:
+        subject_ids = request.subject_ids
+    if not subject_ids:
+        raise HTTPException(status_code=400, detail="Cohort has no subjects")
+    
+    request_id = str(uuid.uuid4())
+    user = {
+        "user_id": current_researcher.id,
+        "role": "researcher",
+        "org": current_researcher.institution or "unknown"
+    }
+    
+    result = await run_in_threadpool(
+        access_service.handle_bulk_access_request,
+        request=request,
+        subject_ids=subject_ids,
+        user=user,
+        db=db,
+        request_id=request_id,
+    )
+    
+    organization = current_researcher.institution or "unknown"
+    groups = []
+    for group in result.groups:
+        access_token = _issue_access_token(
+            subject=f"group:{group.group_id}",
+            researcher_id=current_researcher.id,
+            allowed_fields=group.permitted_fields,
+            purpose=request.purpose,
+            request_id=request_id,
+            group_id=group.group_id,
+            subject_count=len(group.subject_ids),
+        )
+        try:
+            await token_store.token_store.store_group_token(
+                token=access_token,
+                subject_ids=group.subject_ids,
+                purpose=request.purpose,
+                allowed_fields=group.permitted_fields,
+                request_id=request_id,
+                group_id=group.group_id,
+            )
+        except Exception as e:
+            logging.warning(f"Failed to store token in Redis: {e}")
+        
+        for subject_id in group.subject_ids:
+            background_tasks.add_task(audit.emit_event_async, audit.create_access_event(
+                user_id=current_researcher.id,
+                subject_id=subject_id,
+                purpose=request.purpose,
+                decision=group.decision,
+                organization=organization,
+                request_id=request_id,
+                permitted_fields=group.permitted_fields,
+                justifications=group.justifications,
+            ))
+        
+        groups.append({
+            **group.to_dict(),
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "expires_in": ACCESS_TOKEN_MINUTES * 60,
+        })
+    
+    for subject_id, reason in result.denied.items():
+        background_tasks.add_task(audit.emit_event_async, audit.create_access_event(
+            user_id=current_researcher.id,
+            subject_id=subject_id,
+            purpose=request.purpose,
+            decision="DENY",
+            organization=organization,
+            request_id=request_id,
+            justifications=[reason],
+        ))
+    
+    return {
+        "request_id": request_id,
+        "status": result.decision,
+        "total_subjects": len(result.denied) + sum(len(g.subject_ids) for g in result.groups),
+        "granted_subjects": sum(len(g.subject_ids) for g in result.groups),
+        "groups": groups,
+        "denied": result.denied_by_reason(),
+    }
+
+
+def _stream_scope(request: AccessRequest) -> str:
+    """Bind checkpoint cursors to the subject, purpose and query they came from."""
+    scope = f"{request.subject_id}|{request.purpose}|{request.query}"
+    return hashlib.sha256(scope.encode()).hexdigest()[:16]
+
+
+@router.post("/execute")
+async def execute_access_request(
+    request: AccessExecuteRequest,
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Execute a consent-aware query and stream the permitted rows.
+    
+    Runs the same policy evaluation and rewrite as /access-request, then
+    executes the rewritten query through a server-side cursor and streams
+    results in batches (NDJSON or Arrow IPC) with bounded memory.
+    
+    Row-level results are ordered by settings.keyset_column and carry a
+    signed checkpoint cursor after every batch; pass the last checkpoint
+    back as `cursor` to resume an interrupted stream.
+    
+    Args:
+        request: AccessExecuteRequest (AccessRequest + format, batch_size, cursor)
+        current_researcher: Authenticated researcher from JWT token
+        db: Database session
+    
+    Returns:
+        StreamingResponse: application/x-ndjson or Arrow stream
+    
+    Raises:
+        HTTPException: If request invalid, cursor invalid, or access denied
+    """
+    
+    err = access_service.validate_access_request(request)
+    if err:
+        raise HTTPException(status_code=400, detail=err)
+    
+    if request.format == "arrow" and data_access_service.pa is None:
+        raise HTTPException(status_code=400, detail="Arrow format is not available on this server")
+    
+    # Resume position from a previous stream
+    scope = _stream_scope(request)
+    keyset_after = None
+    records_consumed = 0
+    if request.cursor:
+        try:
+            position = decode_cursor(request.cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if position.get("s") != scope:
+            raise HTTPException(status_code=400, detail="Cursor does not match this request")
+        keyset_after = position.get("k")
+        records_consumed = int(position.get("n", 0))
+    
+    request_id = str(uuid.uuid4())
+    user = {
+        "user_id": current_researcher.id,
+        "role": "researcher",
+        "org": current_researcher.institution or "unknown"
+    }
+    
+    result = await run_in_threadpool(
+        access_service.handle_access_request,
+        request=request,
+        user=user,
+        db=db,
+        request_id=request_id,
+        keyset_column=settings.keyset_column,
+        keyset_after=keyset_after,
+        records_consumed=records_consumed,
+    )
+    
+    event = audit.create_access_event(
+        user_id=current_researcher.id,
+        subject_id=request.subject_id,
+        purpose=request.purpose,
+        decision=result.decision,
+        organization=current_researcher.institution or "unknown",
+        request_id=request_id,
+        permitted_fields=result.permitted_fields,
+        justifications=result.justifications,
+    )
+    try:
+        audit.emit_event_async(event)
+    except Exception as e:
+        logging.warning(f"Failed to emit audit event: {e}")
+    
+    key_alias = KeysetPage.KEY_ALIAS if result.resumable else None
+    
+    def _batches():
+        consumed = records_consumed
+        for rows, last_key in data_access_service.iter_query_batches(
+            result.rewritten_query,
+            batch_size=request.batch_size,
+            key_alias=key_alias,
+        ):
+            consumed += len(rows)
+            checkpoint = None
+            if result.resumable and rows:
+                checkpoint = encode_cursor({"s": scope, "k": last_key, "n": consumed})
+            yield rows, checkpoint
+    
+    if request.format == "arrow":
+        body = data_access_service.encode_arrow(_batches())
+        media_type = "application/vnd.apache.arrow.stream"
+    else:
+        body = data_access_service.encode_ndjson(_batches())
+        media_type = "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "X-Request-Id": request_id,
+            "X-Resumable": "true" if result.resumable else "false",
+        },
+    )
+
+
+@router.post("/consent-changed")
+async def consent_changed(
+    notification: ConsentChangeNotification,
+    x_internal_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Invalidate cached consent policies after a consent change.
+    
+    Called by the consent services (authenticated with the shared
+    X-Internal-Key) when a subject's consent is updated or revoked. The
+    subject's consented-cohort membership is recomputed. On revocation the
+    subject's stored policies are expired first and access tokens issued
+    for the subject are revoked too.
+    
+    Args:
+        notification: Subject, optional purpose, and whether consent was revoked
+        x_internal_key: Shared service key
+        db: Database session
+    
+    Returns:
+        dict: Number of cache entries invalidated and tokens revoked
+    
+    Raises:
+        HTTPException: 503 if no internal key is configured, 401 if the key is wrong
+    """
+    
+    if not settings.internal_api_key:
+        raise HTTPException(status_code=503, detail="Consent change notifications are not configured")
+    if not x_internal_key or not hmac.compare_digest(x_internal_key, settings.internal_api_key):
+        raise HTTPException(status_code=401, detail="Invalid internal key")
+    
+    if notification.revoked:
+        # Expire the stored rows first, or the next lookup reloads them
+        await run_in_threadpool(
+            policy_service.expire_consent_policies,
+            db,
+            notification.subject_id,
+            notification.purpose
+        )
+    invalidated = policy_service.invalidate_consent_policy(
+        notification.subject_id,
+        notification.purpose
+    )
+    await run_in_threadpool(
+        cohort_service.refresh_consented_subjects,
+        db,
+        [notification.subject_id],
+        notification.purpose
+    )
+    
+    tokens_revoked = 0
+    if notification.revoked:
+        store = token_store.token_store
+        if notification.purpose:
+            tokens_revoked = await store.revoke_by_purpose(notification.subject_id, notification.purpose)
+        else:
+            tokens_revoked = await store.revoke_by_subject(notification.subject_id)
+        
+        try:
+            audit.emit_event_async(audit.create_revocation_event(
+                user_id="consent-service",
+                subject_id=notification.subject_id,
+                organization="system",
+            ))
+        except Exception as e:
+            logging.warning(f"Failed to emit audit event: {e}")
+    
+    return {
+        "subject_id": notification.subject_id,
+        "policies_invalidated": invalidated,
+        "tokens_revoked": tokens_revoked,
+    }
+
+
+@router.get("/cache-stats")
+def cache_stats(
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher)
+) -> dict:
+    """Hit-rate metrics for the consent-aware access caches and the audit writer queue."""
+    return {
+        "rewrite_plan": query_rewriter.get_rewrite_cache_stats(),
+        "consent_policy": policy_service.get_policy_cache_stats(),
+        "token_verify": token_store.token_store.get_verify_cache_stats(),
+        "auth_claims": auth_service.get_claims_cache_stats(),
+        "researcher_principal": auth_service.get_principal_cache_stats(),
+        "eda_auth_claims": eda_auth.get_claims_cache_stats(),
+        "audit_writer": audit.audit_writer.stats(),
+        "session_audit_writer": session_audit_writer.stats(),
+        "session_access_counter": access_count_writer.stats(),
+    }
+
+
 @router.get("/health")
 def health_check() -> dict:
     """Health check endp
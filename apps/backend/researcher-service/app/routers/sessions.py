@@ -3,13 +3,14 @@ Sessions Router
 
 API endpoints for managing research sessions.
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.database import get_db
 from app.utils.dependencies import get_current_researcher
-from app.models.researcher import Researcher
+from app.services.auth_service import ResearcherPrincipal
 from app.models.research_session import SessionStatus
 from app.schemas.session import (
     SessionCreate,
@@ -21,6 +22,7 @@ from app.schemas.session import (
 )
 from app.services.session_service import SessionService
 from app.services.session_audit_service import SessionAuditService
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
 
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
@@ -30,7 +32,7 @@ router = APIRouter(prefix="/sessions", tags=["sessions"])
 async def create_session(
     session_data: SessionCreate,
     request: Request,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -68,7 +70,7 @@ async def list_sessions(
     status_filter: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -107,7 +109,7 @@ async def list_sessions(
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(
     session_id: str,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -127,7 +129,7 @@ async def update_session(
     session_id: str,
     update_data: SessionUpdate,
     request: Request,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -160,7 +162,7 @@ async def update_session(
 async def delete_session(
     session_id: str,
     request: Request,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
@@ -192,15 +194,18 @@ async def delete_session(
 @router.get("/{session_id}/audit-logs", response_model=AuditLogListResponse)
 async def get_session_audit_logs(
     session_id: str,
-    limit: int = 100,
-    offset: int = 0,
-    current_researcher: Researcher = Depends(get_current_researcher),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
+    current_researcher: ResearcherPrincipal = Depends(get_current_researcher),
     db: Session = Depends(get_db)
 ):
     """
     Get audit trail for a specific session.
     
     Returns all actions performed within the session in reverse chronological order.
+    Pass `next_cursor` from a response as `cursor` to get the next page. `total`
+    is an estimate from planner statistics unless `exact_total` is set.
     """
     # Verify session access
     SessionService.get_session(
@@ -209,17 +214,38 @@ async def get_session_audit_logs(
         researcher_id=current_researcher.id
     )
     
+    # Resume after the last log of the previous page
+    after = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            if position.get("s") != session_id:
+                raise InvalidCursorError("Cursor does not match this session")
+            after = (datetime.fromisoformat(position["t"]), position["i"])
+        except (InvalidCursorError, KeyError, TypeError, ValueError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e) if isinstance(e, InvalidCursorError) else "Malformed cursor"
+            )
+    
     # Get audit logs
-    logs, total = SessionAuditService.get_session_logs(
+    page = SessionAuditService.get_session_logs(
         db=db,
         session_id=session_id,
         limit=limit,
-        offset=offset
+        after=after,
+        exact_total=exact_total
     )
     
+    next_cursor = None
+    if page.has_more:
+        last = page.logs[-1]
+        next_cursor = encode_cursor({"s": session_id, "t": last.timestamp.isoformat(), "i": last.id})
+    
     return AuditLogListResponse(
-        logs=[AuditLogResponse(**log.to_dict()) for log in logs],
-        total=total,
+        logs=[AuditLogResponse(**log.to_dict()) for log in page.logs],
+        total=page.total,
+        total_is_estimate=page.total_is_estimate,
         limit=limit,
-        offset=offset
+        next_cursor=next_cursor
     )
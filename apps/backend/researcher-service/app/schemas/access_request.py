@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
 
 
 class AccessRequest(BaseModel):
@@ -13,4 +13,50 @@ class AccessRequest(BaseModel):
     requested_fields: List[str]
     study_id: Optional[str] = None
     query: str
-    
\ No newline at end of file
+    
+
+
+class AccessExecuteRequest(AccessRequest):
+    """
+    Access Execute Schema
+    
+    Access request whose rewritten query is executed server-side and
+    streamed back in bounded batches.
+    """
+    format: Literal["ndjson", "arrow"] = "ndjson"
+    batch_size: int = Field(default=1000, ge=1, le=10000)
+    cursor: Optional[str] = Field(None, description="Checkpoint cursor to resume a previous stream")
+
+
+class BulkAccessRequest(BaseModel):
+    """
+    Bulk Access Request Schema
+    
+    One query and field request evaluated against a whole cohort, given
+    either as explicit subject ids or as a research session (cohort) id
+    whose data_scope lists the subject ids.
+    """
+    subject_ids: Optional[List[str]] = Field(None, max_length=100000)
+    cohort_id: Optional[str] = Field(None, description="Research session id whose data_scope.subject_ids defines the cohort")
+    purpose: str
+    requested_fields: List[str]
+    study_id: Optional[str] = None
+    query: str
+    
+    @model_validator(mode="after")
+    def check_cohort(self) -> "BulkAccessRequest":
+        if (self.subject_ids is None) == (self.cohort_id is None):
+            raise ValueError("Provide exactly one of subject_ids or cohort_id")
+        return self
+
+
+class ConsentChangeNotification(BaseModel):
+    """
+    Consent Change Schema
+    
+    Sent by the consent services when a subject's consent is updated or
+    revoked, so cached policies and issued tokens can be dropped.
+    """
+    subject_id: str
+    purpose: Optional[str] = Field(None, description="Affected purpose (None = all purposes)")
+    revoked: bool = Field(False, description="Also revoke access tokens issued for the subject")
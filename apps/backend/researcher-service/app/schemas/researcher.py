@@ -47,6 +47,11 @@ class ResearcherUpdate(BaseModel):
     credentials: Optional[str] = None
 
 
+class ResearcherStatusUpdate(BaseModel):
+    """Schema for activating or deactivating a researcher account."""
+    is_active: bool
+
+
 class TokenResponse(BaseModel):
     """Schema for JWT token response."""
     access_token: str
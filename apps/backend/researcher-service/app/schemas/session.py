@@ -84,8 +84,9 @@ class AuditLogResponse(BaseModel):
 
 
 class AuditLogListResponse(BaseModel):
-    """Schema for paginated audit log list."""
+    """Schema for keyset-paginated audit log list."""
     logs: List[AuditLogResponse]
     total: int
+    total_is_estimate: bool
     limit: int
-    offset: int
+    next_cursor: Optional[str] = None
@@ -5,18 +5,37 @@ Handles the complete access request flow:
 1. Fetch consent policy
 2. Evaluate policy
 3. Deny if decision is DENY
-4. Rewrite query
+4. Rewrite query, compiling policy conditions into SQL
 5. Return decision with justifications
+
+Bulk requests run the same flow for a whole cohort, grouping subjects
+that share a permitted-field set into one rewritten query.
 """
 
-from typing import Dict, Any, Optional
+import hashlib
+import json
+from typing import Dict, Any, Optional, List, Union
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
-from app.schemas.access_request import AccessRequest
-from app.services.policy_service import fetch_consent_policy
-from app.services.policy_evaluator import evaluate_policy, PolicyDecision
-from app.services.query_rewriter import rewrite_query, validate_query
+from app.schemas.access_request import AccessRequest, BulkAccessRequest
+from app.services.policy_service import fetch_compiled_policy, fetch_compiled_policies
+from app.services.policy_evaluator import (
+    evaluate_policy,
+    evaluate_conditions,
+    compile_conditions,
+    PolicyDecision,
+)
+from app.services.query_rewriter import (
+    RewritePipeline,
+    RestrictScope,
+    ProjectFields,
+    InjectPredicate,
+    KeysetPage,
+    Aggregate,
+    validate_query,
+)
+from app.core.config import settings
 
 
 class AccessRequestResult:
@@ -28,13 +47,15 @@ class AccessRequestResult:
         permitted_fields: list,
         rewritten_query: str,
         justifications: list,
-        request_id: str = None
+        request_id: str = None,
+        resumable: bool = False
     ):
         self.decision = decision
         self.permitted_fields = permitted_fields
         self.rewritten_query = rewritten_query
         self.justifications = justifications
         self.request_id = request_id
+        self.resumable = resumable
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to response dictionary."""
@@ -51,7 +72,10 @@ def handle_access_request(
     request: AccessRequest,
     user: Dict[str, Any],
     db: Session,
-    request_id: str = None
+    request_id: str = None,
+    keyset_column: Optional[str] = None,
+    keyset_after: Any = None,
+    records_consumed: int = 0
 ) -> AccessRequestResult:
     """
     Handle access request with full consent workflow.
@@ -61,8 +85,9 @@ def handle_access_request(
     Complete flow:
     1. Fetch consent policy from database
     2. Evaluate policy against requested fields
-    3. Check decision - DENY = error
-    4. Rewrite query to include only permitted fields
+    3. Check decision - DENY = error; check policy conditions
+    4. Rewrite query to include only permitted fields, scoped to the subject,
+       with time_window / aggregation_level / max_records enforced in SQL
     5. Return decision with rewritten query and justifications
     
     Args:
@@ -70,6 +95,9 @@ def handle_access_request(
         user: Authenticated user dict (user_id, role, org)
         db: SQLAlchemy database session
         request_id: Request ID for tracing
+        keyset_column: Unique column to order by for resumable execution
+        keyset_after: Resume after this key value (from a previous page)
+        records_consumed: Records already returned by earlier pages
     
     Returns:
         AccessRequestResult: decision, permitted_fields, rewritten_query, justifications
@@ -80,7 +108,7 @@ def handle_access_request(
     
     # STEP 1: Fetch Consent Policy
     try:
-        policy = fetch_consent_policy(
+        compiled_policy = fetch_compiled_policy(
             db=db,
             subject_id=request.subject_id,
             purpose=request.purpose
@@ -96,7 +124,7 @@ def handle_access_request(
     # STEP 2: Evaluate Policy
     try:
         policy_decision: PolicyDecision = evaluate_policy(
-            policy=policy,
+            policy=compiled_policy,
             requested_fields=request.requested_fields
         )
     except Exception as e:
@@ -112,6 +140,31 @@ def handle_access_request(
             detail=f"Access denied: {'; '.join(policy_decision.justifications)}"
         )
     
+    # STEP 3b: Check Conditions - study binding, then compile the
+    # enforceable conditions so the database does the filtering
+    policy = compiled_policy.source
+    condition_decision = evaluate_conditions(
+        policy=policy,
+        request_context={"study_id": request.study_id}
+    )
+    if condition_decision.decision == "DENY":
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied: {'; '.join(condition_decision.justifications)}"
+        )
+    
+    try:
+        condition_transforms = compile_conditions(
+            policy,
+            records_consumed=records_consumed
+        )
+    except ValueError as e:
+        # Fail closed on conditions we cannot enforce
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied: unenforceable consent condition: {str(e)}"
+        )
+    
     # STEP 4: Rewrite Query
     rewritten_query = None
     try:
@@ -119,11 +172,26 @@ def handle_access_request(
         if not validate_query(request.query):
             raise ValueError("Query must be a SELECT statement")
         
-        # Rewrite query to include only permitted fields
-        rewritten_query = rewrite_query(
-            original_sql=request.query,
-            allowed_fields=policy_decision.permitted_fields
+        # Single parse/generate pass: check the query only reads permitted
+        # data, prune to permitted fields, scope
+        # rows to the consenting subject and apply policy conditions
+        pipeline = RewritePipeline([
+            RestrictScope(settings.queryable_tables_list, policy_decision.permitted_fields),
+            ProjectFields(policy_decision.permitted_fields),
+            InjectPredicate(settings.subject_column, request.subject_id),
+        ])
+        
+        # Keyset paging only applies to row-level results; aggregated
+        # output has no stable key to resume from
+        resumable = bool(keyset_column) and not any(
+            isinstance(t, Aggregate) for t in condition_transforms
         )
+        if resumable:
+            pipeline.add(KeysetPage(keyset_column, after=keyset_after))
+        
+        for transform in condition_transforms:
+            pipeline.add(transform)
+        rewritten_query = pipeline.run(request.query)
     except ValueError as e:
         raise HTTPException(
             status_code=400,
@@ -140,24 +208,240 @@ def handle_access_request(
         decision=policy_decision.decision,
         permitted_fields=policy_decision.permitted_fields,
         rewritten_query=rewritten_query,
-        justifications=policy_decision.justifications,
-        request_id=request_id
+        justifications=policy_decision.justifications + condition_decision.justifications,
+        request_id=request_id,
+        resumable=resumable
     )
 
 
-def validate_access_request(request: AccessRequest) -> Optional[str]:
+class AccessGroup:
+    """Subjects of a bulk request that share one rewritten query."""
+    
+    def __init__(
+        self,
+        group_id: str,
+        decision: str,
+        subject_ids: list,
+        permitted_fields: list,
+        rewritten_query: str,
+        justifications: list
+    ):
+        self.group_id = group_id
+        self.decision = decision
+        self.subject_ids = subject_ids
+        self.permitted_fields = permitted_fields
+        self.rewritten_query = rewritten_query
+        self.justifications = justifications
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to response dictionary."""
+        return {
+            "group_id": self.group_id,
+            "decision": self.decision,
+            "subject_count": len(self.subject_ids),
+            "subject_ids": self.subject_ids,
+            "permitted_fields": self.permitted_fields,
+            "rewritten_query": self.rewritten_query,
+            "justifications": self.justifications
+        }
+
+
+class BulkAccessResult:
+    """Result of bulk access request handling."""
+    
+    def __init__(
+        self,
+        groups: List[AccessGroup],
+        denied: Dict[str, str],
+        request_id: str = None
+    ):
+        self.groups = groups
+        self.denied = denied
+        self.request_id = request_id
+    
+    @property
+    def decision(self) -> str:
+        """ALLOW if every subject is covered, DENY if none, else PARTIAL_ALLOW."""
+        if not self.groups:
+            return "DENY"
+        if self.denied or any(g.decision != "ALLOW" for g in self.groups):
+            return "PARTIAL_ALLOW"
+        return "ALLOW"
+    
+    def denied_by_reason(self) -> List[Dict[str, Any]]:
+        """Denied subjects grouped by reason."""
+        by_reason: Dict[str, List[str]] = {}
+        for subject_id, reason in self.denied.items():
+            by_reason.setdefault(reason, []).append(subject_id)
+        return [
+            {"reason": reason, "subject_count": len(ids), "subject_ids": ids}
+            for reason, ids in by_reason.items()
+        ]
+
+
+def _conditions_key(policy: Dict[str, Any]) -> str:
+    """Canonical form of a policy's conditions, for grouping."""
+    return json.dumps(policy.get("conditions") or {}, sort_keys=True, default=str)
+
+
+def handle_bulk_access_request(
+    request: BulkAccessRequest,
+    subject_ids: List[str],
+    user: Dict[str, Any],
+    db: Session,
+    request_id: str = None
+) -> BulkAccessResult:
+    """
+    Handle one access request for a whole cohort.
+    
+    Flow:
+    1. Fetch all consent policies in a single query
+    2. Evaluate once per distinct policy shape (allowed/denied masks and
+       conditions) rather than once per subject
+    3. Group subjects by decision, permitted-field set and conditions
+    4. Rewrite the query once per group, scoped to the group's subjects
+       with subject_column = ANY(array) (one bound parameter); max_records
+       is enforced per subject with a ROW_NUMBER() cap before aggregation
+    
+    Subjects without a valid consent, whose policy denies every requested
+    field, or whose conditions fail are reported in denied instead of
+    failing the whole request.
+    
+    Args:
+        request: BulkAccessRequest with purpose, requested_fields, query
+        subject_ids: Resolved cohort subject ids
+        user: Authenticated user dict (user_id, role, org)
+        db: SQLAlchemy database session
+        request_id: Request ID for tracing
+    
+    Returns:
+        BulkAccessResult: groups with rewritten queries, plus denied subjects
+    
+    Raises:
+        HTTPException: If the query is invalid or policies cannot be fetched
+    """
+    
+    if not validate_query(request.query):
+        raise HTTPException(status_code=400, detail="Invalid query: Query must be a SELECT statement")
+    
+    subject_ids = list(dict.fromkeys(subject_ids))
+    
+    # STEP 1: Fetch all consent policies in one round trip
+    try:
+        policies, denied = fetch_compiled_policies(
+            db=db,
+            subject_ids=subject_ids,
+            purpose=request.purpose
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch consent policies: {str(e)}"
+        )
+    
+    # STEP 2: Bucket subjects by policy shape so each distinct policy is
+    # evaluated once
+    shapes: Dict[tuple, List[str]] = {}
+    for subject_id, compiled in policies.items():
+        key = (compiled.allowed_mask, compiled.denied_mask, _conditions_key(compiled.source))
+        shapes.setdefault(key, []).append(subject_id)
+    
+    # STEP 3: Evaluate each shape and merge shapes with the same outcome
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for (_, _, conditions_key), members in shapes.items():
+        compiled = policies[members[0]]
+        
+        policy_decision = evaluate_policy(compiled, request.requested_fields)
+        if policy_decision.decision == "DENY":
+            reason = f"Access denied: {'; '.join(policy_decision.justifications)}"
+            denied.update(dict.fromkeys(members, reason))
+            continue
+        
+        condition_decision = evaluate_conditions(
+            policy=compiled.source,
+            request_context={"study_id": request.study_id}
+        )
+        if condition_decision.decision == "DENY":
+            reason = f"Access denied: {'; '.join(condition_decision.justifications)}"
+            denied.update(dict.fromkeys(members, reason))
+            continue
+        
+        try:
+            # Fail closed on conditions we cannot enforce
+            compile_conditions(compiled.source)
+        except ValueError as e:
+            reason = f"Access denied: unenforceable consent condition: {str(e)}"
+            denied.update(dict.fromkeys(members, reason))
+            continue
+        
+        group_key = (
+            policy_decision.decision,
+            tuple(policy_decision.permitted_fields),
+            conditions_key,
+        )
+        group = merged.setdefault(group_key, {
+            "policy": compiled.source,
+            "subject_ids": [],
+            "justifications": [],
+        })
+        group["subject_ids"].extend(members)
+        for justification in policy_decision.justifications + condition_decision.justifications:
+            if justification not in group["justifications"]:
+                group["justifications"].append(justification)
+    
+    # STEP 4: One rewrite per group
+    groups: List[AccessGroup] = []
+    for (decision, permitted_fields, conditions_key), group in merged.items():
+        members = group["subject_ids"]
+        try:
+            pipeline = RewritePipeline([
+                RestrictScope(settings.queryable_tables_list, list(permitted_fields)),
+                ProjectFields(list(permitted_fields)),
+                InjectPredicate(settings.subject_column, members),
+            ])
+            for transform in compile_conditions(group["policy"], per_subject=True):
+                pipeline.add(transform)
+            rewritten_query = pipeline.run(request.query)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid query: {str(e)}"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to rewrite query: {str(e)}"
+            )
+        
+        group_id = hashlib.sha256(
+            f"{decision}|{','.join(permitted_fields)}|{conditions_key}".encode()
+        ).hexdigest()[:12]
+        groups.append(AccessGroup(
+            group_id=group_id,
+            decision=decision,
+            subject_ids=members,
+            permitted_fields=list(permitted_fields),
+            rewritten_query=rewritten_query,
+            justifications=group["justifications"]
+        ))
+    
+    groups.sort(key=lambda g: len(g.subject_ids), reverse=True)
+    return BulkAccessResult(groups=groups, denied=denied, request_id=request_id)
+
+
+def validate_access_request(request: Union[AccessRequest, BulkAccessRequest]) -> Optional[str]:
     """
     Validate access request before processing.
     
     Args:
-        request: AccessRequest to validate
+        request: AccessRequest or BulkAccessRequest to validate
     
     Returns:
         str: Error message if invalid, None if valid
     """
     
     # Check required fields
-    if not request.subject_id:
+    if isinstance(request, AccessRequest) and not request.subject_id:
         return "subject_id is required"
     
     if not request.purpose:
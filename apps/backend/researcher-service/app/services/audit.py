@@ -2,23 +2,65 @@
 STEP 11: Async Audit Emit
 
 Audit event emission without blocking request flow.
+
+Events go onto a bounded in-process queue; a background writer bulk-loads
+them into the append-only access_audit_events table (COPY with psycopg 3
+or psycopg2, multi-row INSERT elsewhere). Events that do not fit in the
+queue, or whose batch fails to write, are appended to a local spill file as
+JSON lines and loaded on the writer's next start; spilled lines that cannot
+be parsed are moved to a .rejected file next to it. Loading skips events
+already in the table, so a file loaded twice (a crash before it was removed,
+several workers sharing it) does no harm; workers also serialize on a file
+lock where fcntl is available.
 """
 
+import csv
+import io
 import json
 import logging
-from typing import Dict, Any, Optional
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime
 from uuid import uuid4
 
+try:
+    import fcntl
+except ImportError:  # Windows: the spill file is only guarded per process
+    fcntl = None
+
+from app.core.config import settings
+from app.database import engine
+from app.models.access_audit_event import AccessAuditEvent
+from app.utils.batch_writer import BatchWriter
+
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Column order for COPY / INSERT
+AUDIT_COLUMNS = (
+    "event_id",
+    "timestamp",
+    "event_type",
+    "user_id",
+    "subject_id",
+    "purpose",
+    "decision",
+    "organization",
+    "request_id",
+    "permitted_fields",
+    "justifications",
+)
+
 
 class AuditEvent:
     """Structured audit event."""
     
+    __slots__ = AUDIT_COLUMNS
+    
     def __init__(
         self,
         event_type: str,
@@ -46,7 +88,7 @@ class AuditEvent:
             justifications: Reasons for decision
         """
         self.event_id = str(uuid4())
-        self.timestamp = datetime.utcnow().isoformat()
+        self.timestamp = datetime.utcnow()
         self.event_type = event_type
         self.user_id = user_id
         self.subject_id = subject_id
@@ -61,7 +103,7 @@ class AuditEvent:
         """Convert to dictionary."""
         return {
             "event_id": self.event_id,
-            "timestamp": self.timestamp,
+            "timestamp": self.timestamp.isoformat(),
             "event_type": self.event_type,
             "user_id": self.user_id,
             "subject_id": self.subject_id,
@@ -72,6 +114,238 @@ class AuditEvent:
             "permitted_fields": self.permitted_fields,
             "justifications": self.justifications
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditEvent":
+        """Rebuild an event (e.g. from the spill file), keeping its id and time."""
+        event = cls.__new__(cls)
+        for name in AUDIT_COLUMNS:
+            setattr(event, name, data.get(name))
+        event.timestamp = datetime.fromisoformat(data["timestamp"])
+        return event
+
+
+# PostgreSQL drivers _copy_events knows how to drive
+_COPY_DRIVERS = ("psycopg", "psycopg2")
+
+
+def _copy_events(events: List[AuditEvent], skip_existing: bool = False) -> None:
+    """
+    Bulk-load events with COPY ... FROM STDIN (psycopg 3 or psycopg2).
+    
+    With skip_existing the rows are copied into a temporary staging table
+    and moved with INSERT ... ON CONFLICT DO NOTHING, since COPY itself
+    fails on a duplicate key.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for event in events:
+        writer.writerow([
+            event.event_id,
+            event.timestamp.isoformat(),
+            event.event_type,
+            event.user_id,
+            event.subject_id,
+            event.purpose,
+            event.decision,
+            event.organization,
+            event.request_id,
+            json.dumps(event.permitted_fields),
+            json.dumps(event.justifications),
+        ])
+    buffer.seek(0)
+    table = AccessAuditEvent.__tablename__
+    columns = ", ".join(AUDIT_COLUMNS)
+    target = "audit_events_staging" if skip_existing else table
+    statement = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            if skip_existing:
+                cursor.execute(
+                    f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+            if engine.dialect.driver == "psycopg":
+                with cursor.copy(statement) as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                cursor.copy_expert(statement, buffer)
+            if skip_existing:
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {target} "
+                    "ON CONFLICT DO NOTHING"
+                )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def write_events(events: List[AuditEvent], skip_existing: bool = False) -> None:
+    """
+    Persist a batch of audit events in one statement.
+    
+    Args:
+        events: Events to append to access_audit_events
+        skip_existing: Ignore events whose key is already stored (replays)
+    """
+    if engine.dialect.name == "postgresql" and engine.dialect.driver in _COPY_DRIVERS:
+        _copy_events(events, skip_existing)
+        return
+    
+    rows = [{name: getattr(event, name) for name in AUDIT_COLUMNS} for event in events]
+    statement = AccessAuditEvent.__table__.insert()
+    if skip_existing and engine.dialect.name in ("postgresql", "sqlite"):
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(AccessAuditEvent.__table__).on_conflict_do_nothing()
+    with engine.begin() as connection:
+        connection.execute(statement, rows)
+
+
+_spill_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an exclusive lock on `path` across processes (uvicorn workers).
+    
+    Yields whether the lock was acquired; always True without fcntl.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _spill_file_lock() -> Iterator[None]:
+    """Serialize appends to and renames of the spill file."""
+    with _spill_lock, _file_lock(f"{settings.audit_spill_path}.lock"):
+        yield
+
+
+def spill_events(events: List[AuditEvent]) -> None:
+    """
+    Append events that could not be queued or written to the spill file.
+    
+    Args:
+        events: Events to keep for a later load
+    """
+    lines = "".join(json.dumps(event.to_dict()) + "\n" for event in events)
+    with _spill_file_lock(), open(settings.audit_spill_path, "a", encoding="utf-8") as spill:
+        spill.write(lines)
+    logger.warning(f"Spilled {len(events)} audit events to {settings.audit_spill_path}")
+
+
+def _restore_spill(replay_path: str, path: str) -> None:
+    """Put an unfinished replay file back in front of the spill file."""
+    with _spill_file_lock():
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as newer:
+                spilled_meanwhile = newer.read()
+            with open(replay_path, "a", encoding="utf-8") as replay:
+                replay.write(spilled_meanwhile)
+        os.replace(replay_path, path)
+
+
+def load_spilled_events() -> int:
+    """
+    Write events from the spill file to the audit table.
+    
+    The file is renamed to .loading first, so events spilled meanwhile go to
+    a fresh file; events whose batch fails to write are spilled again, and
+    lines that do not parse are moved to .rejected. If loading stops
+    unexpectedly the .loading file is put back, and one left behind by an
+    interrupted run is loaded first.
+    
+    Only one process loads at a time (others return 0), and events already
+    in the table are skipped, so reloading a file after a crash between the
+    write and its removal does not fail on duplicate keys.
+    
+    Returns:
+        int: Number of events loaded (or found already loaded)
+    """
+    path = settings.audit_spill_path
+    replay_path = f"{path}.loading"
+    with _file_lock(f"{replay_path}.lock", blocking=False) as acquired:
+        if not acquired:
+            return 0
+        with _spill_file_lock():
+            if not os.path.exists(replay_path):
+                if not os.path.exists(path):
+                    return 0
+                os.replace(path, replay_path)
+        
+        try:
+            events: List[AuditEvent] = []
+            rejected: List[str] = []
+            with open(replay_path, encoding="utf-8") as spill:
+                for line in spill:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(AuditEvent.from_dict(json.loads(line)))
+                    except (ValueError, KeyError, TypeError):
+                        rejected.append(line if line.endswith("\n") else line + "\n")
+            if rejected:
+                with open(f"{path}.rejected", "a", encoding="utf-8") as quarantine:
+                    quarantine.writelines(rejected)
+                logger.error(f"Moved {len(rejected)} unreadable spilled audit events to {path}.rejected")
+            
+            loaded = 0
+            for start in range(0, len(events), settings.audit_batch_size):
+                batch = events[start:start + settings.audit_batch_size]
+                try:
+                    write_events(batch, skip_existing=True)
+                    loaded += len(batch)
+                except Exception as e:
+                    logger.error(f"Failed to load spilled audit events: {str(e)}")
+                    spill_events(events[start:])
+                    break
+        except BaseException:
+            _restore_spill(replay_path, path)
+            raise
+        os.remove(replay_path)
+        return loaded
+
+
+audit_writer: BatchWriter[AuditEvent] = BatchWriter(
+    name="audit-writer",
+    write_batch=write_events,
+    overflow=spill_events,
+    max_queue=settings.audit_queue_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval_seconds=settings.audit_flush_interval_seconds
+)
+
+
+def start_audit_writer() -> None:
+    """Load any spilled events, then start the background writer."""
+    try:
+        loaded = load_spilled_events()
+        if loaded:
+            logger.info(f"Loaded {loaded} spilled audit events")
+    except Exception as e:
+        logger.error(f"Failed to load spilled audit events: {str(e)}", exc_info=True)
+    audit_writer.start()
+
+
+def stop_audit_writer() -> None:
+    """Stop the background writer, writing (or spilling) what is queued."""
+    audit_writer.stop()
 
 
 def emit_event(event: AuditEvent) -> None:
@@ -80,20 +354,18 @@ def emit_event(event: AuditEvent) -> None:
     
     STEP 11: Async Audit Emit
     
-    For now, prints to stdout.
-    Can be extended to send to audit service asynchronously.
+    Queues the event for the background audit writer. If the writer is not
+    running (scripts, tests) the event is logged as a single JSON line.
     
     Args:
         event: AuditEvent to emit
     """
     
     try:
-        # Print to stdout (stdout is non-blocking)
-        event_json = json.dumps(event.to_dict(), indent=2)
-        print(f"[AUDIT] {event_json}")
-        
-        # Also log with logger
-        logger.info(f"Audit Event: {event.event_type} - {event.decision}")
+        if audit_writer.running:
+            audit_writer.submit(event)
+        else:
+            logger.info(f"[AUDIT] {json.dumps(event.to_dict())}")
     
     except Exception as e:
         # Never fail the request due to audit logging
@@ -113,7 +385,7 @@ def emit_event_async(event: AuditEvent) -> None:
         event: AuditEvent to emit
     """
     
-    # Simply call emit_event (can be extended for async HTTP calls)
+    # Queueing never blocks, so this is the same as emit_event
     emit_event(event)
 
 
@@ -5,12 +5,35 @@ Handles password hashing, JWT token generation, and user authentication.
 import bcrypt
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, NamedTuple, Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.models.researcher import Researcher
 from app.core.config import settings
+from app.utils.cache import ClaimsCache, LRUCache
+from app.utils.cache_invalidation import invalidation_bus
+
+
+class ResearcherPrincipal(NamedTuple):
+    """The researcher fields authenticated routes need, cacheable across requests."""
+    id: str
+    institution: Optional[str]
+    is_active: bool
+
+
+# Verified access token payloads, so a token presented repeatedly is only
+# signature-checked once
+_claims_cache = ClaimsCache(
+    maxsize=settings.auth_claims_cache_size,
+    ttl_seconds=settings.auth_claims_cache_ttl_seconds
+)
+
+# researcher_id -> ResearcherPrincipal
+_principal_cache = LRUCache(
+    maxsize=settings.principal_cache_size,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
 
 
 def hash_password(password: str) -> str:
@@ -37,7 +60,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Args:
         data: Payload data to encode in the token
         expires_delta: Optional custom expiration time
-        
+    
     Returns:
         Encoded JWT token string
     """
@@ -63,21 +86,28 @@ def decode_access_token(token: str) -> dict:
     """
     Decode and validate a JWT access token.
     
+    Successful decodes are cached until the token's expiry.
+    
     Args:
         token: JWT token string
-        
+    
     Returns:
         Decoded token payload
-        
+    
     Raises:
         HTTPException: If token is invalid or expired
     """
+    payload = _claims_cache.get_claims(token)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(
             token,
             settings.secret_key,
             algorithms=[settings.jwt_algorithm]
         )
+        _claims_cache.set_claims(token, payload, payload.get("exp"))
         return payload
     except JWTError as e:
         raise HTTPException(
@@ -87,6 +117,11 @@ def decode_access_token(token: str) -> dict:
         )
 
 
+def get_claims_cache_stats() -> Dict[str, Any]:
+    """Get decoded access token cache statistics."""
+    return _claims_cache.stats()
+
+
 def authenticate_researcher(db: Session, email: str, password: str) -> Optional[Researcher]:
     """
     Authenticate a researcher by email and password.
@@ -95,7 +130,7 @@ def authenticate_researcher(db: Session, email: str, password: str) -> Optional[
         db: Database session
         email: Researcher email
         password: Plain text password
-        
+    
     Returns:
         Researcher object if authentication successful, None otherwise
     """
@@ -113,29 +148,125 @@ def authenticate_researcher(db: Session, email: str, password: str) -> Optional[
     return researcher
 
 
+def _researcher_id_from_token(token: str) -> str:
+    """Decode a token and return its subject (researcher id)."""
+    payload = decode_access_token(token)
+    
+    researcher_id: str = payload.get("sub")
+    if researcher_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return researcher_id
+
+
+def _ensure_active(researcher) -> None:
+    """Reject deactivated accounts (researcher row or principal)."""
+    if not researcher.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Researcher account is inactive",
+        )
+
+
+def get_current_principal(db: Session, token: str) -> ResearcherPrincipal:
+    """
+    Get the authenticated researcher's principal from a JWT token.
+    
+    Principals are cached briefly per researcher, so a warm request needs
+    neither signature verification (see decode_access_token) nor a database
+    round trip. The cache is invalidated when a profile is updated or an
+    account deactivated.
+    
+    Args:
+        db: Database session
+        token: JWT access token
+    
+    Returns:
+        ResearcherPrincipal (id, institution, is_active)
+    
+    Raises:
+        HTTPException: If token is invalid, researcher not found or inactive
+    """
+    researcher_id = _researcher_id_from_token(token)
+    
+    principal = _principal_cache.get(researcher_id)
+    if principal is None:
+        row = db.query(
+            Researcher.id,
+            Researcher.institution,
+            Researcher.is_active
+        ).filter(Researcher.id == researcher_id).first()
+        
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Researcher not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        principal = ResearcherPrincipal(row.id, row.institution, row.is_active)
+        _principal_cache.set(researcher_id, principal)
+    
+    _ensure_active(principal)
+    return principal
+
+
+def _drop_researcher(researcher_id: str) -> None:
+    """Drop a researcher's cached principal and token claims in this worker."""
+    _principal_cache.pop(researcher_id)
+    _claims_cache.evict_where(lambda claims: claims.get("sub") == researcher_id)
+
+
+def _clear_researchers() -> None:
+    """Drop every cached principal and token claim (after missed invalidations)."""
+    _principal_cache.clear()
+    _claims_cache.clear()
+
+
+def invalidate_principal(researcher_id: str) -> None:
+    """
+    Drop a researcher's cached principal and the cached claims of their
+    tokens (call after changing the row, e.g. on deactivation).
+    
+    The invalidation is also broadcast to the other workers.
+    """
+    _drop_researcher(researcher_id)
+    invalidation_bus.publish("principal", {"researcher_id": researcher_id})
+
+
+invalidation_bus.register(
+    "principal",
+    lambda payload: _drop_researcher(payload["researcher_id"]),
+    _clear_researchers,
+)
+
+
+def get_principal_cache_stats() -> Dict[str, Any]:
+    """Get researcher principal cache statistics."""
+    return _principal_cache.stats()
+
+
 def get_current_researcher(db: Session, token: str) -> Researcher:
     """
     Get the current authenticated researcher from a JWT token.
     
+    Loads the full row; routes that only need the id/institution should
+    use get_current_principal instead.
+    
     Args:
         db: Database session
         token: JWT access token
-        
+    
     Returns:
         Researcher object
-        
+    
     Raises:
         HTTPException: If token is invalid or researcher not found
     """
-    payload = decode_access_token(token)
-    
-    researcher_id: str = payload.get("sub")
-    if researcher_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    researcher_id = _researcher_id_from_token(token)
     
     researcher = db.query(Researcher).filter(Researcher.id == researcher_id).first()
     
@@ -146,11 +277,6 @@ def get_current_researcher(db: Session, token: str) -> Researcher:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not researcher.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Researcher account is inactive",
-        )
-    
+    _ensure_active(researcher)
     return researcher
 
@@ -0,0 +1,170 @@
+"""
+Consented Cohort Service
+
+Maintains the consented_cohort table: the set of subjects with a usable
+consent (unexpired, confidence >= 0.85) per purpose.
+
+The set is updated incrementally when consents are replicated, changed or
+revoked (refresh_consented_subjects), expired rows are swept periodically
+(expire_consented_subjects), and rebuild_consented_cohort recomputes it
+from consent_policies in one statement.
+
+The rebuild and sweep run in the consent replicator, so the table is only
+kept current while consent_replication_enabled is set; otherwise readers
+fall back to consent_policies.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.consent_policy import ConsentPolicy
+from app.models.consented_cohort import ConsentedSubject
+from app.services.policy_service import CONFIDENCE_THRESHOLD
+from app.utils.cache import LRUCache
+
+
+# purpose (or None for all purposes) -> {purpose: size}
+_cohort_sizes = LRUCache(maxsize=64, ttl_seconds=30)
+
+
+def _usable_policies(now: datetime):
+    """SELECT purpose, subject_id, max(expires_at) over usable consent policies."""
+    return (
+        select(
+            ConsentPolicy.purpose,
+            ConsentPolicy.subject_id,
+            func.max(ConsentPolicy.expires_at).label("expires_at"),
+        )
+        .where(
+            ConsentPolicy.confidence_score >= CONFIDENCE_THRESHOLD,
+            ConsentPolicy.expires_at > now,
+        )
+        .group_by(ConsentPolicy.purpose, ConsentPolicy.subject_id)
+    )
+
+
+def refresh_consented_subjects(
+    db: Session,
+    subject_ids: Iterable[str],
+    purpose: Optional[str] = None
+) -> int:
+    """
+    Recompute cohort membership for specific subjects.
+    
+    Call after a subject's consent policies are added, changed or revoked.
+    
+    Args:
+        db: Database session
+        subject_ids: Subjects whose consent changed
+        purpose: Only refresh this purpose (None = all purposes)
+    
+    Returns:
+        int: Number of (purpose, subject) memberships after the refresh
+    """
+    subject_ids = list(set(subject_ids))
+    if not subject_ids:
+        return 0
+    
+    now = datetime.utcnow()
+    stale = db.query(ConsentedSubject).filter(ConsentedSubject.subject_id.in_(subject_ids))
+    usable = _usable_policies(now).where(ConsentPolicy.subject_id.in_(subject_ids))
+    if purpose is not None:
+        stale = stale.filter(ConsentedSubject.purpose == purpose)
+        usable = usable.where(ConsentPolicy.purpose == purpose)
+    
+    stale.delete(synchronize_session=False)
+    result = db.execute(
+        insert(ConsentedSubject).from_select(["purpose", "subject_id", "expires_at"], usable)
+    )
+    db.commit()
+    
+    _cohort_sizes.clear()
+    return result.rowcount
+
+
+def expire_consented_subjects(db: Session) -> int:
+    """
+    Remove memberships whose consent has expired.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        int: Number of memberships removed
+    """
+    removed = db.query(ConsentedSubject).filter(
+        ConsentedSubject.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    
+    if removed:
+        _cohort_sizes.clear()
+    return removed
+
+
+def rebuild_consented_cohort(db: Session) -> int:
+    """
+    Recompute the whole consented cohort from consent_policies.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        int: Number of memberships
+    """
+    db.query(ConsentedSubject).delete(synchronize_session=False)
+    result = db.execute(
+        insert(ConsentedSubject).from_select(
+            ["purpose", "subject_id", "expires_at"],
+            _usable_policies(datetime.utcnow())
+        )
+    )
+    db.commit()
+    
+    _cohort_sizes.clear()
+    return result.rowcount
+
+
+def get_cohort_sizes(db: Session, purpose: Optional[str] = None) -> Dict[str, int]:
+    """
+    Get the number of consented subjects per purpose.
+    
+    Counts are cached briefly and reset whenever membership changes.
+    Without consent replication they are counted from consent_policies.
+    
+    Args:
+        db: Database session
+        purpose: Only count this purpose (None = all purposes)
+    
+    Returns:
+        dict: purpose -> number of consented subjects
+    """
+    sizes = _cohort_sizes.get(purpose)
+    if sizes is not None:
+        return sizes
+    
+    now = datetime.utcnow()
+    if settings.consent_replication_enabled:
+        query = db.query(ConsentedSubject.purpose, func.count()).filter(
+            ConsentedSubject.expires_at > now
+        )
+        if purpose is not None:
+            query = query.filter(ConsentedSubject.purpose == purpose)
+        sizes = dict(query.group_by(ConsentedSubject.purpose).all())
+    else:
+        usable = _usable_policies(now)
+        if purpose is not None:
+            usable = usable.where(ConsentPolicy.purpose == purpose)
+        usable = usable.subquery()
+        sizes = dict(db.execute(
+            select(usable.c.purpose, func.count()).group_by(usable.c.purpose)
+        ).all())
+    if purpose is not None:
+        sizes.setdefault(purpose, 0)
+    
+    _cohort_sizes.set(purpose, sizes)
+    return sizes
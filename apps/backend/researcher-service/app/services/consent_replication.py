@@ -0,0 +1,452 @@
+"""
+Consent Replication Service
+
+Keeps consent_policies in sync with the consents/consent_versions tables
+written by consent-ingestion, so policy reads stay local.
+
+New ConsentVersion rows are tailed by a (created_at, id) watermark,
+transformed from extracted_policy into ConsentPolicy rows (one per
+consent and purpose) and upserted in batches.
+
+A version whose extracted_policy is still empty is pending interpretation:
+the watermark stops before it until it is filled in, superseded by a newer
+version of the same consent, or older than the pending timeout.
+
+Revocation updates consents.status without writing a version, so status
+changes are tailed separately by a (consents.updated_at, id) watermark; a
+consent that is no longer active has its replicated policies expired.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import JSON, DateTime, String, cast, column, create_engine, select, table, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal, engine
+from app.models.consent_policy import ConsentPolicy
+from app.models.replication_state import ReplicationState
+from app.services import cohort_service, policy_service
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_NAME = "consent_versions"
+STATUS_STREAM_NAME = "consent_status"
+
+# consent-intelligence purpose labels -> access request purposes
+PURPOSE_MAP = {
+    "care": "TREATMENT",
+    "treatment": "TREATMENT",
+    "research": "RESEARCH",
+    "public_health": "PUBLIC_HEALTH",
+}
+
+# consent-intelligence condition labels -> policy_json conditions
+CONDITION_MAP = {
+    "anonymized_only": ("anonymization_required", True),
+    "anonymised_only": ("anonymization_required", True),
+    "aggregated_only": ("aggregation_level", "count"),
+}
+
+# Source tables (owned by consent-ingestion; declared here without models
+# to avoid coupling to that service's code)
+_consents = table(
+    "consents",
+    column("id"),
+    column("patient_id"),
+    column("status"),
+    column("confidence_score"),
+    column("updated_at", DateTime),
+)
+_consent_versions = table(
+    "consent_versions",
+    column("id"),
+    column("consent_id"),
+    column("version_number"),
+    column("extracted_policy", JSON),
+    column("valid_to", DateTime),
+    column("created_at", DateTime),
+)
+
+
+def _parse_expiry(value: Any) -> Optional[datetime]:
+    """Parse an ISO date/datetime expiry, ignoring unparseable values."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    return parsed
+
+
+def transform_version(version: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+    """
+    Transform a consent version into ConsentPolicy rows.
+    
+    One row per mapped purpose, with id "<consent_id>:<PURPOSE>" so newer
+    versions of the same consent overwrite older ones. Consents that are
+    no longer active are emitted already expired.
+    
+    Args:
+        version: Joined consent_versions/consents row (consent_id,
+            patient_id, status, confidence_score, extracted_policy,
+            valid_to, created_at)
+        now: Replication time
+    
+    Returns:
+        List of ConsentPolicy column dicts (empty if nothing to replicate)
+    """
+    
+    extracted = version.get("extracted_policy") or {}
+    if not extracted:
+        # Interpretation failed or never ran
+        return []
+    
+    conditions: Dict[str, Any] = {}
+    unmapped = []
+    for label in extracted.get("conditions") or []:
+        mapped = CONDITION_MAP.get(str(label).lower())
+        if mapped:
+            conditions[mapped[0]] = mapped[1]
+        else:
+            unmapped.append(label)
+    
+    policy_json = {
+        "allowed_fields": list(extracted.get("allowed_data") or []),
+        "denied_fields": list(extracted.get("denied_data") or []),
+        "conditions": conditions,
+    }
+    if unmapped:
+        policy_json["unmapped_conditions"] = unmapped
+    if extracted.get("ambiguity_flags"):
+        policy_json["ambiguity_flags"] = list(extracted["ambiguity_flags"])
+    
+    expires_at = (
+        _parse_expiry(extracted.get("expiry"))
+        or version.get("valid_to")
+        or (version.get("created_at") or now) + timedelta(days=settings.replicated_policy_default_days)
+    )
+    if version.get("status") != "active":
+        expires_at = min(expires_at, now)
+    
+    confidence = version.get("confidence_score")
+    purposes = {
+        PURPOSE_MAP[str(p).lower()]
+        for p in extracted.get("purpose") or []
+        if str(p).lower() in PURPOSE_MAP
+    }
+    
+    return [
+        {
+            "id": f"{version['consent_id']}:{purpose}",
+            "subject_id": str(version["patient_id"]),
+            "purpose": purpose,
+            "policy_json": policy_json,
+            "confidence_score": float(confidence) if confidence is not None else 0.0,
+            "expires_at": expires_at,
+        }
+        for purpose in sorted(purposes)
+    ]
+
+
+class ConsentReplicator:
+    """Incremental consent_versions -> consent_policies replication."""
+    
+    def __init__(
+        self,
+        source_engine: Optional[Engine] = None,
+        batch_size: Optional[int] = None,
+        settle_seconds: Optional[int] = None,
+        interval_seconds: Optional[float] = None,
+        pending_timeout_seconds: Optional[int] = None
+    ):
+        """
+        Initialize replicator.
+        
+        Args:
+            source_engine: Engine for the consent-ingestion tables
+                (default: consent_source_database_url, else this service's engine)
+            batch_size: Versions applied per batch
+            settle_seconds: Minimum age of a version before it is replicated
+            interval_seconds: Poll interval once caught up
+            pending_timeout_seconds: Age after which a version still
+                missing extracted_policy no longer holds back the watermark
+        """
+        if source_engine is None:
+            source_engine = (
+                create_engine(settings.consent_source_database_url, pool_size=2)
+                if settings.consent_source_database_url
+                else engine
+            )
+        self.source_engine = source_engine
+        self.batch_size = batch_size or settings.consent_replication_batch_size
+        self.settle_seconds = (
+            settings.consent_replication_settle_seconds if settle_seconds is None else settle_seconds
+        )
+        self.interval_seconds = interval_seconds or settings.consent_replication_interval_seconds
+        self.pending_timeout_seconds = (
+            settings.consent_replication_pending_timeout_seconds
+            if pending_timeout_seconds is None
+            else pending_timeout_seconds
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _fetch_versions(
+        self,
+        watermark: Tuple[Optional[datetime], Optional[str]],
+        now: datetime
+    ) -> List[Dict[str, Any]]:
+        """Read the next batch of settled versions after the watermark."""
+        v, c = _consent_versions.c, _consents.c
+        version_id = cast(v.id, String)
+        query = (
+            select(
+                version_id.label("id"),
+                cast(v.consent_id, String).label("consent_id"),
+                v.version_number,
+                v.extracted_policy,
+                v.valid_to,
+                v.created_at,
+                cast(c.patient_id, String).label("patient_id"),
+                c.status,
+                c.confidence_score,
+            )
+            .select_from(_consent_versions.join(_consents, c.id == v.consent_id))
+            .where(v.created_at <= now - timedelta(seconds=self.settle_seconds))
+            .order_by(v.created_at, version_id)
+            .limit(self.batch_size)
+        )
+        if watermark[0] is not None:
+            query = query.where(tuple_(v.created_at, version_id) > tuple_(*watermark))
+        
+        with self.source_engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(query)]
+    
+    def _settled_prefix(
+        self,
+        versions: List[Dict[str, Any]],
+        now: datetime
+    ) -> List[Dict[str, Any]]:
+        """
+        Versions the watermark may move past: everything before the first
+        pending version (no extracted_policy yet) that is neither superseded
+        within the batch nor past the pending timeout.
+        """
+        last_index = {version["consent_id"]: i for i, version in enumerate(versions)}
+        give_up_before = now - timedelta(seconds=self.pending_timeout_seconds)
+        for i, version in enumerate(versions):
+            if version.get("extracted_policy") or last_index[version["consent_id"]] > i:
+                continue
+            if version["created_at"] > give_up_before:
+                return versions[:i]
+            logger.warning(
+                f"Consent version {version['id']} has no extracted_policy after "
+                f"{self.pending_timeout_seconds}s; skipping it"
+            )
+        return versions
+    
+    def _upsert(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Insert or update policy rows in one statement where supported."""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in rows:
+                db.merge(ConsentPolicy(**row))
+            return
+        
+        stmt = insert(ConsentPolicy.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                name: stmt.excluded[name]
+                for name in ("subject_id", "purpose", "policy_json", "confidence_score", "expires_at")
+            },
+        )
+        db.execute(stmt)
+    
+    def run_once(self, db: Session) -> int:
+        """
+        Apply one batch of new consent versions.
+        
+        Args:
+            db: Session on this service's database
+        
+        Returns:
+            int: Number of consent versions consumed
+        """
+        
+        state = db.get(ReplicationState, STREAM_NAME) or ReplicationState(name=STREAM_NAME)
+        now = datetime.utcnow()
+        versions = self._settled_prefix(
+            self._fetch_versions((state.watermark_created_at, state.watermark_id), now),
+            now
+        )
+        if not versions:
+            return 0
+        
+        # Latest version per consent wins; versions arrive in created_at order
+        latest: Dict[str, Dict[str, Any]] = {}
+        for version in versions:
+            latest[version["consent_id"]] = version
+        
+        rows: Dict[str, Dict[str, Any]] = {}
+        for consent_id, version in latest.items():
+            new_rows = transform_version(version, now)
+            if not new_rows and not version.get("extracted_policy"):
+                continue
+            for row in new_rows:
+                rows[row["id"]] = row
+            
+            # Purposes dropped by the new version no longer apply
+            kept = [row["id"] for row in new_rows]
+            db.query(ConsentPolicy).filter(
+                ConsentPolicy.id.like(f"{consent_id}:%"),
+                ConsentPolicy.id.notin_(kept),
+                ConsentPolicy.expires_at > now,
+            ).update({ConsentPolicy.expires_at: now}, synchronize_session=False)
+        
+        if rows:
+            self._upsert(db, list(rows.values()))
+        
+        last = versions[-1]
+        state.watermark_created_at = last["created_at"]
+        state.watermark_id = last["id"]
+        db.merge(state)
+        db.commit()
+        
+        subjects = {str(version["patient_id"]) for version in latest.values()}
+        for subject_id in subjects:
+            policy_service.invalidate_consent_policy(subject_id)
+        cohort_service.refresh_consented_subjects(db, subjects)
+        
+        logger.info(f"Replicated {len(versions)} consent versions ({len(rows)} policies)")
+        return len(versions)
+    
+    def _fetch_status_changes(
+        self,
+        watermark: Tuple[Optional[datetime], Optional[str]]
+    ) -> List[Dict[str, Any]]:
+        """Read the next batch of consents that stopped being active after the watermark."""
+        c = _consents.c
+        consent_id = cast(c.id, String)
+        query = (
+            select(
+                consent_id.label("id"),
+                cast(c.patient_id, String).label("patient_id"),
+                c.status,
+                c.updated_at,
+            )
+            .where(c.status != "active", c.updated_at.is_not(None))
+            .order_by(c.updated_at, consent_id)
+            .limit(self.batch_size)
+        )
+        if watermark[0] is not None:
+            query = query.where(tuple_(c.updated_at, consent_id) > tuple_(*watermark))
+        
+        with self.source_engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(query)]
+    
+    def run_status_once(self, db: Session) -> int:
+        """
+        Expire the policies of one batch of revoked or expired consents.
+        
+        Args:
+            db: Session on this service's database
+        
+        Returns:
+            int: Number of consent status changes consumed
+        """
+        
+        state = db.get(ReplicationState, STATUS_STREAM_NAME) or ReplicationState(name=STATUS_STREAM_NAME)
+        changes = self._fetch_status_changes((state.watermark_created_at, state.watermark_id))
+        if not changes:
+            return 0
+        
+        now = datetime.utcnow()
+        subjects = set()
+        for change in changes:
+            expired = db.query(ConsentPolicy).filter(
+                ConsentPolicy.id.like(f"{change['id']}:%"),
+                ConsentPolicy.expires_at > now,
+            ).update({ConsentPolicy.expires_at: now}, synchronize_session=False)
+            if expired:
+                subjects.add(change["patient_id"])
+        
+        last = changes[-1]
+        state.watermark_created_at = last["updated_at"]
+        state.watermark_id = last["id"]
+        db.merge(state)
+        db.commit()
+        
+        for subject_id in subjects:
+            policy_service.invalidate_consent_policy(subject_id)
+        cohort_service.refresh_consented_subjects(db, subjects)
+        
+        logger.info(f"Replicated {len(changes)} consent status changes ({len(subjects)} subjects revoked)")
+        return len(changes)
+    
+    def run_until_caught_up(self) -> int:
+        """Apply batches until no settled versions or status changes remain."""
+        total = 0
+        for step in (self.run_once, self.run_status_once):
+            while not self._stop.is_set():
+                db = SessionLocal()
+                try:
+                    applied = step(db)
+                finally:
+                    db.close()
+                total += applied
+                if applied < self.batch_size:
+                    break
+        return total
+    
+    def _sweep(self, rebuild: bool = False) -> None:
+        """Rebuild the consented cohort, or drop expired memberships."""
+        db = SessionLocal()
+        try:
+            if rebuild:
+                cohort_service.rebuild_consented_cohort(db)
+            else:
+                cohort_service.expire_consented_subjects(db)
+        finally:
+            db.close()
+    
+    def _loop(self) -> None:
+        rebuilt = False
+        while not self._stop.is_set():
+            try:
+                self.run_until_caught_up()
+                self._sweep(rebuild=not rebuilt)
+                rebuilt = True
+            except Exception as e:
+                logger.error(f"Consent replication failed: {str(e)}", exc_info=True)
+            self._stop.wait(self.interval_seconds)
+    
+    def start(self) -> None:
+        """Start the background replication thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="consent-replication", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background replication thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
@@ -3,15 +3,26 @@ Data access service for managing researcher data access requests
 and querying consent-aware patient data.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import json
 import uuid
 
+from app.core.config import settings
+from app.database import engine
 from app.models.data_access_request import DataAccessRequest, AccessStatus
 from app.schemas.data_access import DataAccessRequestCreate, ConsentAwareDataQuery
 from app.services.auth_service import create_access_token
+from app.services.policy_service import CONFIDENCE_THRESHOLD
+
+# Arrow output is optional; NDJSON is always available
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
 
 def create_access_request(
@@ -138,33 +149,46 @@ def query_consent_aware_data(
         )
     
     # Query consent-aware data
-    # For prototype: Query patient_records table with consent filtering
-    # In production, this would:
-    # 1. Join with consent_policies table
-    # 2. Filter by consent.purpose matching query.purpose
-    # 3. Only return fields in access_request.permitted_fields
-    # 4. Apply additional filters from query.filters
+    # With replication running, patients are restricted to the materialized
+    # consented cohort for this purpose (see cohort_service), so the consent
+    # check is an index join. The cohort is only maintained by the
+    # replicator, so otherwise consent_policies is checked directly.
     
     try:
         # Build dynamic query based on permitted fields
-        permitted_fields_str = ", ".join([f'"{field}"' for field in access_request.permitted_fields])
-        
-        # Base query: Get patient records where consent exists for this purpose
-        sql_query = text(f"""
-            SELECT {permitted_fields_str}
-            FROM patient_records pr
-            WHERE EXISTS (
-                SELECT 1 FROM consent_policies cp
-                WHERE cp.patient_id = pr.patient_id
-                AND cp.purpose = :purpose
-                AND cp.status = 'active'
-            )
-            LIMIT :limit
-        """)
+        permitted_fields_str = ", ".join([f'pr."{field}"' for field in access_request.permitted_fields])
+        
+        if settings.consent_replication_enabled:
+            sql_query = text(f"""
+                SELECT {permitted_fields_str}
+                FROM consented_cohort cc
+                JOIN patient_records pr ON pr.patient_id = cc.subject_id
+                WHERE cc.purpose = :purpose
+                AND cc.expires_at > :now
+                LIMIT :limit
+            """)
+        else:
+            sql_query = text(f"""
+                SELECT {permitted_fields_str}
+                FROM patient_records pr
+                WHERE EXISTS (
+                    SELECT 1 FROM consent_policies cp
+                    WHERE cp.subject_id = pr.patient_id
+                    AND cp.purpose = :purpose
+                    AND cp.expires_at > :now
+                    AND cp.confidence_score >= :threshold
+                )
+                LIMIT :limit
+            """)
         
         result = db.execute(
             sql_query,
-            {"purpose": query.purpose, "limit": query.limit}
+            {
+                "purpose": query.purpose,
+                "now": datetime.utcnow(),
+                "threshold": CONFIDENCE_THRESHOLD,
+                "limit": query.limit,
+            }
         )
         
         # Convert to list of dictionaries
@@ -193,3 +217,154 @@ def query_consent_aware_data(
             "message": "No data available yet. Consent policies and patient records will be populated.",
             "error": str(e)
         }
+
+
+_query_engine: Optional[Engine] = None
+
+
+def get_query_engine() -> Engine:
+    """Engine for researcher queries: settings.query_database_url, or the main database."""
+    global _query_engine
+    if _query_engine is None:
+        _query_engine = (
+            create_engine(settings.query_database_url, pool_pre_ping=True)
+            if settings.query_database_url else engine
+        )
+    return _query_engine
+
+
+def iter_query_batches(
+    sql: str,
+    batch_size: int = 1000,
+    key_alias: Optional[str] = None
+) -> Iterator[Tuple[List[Dict[str, Any]], Any]]:
+    """
+    Execute a rewritten query through a server-side cursor.
+    
+    Rows are fetched batch_size at a time (psycopg2 named cursor via
+    stream_results), so memory stays bounded regardless of result size.
+    The connection is private to the stream. On PostgreSQL the transaction
+    is read-only, runs as settings.query_role when set and is cancelled
+    after settings.query_statement_timeout_ms.
+    
+    Args:
+        sql: Rewritten, policy-validated SELECT
+        batch_size: Rows per batch
+        key_alias: Projected keyset column to strip from rows
+        
+    Yields:
+        Tuple of (rows, last_key) where last_key is the key of the final row
+    """
+    with get_query_engine().connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.query_statement_timeout_ms)}")
+            if settings.query_role:
+                role = conn.dialect.identifier_preparer.quote(settings.query_role)
+                conn.exec_driver_sql(f"SET LOCAL ROLE {role}")
+        
+        result = conn.execution_options(
+            stream_results=True,
+            max_row_buffer=batch_size
+        ).exec_driver_sql(sql)
+        columns = list(result.keys())
+        
+        for partition in result.partitions(batch_size):
+            rows = [dict(zip(columns, row)) for row in partition]
+            last_key = None
+            if key_alias:
+                for row in rows:
+                    last_key = row.pop(key_alias, None)
+            yield rows, last_key
+
+
+def encode_ndjson(
+    batches: Iterable[Tuple[List[Dict[str, Any]], Optional[str]]]
+) -> Iterator[bytes]:
+    """
+    Encode row batches as NDJSON.
+    
+    Each batch is followed by a {"_checkpoint": cursor} line when the stream
+    is resumable; the stream ends with {"_done": true, "record_count": n}.
+    
+    Args:
+        batches: Iterable of (rows, checkpoint cursor or None)
+        
+    Yields:
+        Encoded chunks, one per batch
+    """
+    record_count = 0
+    for rows, checkpoint in batches:
+        record_count += len(rows)
+        lines = [json.dumps(row, default=str) for row in rows]
+        if checkpoint:
+            lines.append(json.dumps({"_checkpoint": checkpoint}))
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+    
+    yield (json.dumps({"_done": True, "record_count": record_count}) + "\n").encode()
+
+
+class _ChunkSink:
+    """Minimal writable file object collecting Arrow IPC output."""
+    
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def encode_arrow(
+    batches: Iterable[Tuple[List[Dict[str, Any]], Optional[str]]]
+) -> Iterator[bytes]:
+    """
+    Encode row batches as an Arrow IPC stream.
+    
+    The schema is taken from the first batch; checkpoint cursors are attached
+    to each record batch as custom metadata.
+    
+    Args:
+        batches: Iterable of (rows, checkpoint cursor or None)
+        
+    Yields:
+        Encoded IPC chunks, one per batch
+        
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if pa is None:
+        raise RuntimeError("Arrow output requires pyarrow")
+    
+    sink = _ChunkSink()
+    writer = None
+    schema = None
+    
+    for rows, checkpoint in batches:
+        if not rows:
+            continue
+        if writer is None:
+            schema = pa.RecordBatch.from_pylist(rows).schema
+            writer = pa.ipc.new_stream(sink, schema)
+        batch = pa.RecordBatch.from_pylist(rows, schema=schema)
+        metadata = {"checkpoint": checkpoint} if checkpoint else None
+        writer.write_batch(batch, custom_metadata=metadata)
+        yield sink.drain()
+    
+    if writer is None:
+        writer = pa.ipc.new_stream(sink, pa.schema([]))
+    writer.close()
+    yield sink.drain()
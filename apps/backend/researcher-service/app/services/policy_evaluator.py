@@ -5,8 +5,25 @@ Pure functional evaluation of access decisions.
 No database access, no side effects.
 """
 
-from typing import Dict, List, Any, Set
-from pydantic import BaseModel
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.services.query_rewriter import QueryTransform, TimeWindow, Aggregate, EnforceLimit, SubjectLimit
+from app.utils.cache import LRUCache
+
+
+# Relative time windows: "30d", "12w", "1y" or ISO-8601 durations such as "P1Y6M"
+_RELATIVE_WINDOW_RE = re.compile(r"^(\d+)\s*([dwmy])$", re.IGNORECASE)
+_ISO_DURATION_RE = re.compile(r"^P(?:(\d+)Y)?(?:(\d+)M)?(?:(\d+)W)?(?:(\d+)D)?$", re.IGNORECASE)
+_UNIT_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+# aggregation_level values that mean "counts only, no grouping columns"
+_COUNT_ONLY_LEVELS = {"cohort", "count", "aggregate", "total"}
 
 
 class PolicyDecision(BaseModel):
@@ -16,74 +33,238 @@ class PolicyDecision(BaseModel):
     decision: DENY, PARTIAL_ALLOW, or ALLOW
     permitted_fields: List of fields allowed for access
     justifications: List of reasons for decision
+    
+    Decisions produced by compiled policies are memoized and shared, so
+    instances are frozen.
     """
+    model_config = ConfigDict(frozen=True)
+    
     decision: str  # DENY, PARTIAL_ALLOW, ALLOW
     permitted_fields: List[str]
     justifications: List[str]
 
 
-def evaluate_policy(
-    policy: Dict[str, Any],
-    requested_fields: List[str]
-) -> PolicyDecision:
+class FieldDictionaryFull(RuntimeError):
+    """Raised when a policy names more distinct fields than the dictionary holds."""
+
+
+class FieldDictionary:
     """
-    Evaluate consent policy against requested fields.
+    Per-deployment field name -> bit index mapping.
     
-    STEP 6: Clause-Level Policy Evaluation
+    Field sets become integer bitmasks, so policy evaluation is a handful
+    of integer operations instead of set construction. Only compiled
+    policies assign bits; requested field names are looked up, so request
+    input cannot grow the dictionary.
+    """
     
-    Logic:
-    1. Find intersection of requested_fields and allowed_fields
-    2. Check for denied_fields conflicts
-    3. Build decision with justifications
+    def __init__(self, max_fields: int = 4096):
+        self.max_fields = max_fields
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
     
-    Args:
-        policy: Consent policy dict with allowed_fields, denied_fields
-        requested_fields: List of fields being requested
+    def bit(self, field: str) -> Optional[int]:
+        """Get the bit for a field; None if no compiled policy names it."""
+        index = self._index.get(field)
+        return None if index is None else 1 << index
     
-    Returns:
-        PolicyDecision: decision, permitted_fields, justifications
+    def assign(self, field: str) -> int:
+        """
+        Get the bit for a field named by a policy, assigning one if needed.
+        
+        Raises:
+            FieldDictionaryFull: If the dictionary has no free bits
+        """
+        index = self._index.get(field)
+        if index is not None:
+            return 1 << index
+        with self._lock:
+            index = self._index.get(field)
+            if index is None:
+                if len(self._names) >= self.max_fields:
+                    raise FieldDictionaryFull(
+                        f"Field dictionary full ({self.max_fields} fields); cannot index {field!r}"
+                    )
+                index = len(self._names)
+                self._names.append(field)
+                self._index[field] = index
+        return 1 << index
+    
+    def mask(self, fields: Iterable[str], assign: bool = False) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Build a bitmask for a field collection.
+        
+        Args:
+            fields: Field names
+            assign: Assign bits to new names (policy fields only)
+        
+        Returns:
+            Tuple of (mask, unknown) where unknown holds names no compiled
+            policy mentions (always empty when assigning)
+        
+        Raises:
+            FieldDictionaryFull: If assigning and the dictionary is full
+        """
+        mask = 0
+        unknown = []
+        for field in fields:
+            bit = self.assign(field) if assign else self.bit(field)
+            if bit is None:
+                unknown.append(field)
+            else:
+                mask |= bit
+        return mask, tuple(sorted(set(unknown)))
+    
+    def names(self, mask: int) -> List[str]:
+        """Expand a bitmask back to field names (index order)."""
+        names = []
+        while mask:
+            low = mask & -mask
+            names.append(self._names[low.bit_length() - 1])
+            mask ^= low
+        return names
+
+
+# Shared field dictionary for this deployment
+field_dictionary = FieldDictionary()
+
+
+class CompiledPolicy:
     """
+    Bitmask form of a consent policy.
+    
+    allowed_mask / denied_mask index into field_dictionary; decisions are
+    memoized per requested mask, so repeat evaluations are a dict lookup.
+    """
+    
+    __slots__ = ("source", "allowed_mask", "denied_mask", "_decisions")
     
-    # Extract field lists from policy
-    allowed_fields = set(policy.get("allowed_fields", []))
-    denied_fields = set(policy.get("denied_fields", []))
-    requested_set = set(requested_fields)
+    # Bound on memoized decisions per policy
+    MAX_DECISIONS = 256
+    
+    def __init__(self, source: Dict[str, Any]):
+        self.source = source
+        self.allowed_mask, _ = field_dictionary.mask(source.get("allowed_fields", []), assign=True)
+        self.denied_mask, _ = field_dictionary.mask(source.get("denied_fields", []), assign=True)
+        self._decisions: Dict[int, PolicyDecision] = {}
+    
+    def decide(self, requested_fields: List[str]) -> PolicyDecision:
+        """Evaluate requested fields against the compiled masks."""
+        requested_mask, unknown = field_dictionary.mask(requested_fields)
+        if unknown:
+            # Names no policy mentions can never be allowed; evaluate
+            # without memoizing
+            return _decide(self.allowed_mask, self.denied_mask, requested_mask, unknown)
+        
+        decision = self._decisions.get(requested_mask)
+        if decision is None:
+            decision = _decide(self.allowed_mask, self.denied_mask, requested_mask, ())
+            if len(self._decisions) < self.MAX_DECISIONS:
+                self._decisions[requested_mask] = decision
+        return decision
+
+
+def _decide(
+    allowed_mask: int,
+    denied_mask: int,
+    requested_mask: int,
+    unknown: Tuple[str, ...]
+) -> PolicyDecision:
+    """Decision logic over bitmasks (unknown names count as rejected)."""
     
     # Step 1: Find intersection
-    permitted = requested_set & allowed_fields
-    rejected = requested_set - allowed_fields
+    permitted = requested_mask & allowed_mask
+    rejected = bool(requested_mask & ~allowed_mask) or bool(unknown)
+    requested_count = bin(requested_mask).count("1") + len(unknown)
     
     # Step 2: Check denied_fields conflicts
-    denied_conflicts = requested_set & denied_fields
+    denied_conflicts = requested_mask & denied_mask
     
     justifications = []
     
     # Step 3: Build decision
     if denied_conflicts:
-        justifications.append(f"Explicitly denied fields: {list(denied_conflicts)}")
+        justifications.append(f"Explicitly denied fields: {field_dictionary.names(denied_conflicts)}")
         # If any requested field is denied, reject
-        permitted = permitted - denied_conflicts
+        permitted &= ~denied_conflicts
+    
+    permitted_count = bin(permitted).count("1")
     
-    if not permitted and requested_set:
+    if not permitted and requested_count:
         decision = "DENY"
-        justifications.insert(0, f"No permitted fields from requested: {requested_fields}")
+        requested_names = field_dictionary.names(requested_mask) + list(unknown)
+        justifications.insert(0, f"No permitted fields from requested: {requested_names}")
     elif rejected and permitted:
         decision = "PARTIAL_ALLOW"
-        justifications.insert(0, f"Partial access: {len(permitted)} of {len(requested_set)} fields allowed")
+        justifications.insert(0, f"Partial access: {permitted_count} of {requested_count} fields allowed")
     elif permitted:
         decision = "ALLOW"
-        justifications.insert(0, f"Full access granted for {len(permitted)} fields")
+        justifications.insert(0, f"Full access granted for {permitted_count} fields")
     else:
         decision = "DENY"
         justifications.insert(0, "No fields requested or all denied")
     
     return PolicyDecision(
         decision=decision,
-        permitted_fields=list(permitted),
+        permitted_fields=field_dictionary.names(permitted),
         justifications=justifications
     )
 
 
+# Content hash of policy_json -> CompiledPolicy
+_compiled_policies = LRUCache(maxsize=4096)
+
+
+def compile_policy(policy: Dict[str, Any]) -> CompiledPolicy:
+    """
+    Compile a policy dict, reusing the compiled form for identical content.
+    
+    Args:
+        policy: Consent policy dict with allowed_fields, denied_fields
+    
+    Returns:
+        CompiledPolicy
+    """
+    key = json.dumps(policy, sort_keys=True, default=str)
+    compiled = _compiled_policies.get(key)
+    if compiled is None:
+        compiled = CompiledPolicy(policy)
+        _compiled_policies.set(key, compiled)
+    return compiled
+
+
+def evaluate_policy(
+    policy: Union[Dict[str, Any], CompiledPolicy],
+    requested_fields: List[str]
+) -> PolicyDecision:
+    """
+    Evaluate consent policy against requested fields.
+    
+    STEP 6: Clause-Level Policy Evaluation
+    
+    Logic:
+    1. Find intersection of requested_fields and allowed_fields
+    2. Check for denied_fields conflicts
+    3. Build decision with justifications
+    
+    Evaluation runs on the compiled bitmask form; pass a CompiledPolicy to
+    skip compilation entirely.
+    
+    Args:
+        policy: Consent policy dict with allowed_fields, denied_fields,
+            or its CompiledPolicy
+        requested_fields: List of fields being requested
+    
+    Returns:
+        PolicyDecision: decision, permitted_fields, justifications
+    """
+    
+    if not isinstance(policy, CompiledPolicy):
+        policy = compile_policy(policy)
+    return policy.decide(requested_fields)
+
+
 def evaluate_conditions(
     policy: Dict[str, Any],
     request_context: Dict[str, Any]
@@ -168,11 +349,11 @@ def combine_decisions(decisions: List[PolicyDecision]) -> PolicyDecision:
         return decisions[0]
     
     # Intersection of permitted fields (most restrictive)
-    permitted_sets = [set(d.permitted_fields) for d in decisions]
-    combined_permitted = permitted_sets[0]
-    
-    for field_set in permitted_sets[1:]:
-        combined_permitted = combined_permitted & field_set
+    combined_mask = -1
+    for d in decisions:
+        mask, _ = field_dictionary.mask(d.permitted_fields)
+        combined_mask &= mask
+    combined_permitted = field_dictionary.names(combined_mask)
     
     # Combine justifications
     all_justifications = []
@@ -189,6 +370,139 @@ def combine_decisions(decisions: List[PolicyDecision]) -> PolicyDecision:
     
     return PolicyDecision(
         decision=decision,
-        permitted_fields=list(combined_permitted),
+        permitted_fields=combined_permitted,
         justifications=all_justifications
     )
+
+
+def _parse_bound(value: str, is_end: bool) -> datetime:
+    """
+    Parse a time_window bound. A date-only end covers that whole day, so it
+    becomes midnight of the following day (the window's end is exclusive).
+    """
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+    bound = datetime.combine(day, datetime.min.time())
+    return bound + timedelta(days=1) if is_end else bound
+
+
+def parse_time_window(
+    window: Any,
+    now: Optional[datetime] = None
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Resolve a time_window condition to absolute bounds.
+    
+    Accepted forms:
+    - {"start": "2024-01-01", "end": "2024-12-31"} (either bound optional)
+    - Integer number of days, e.g. 365
+    - Relative strings: "30d", "12w", "6m", "1y"
+    - ISO-8601 durations: "P1Y", "P6M", "P90D"
+    
+    Args:
+        window: time_window condition value
+        now: Reference time for relative windows (default: utcnow)
+    
+    Returns:
+        Tuple of (start, end); end is exclusive and None for relative windows
+    
+    Raises:
+        ValueError: If the window cannot be interpreted
+    """
+    
+    now = now or datetime.utcnow()
+    
+    if isinstance(window, dict):
+        start = window.get("start")
+        end = window.get("end")
+        if not start and not end:
+            raise ValueError(f"Invalid time_window: {window}")
+        return (
+            _parse_bound(start, is_end=False) if start else None,
+            _parse_bound(end, is_end=True) if end else None,
+        )
+    
+    if isinstance(window, int) and not isinstance(window, bool) and window > 0:
+        return now - timedelta(days=window), None
+    
+    if isinstance(window, str):
+        match = _RELATIVE_WINDOW_RE.match(window.strip())
+        if match:
+            days = int(match.group(1)) * _UNIT_DAYS[match.group(2).lower()]
+            return now - timedelta(days=days), None
+        
+        match = _ISO_DURATION_RE.match(window.strip())
+        if match and any(match.groups()):
+            years, months, weeks, days = (int(g) if g else 0 for g in match.groups())
+            total = years * 365 + months * 30 + weeks * 7 + days
+            return now - timedelta(days=total), None
+    
+    raise ValueError(f"Invalid time_window: {window}")
+
+
+def compile_conditions(
+    policy: Dict[str, Any],
+    now: Optional[datetime] = None,
+    records_consumed: int = 0,
+    per_subject: bool = False
+) -> List[QueryTransform]:
+    """
+    Compile enforceable policy conditions into query transforms.
+    
+    evaluate_conditions only explains conditions; this turns them into SQL
+    so the database returns nothing beyond what consent allows:
+    - time_window: range predicate on the record timestamp column
+    - aggregation_level: wrap the query in GROUP BY / COUNT(*)
+    - max_records: LIMIT on the source rows, or a per-subject ROW_NUMBER()
+      cap for cohort queries; both apply before aggregation
+    
+    Args:
+        policy: Consent policy with conditions
+        now: Reference time for relative time windows
+        records_consumed: Records already returned by earlier pages of a
+            resumed query; deducted from max_records
+        per_subject: Query spans several subjects; max_records is enforced
+            for each subject rather than pooled across the cohort
+    
+    Returns:
+        List of transforms, in application order
+    
+    Raises:
+        ValueError: If a condition cannot be interpreted (fail closed)
+    """
+    
+    conditions = policy.get("conditions") or {}
+    transforms: List[QueryTransform] = []
+    
+    window = conditions.get("time_window")
+    if window:
+        start, end = parse_time_window(window, now)
+        column = settings.record_timestamp_column
+        if isinstance(window, dict) and window.get("column"):
+            column = window["column"]
+        transforms.append(TimeWindow(column, start=start, end=end))
+    
+    max_records = conditions.get("max_records")
+    if max_records is not None:
+        if isinstance(max_records, bool) or not isinstance(max_records, int) or max_records < 0:
+            raise ValueError(f"Invalid max_records: {max_records}")
+        # Capped before aggregation so the budget counts source records,
+        # not output groups
+        if per_subject:
+            transforms.append(SubjectLimit(settings.subject_column, max_records))
+        else:
+            transforms.append(EnforceLimit(max(0, max_records - records_consumed)))
+    
+    level = conditions.get("aggregation_level")
+    if level:
+        if isinstance(level, str):
+            levels = [] if level.lower() in _COUNT_ONLY_LEVELS else [level]
+        elif isinstance(level, (list, tuple)):
+            levels = list(level)
+        else:
+            levels = []
+        transforms.append(Aggregate(levels))
+    
+    return transforms
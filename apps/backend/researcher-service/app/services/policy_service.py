@@ -3,14 +3,216 @@ STEP 5: Consent Policy Fetcher Service
 
 Fetch and validate consent policies from database.
 Apply confidence gate and time validation.
+
+Validated policies are cached in memory by (subject_id, purpose). An entry
+lives until the consent's expires_at (bounded by policy_cache_ttl_seconds)
+or until invalidate_consent_policy is called on consent change (revocation
+also expires the stored rows, see expire_consent_policies); invalidations
+are broadcast to the other workers. Missing or
+low-confidence consents are cached briefly as denials.
+
+When a subject has several unexpired rows for a purpose, both the single
+and the bulk lookup use the row with the highest confidence (then latest
+expiry, then id), so they always agree.
 """
 
+from sqlalchemy import any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple, Union
 from fastapi import HTTPException
 
+from app.core.config import settings
 from app.models.consent_policy import ConsentPolicy
+from app.services.policy_evaluator import CompiledPolicy
+from app.utils.cache import LRUCache
+from app.utils.cache_invalidation import invalidation_bus
+
+
+# ConsentPolicy.id -> CompiledPolicy, recompiled only when policy_json changes
+_compiled_by_row = LRUCache(maxsize=4096)
+
+# Minimum confidence for a consent policy to be usable
+CONFIDENCE_THRESHOLD = 0.85
+
+
+class PolicyDenial(NamedTuple):
+    """Cached outcome for a subject/purpose with no usable consent."""
+    
+    # None if no unexpired consent exists
+    confidence_score: Optional[float] = None
+    
+    def reason(self, purpose: str, subject_id: Optional[str] = None) -> str:
+        """Human-readable denial reason."""
+        if self.confidence_score is not None:
+            return f"Consent confidence too low: {self.confidence_score:.2f} < {CONFIDENCE_THRESHOLD}"
+        if subject_id is None:
+            return f"No valid consent found with purpose {purpose}"
+        return f"No valid consent found for subject {subject_id} with purpose {purpose}"
+
+
+# (subject_id, purpose) -> CompiledPolicy or PolicyDenial
+_policy_cache = LRUCache(maxsize=settings.policy_cache_size)
+
+# Row preference among a subject's unexpired consents for one purpose;
+# the highest confidence passes the confidence gate if any row does
+_PREFERRED_ROW_ORDER = (
+    ConsentPolicy.confidence_score.desc(),
+    ConsentPolicy.expires_at.desc(),
+    ConsentPolicy.id.desc(),
+)
+
+
+def compile_policy_record(policy_record: ConsentPolicy) -> CompiledPolicy:
+    """
+    Get the compiled form of a consent policy row.
+    
+    The compiled policy is cached by row id and reused until the row's
+    policy_json changes.
+    
+    Args:
+        policy_record: ConsentPolicy row
+    
+    Returns:
+        CompiledPolicy for the row's policy_json
+    """
+    compiled = _compiled_by_row.get(policy_record.id)
+    if compiled is None or compiled.source != policy_record.policy_json:
+        compiled = CompiledPolicy(policy_record.policy_json)
+        _compiled_by_row.set(policy_record.id, compiled)
+    return compiled
+
+
+def _cache_policy_record(
+    subject_id: str,
+    purpose: str,
+    policy_record: Optional[ConsentPolicy],
+    now: datetime
+) -> Union[CompiledPolicy, PolicyDenial]:
+    """
+    Validate a fetched consent row and cache the outcome.
+    
+    The confidence gate is applied here, once per load. Valid policies are
+    cached until they expire; denials only for the short negative TTL so a
+    newly granted consent is picked up quickly.
+    
+    Args:
+        subject_id: Patient/subject identifier
+        purpose: Purpose of access
+        policy_record: Unexpired ConsentPolicy row, or None if none exists
+        now: Time the row was fetched
+    
+    Returns:
+        CompiledPolicy if usable, otherwise a PolicyDenial
+    """
+    
+    if not policy_record:
+        entry = PolicyDenial()
+        ttl = settings.policy_negative_cache_ttl_seconds
+    elif policy_record.confidence_score < CONFIDENCE_THRESHOLD:
+        entry = PolicyDenial(policy_record.confidence_score)
+        ttl = settings.policy_negative_cache_ttl_seconds
+    else:
+        entry = compile_policy_record(policy_record)
+        # expires_at is the natural TTL; the configured bound limits
+        # staleness for changes made by other workers
+        ttl = min(
+            settings.policy_cache_ttl_seconds,
+            (policy_record.expires_at - now).total_seconds()
+        )
+    
+    _policy_cache.set((subject_id, purpose), entry, ttl_seconds=max(ttl, 0))
+    return entry
+
+
+def _get_policy_entry(
+    db: Session,
+    subject_id: str,
+    purpose: str
+) -> Union[CompiledPolicy, PolicyDenial]:
+    """Cached policy lookup, loading from the database on a miss."""
+    entry = _policy_cache.get((subject_id, purpose))
+    if entry is not None:
+        return entry
+    
+    now = datetime.utcnow()
+    policy_record = db.query(ConsentPolicy).filter(
+        ConsentPolicy.subject_id == subject_id,
+        ConsentPolicy.purpose == purpose,
+        ConsentPolicy.expires_at > now
+    ).order_by(*_PREFERRED_ROW_ORDER).first()
+    
+    return _cache_policy_record(subject_id, purpose, policy_record, now)
+
+
+def _drop_policies(subject_id: str, purpose: Optional[str] = None) -> int:
+    """Drop a subject's cached policies in this worker."""
+    if purpose is not None:
+        return 1 if _policy_cache.pop((subject_id, purpose)) is not None else 0
+    return _policy_cache.pop_where(lambda key: key[0] == subject_id)
+
+
+def invalidate_consent_policy(subject_id: str, purpose: Optional[str] = None) -> int:
+    """
+    Drop cached policies for a subject after a consent change or revocation.
+    
+    The invalidation is also broadcast to the other workers.
+    
+    Args:
+        subject_id: Patient/subject identifier
+        purpose: Only invalidate this purpose (None = all purposes)
+    
+    Returns:
+        int: Number of cache entries removed in this worker
+    """
+    removed = _drop_policies(subject_id, purpose)
+    invalidation_bus.publish("consent_policy", {"subject_id": subject_id, "purpose": purpose})
+    return removed
+
+
+def expire_consent_policies(db: Session, subject_id: str, purpose: Optional[str] = None) -> int:
+    """
+    Expire a subject's stored policies after a consent revocation.
+    
+    Dropping the cache alone is not enough: the next lookup would reload
+    the still-valid row. Call this before invalidate_consent_policy.
+    
+    Args:
+        db: SQLAlchemy database session (committed)
+        subject_id: Patient/subject identifier
+        purpose: Only expire this purpose (None = all purposes)
+    
+    Returns:
+        int: Number of policy rows expired
+    """
+    now = datetime.utcnow()
+    query = db.query(ConsentPolicy).filter(
+        ConsentPolicy.subject_id == subject_id,
+        ConsentPolicy.expires_at > now
+    )
+    if purpose is not None:
+        query = query.filter(ConsentPolicy.purpose == purpose)
+    expired = query.update({ConsentPolicy.expires_at: now}, synchronize_session=False)
+    db.commit()
+    return expired
+
+
+def get_policy_cache_stats() -> Dict[str, Any]:
+    """Hit-rate statistics for the consent policy cache."""
+    return _policy_cache.stats()
+
+
+def clear_policy_cache() -> None:
+    """Drop all cached consent policies."""
+    _policy_cache.clear()
+
+
+invalidation_bus.register(
+    "consent_policy",
+    lambda payload: _drop_policies(payload["subject_id"], payload.get("purpose")),
+    clear_policy_cache,
+)
 
 
 def fetch_consent_policy(
@@ -43,36 +245,111 @@ def fetch_consent_policy(
         HTTPException: 403 if consent missing, expired, or confidence too low
     """
     
-    try:
-        now = datetime.utcnow()
-        
-        # Query consent policy with all conditions
-        policy_record = db.query(ConsentPolicy).filter(
-            ConsentPolicy.subject_id == subject_id,
+    return fetch_compiled_policy(db, subject_id, purpose).source
+
+
+def fetch_compiled_policy(
+    db: Session,
+    subject_id: str,
+    purpose: str
+) -> CompiledPolicy:
+    """
+    Fetch and validate a consent policy, returning its compiled form.
+    
+    Same checks as fetch_consent_policy; the raw policy_json is available
+    as CompiledPolicy.source.
+    
+    Args:
+        db: SQLAlchemy database session
+        subject_id: Patient/subject identifier
+        purpose: Purpose of access (RESEARCH, TREATMENT, PUBLIC_HEALTH)
+    
+    Returns:
+        CompiledPolicy for the valid consent record
+    
+    Raises:
+        HTTPException: 403 if consent missing, expired, or confidence too low
+    """
+    
+    entry = _get_policy_entry(db, subject_id, purpose)
+    if isinstance(entry, PolicyDenial):
+        raise HTTPException(status_code=403, detail=entry.reason(purpose, subject_id))
+    return entry
+
+
+# Bound parameter count per IN (...) chunk on backends without array binds
+_IN_CHUNK_SIZE = 5000
+
+
+def fetch_compiled_policies(
+    db: Session,
+    subject_ids: List[str],
+    purpose: str
+) -> Tuple[Dict[str, CompiledPolicy], Dict[str, str]]:
+    """
+    Fetch and validate consent policies for a cohort in one query.
+    
+    Bulk form of fetch_compiled_policy. On PostgreSQL the ids are sent as a
+    single array parameter (WHERE subject_id = ANY(:ids)); other backends
+    fall back to chunked IN lists. Subjects already in the policy cache
+    are not queried. The same expiry and confidence checks apply, but
+    failures are reported per subject instead of raised.
+    
+    Args:
+        db: SQLAlchemy database session
+        subject_ids: Patient/subject identifiers (duplicates ignored)
+        purpose: Purpose of access (RESEARCH, TREATMENT, PUBLIC_HEALTH)
+    
+    Returns:
+        tuple: (subject_id -> CompiledPolicy for valid consents,
+                subject_id -> denial reason for the rest)
+    """
+    
+    policies: Dict[str, CompiledPolicy] = {}
+    denied: Dict[str, str] = {}
+    misses: List[str] = []
+    for subject_id in subject_ids:
+        entry = _policy_cache.get((subject_id, purpose))
+        if entry is None:
+            misses.append(subject_id)
+        elif isinstance(entry, PolicyDenial):
+            denied[subject_id] = entry.reason(purpose)
+        else:
+            policies[subject_id] = entry
+    
+    if not misses:
+        return policies, denied
+    
+    now = datetime.utcnow()
+    
+    if db.get_bind().dialect.name == "postgresql":
+        ids_param = bindparam("subject_ids", misses, type_=ARRAY(String))
+        batches = [ConsentPolicy.subject_id == any_(ids_param)]
+    else:
+        batches = [
+            ConsentPolicy.subject_id.in_(misses[i:i + _IN_CHUNK_SIZE])
+            for i in range(0, len(misses), _IN_CHUNK_SIZE)
+        ]
+    
+    # Same row preference as _get_policy_entry: first row per subject wins
+    records: Dict[str, ConsentPolicy] = {}
+    for criterion in batches:
+        rows = db.query(ConsentPolicy).filter(
+            criterion,
             ConsentPolicy.purpose == purpose,
             ConsentPolicy.expires_at > now
-        ).first()
-        
-        # No consent found
-        if not policy_record:
-            raise HTTPException(
-                status_code=403,
-                detail=f"No valid consent found for subject {subject_id} with purpose {purpose}"
-            )
-        
-        # Confidence gate (>= 0.85 = 85% confidence)
-        if policy_record.confidence_score < 0.85:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Consent confidence too low: {policy_record.confidence_score:.2f} < 0.85"
-            )
-        
-        # Return policy_json only
-        return policy_record.policy_json
-    
-    finally:
-        # Ensure DB session is closed safely
-        db.close()
+        ).order_by(*_PREFERRED_ROW_ORDER).all()
+        for row in rows:
+            records.setdefault(row.subject_id, row)
+    
+    for subject_id in misses:
+        entry = _cache_policy_record(subject_id, purpose, records.get(subject_id), now)
+        if isinstance(entry, PolicyDenial):
+            denied[subject_id] = entry.reason(purpose)
+        else:
+            policies[subject_id] = entry
+    
+    return policies, denied
 
 
 def get_consent_policy_safe(
@@ -95,23 +372,7 @@ def get_consent_policy_safe(
         dict: policy_json if valid, None otherwise
     """
     
-    try:
-        now = datetime.utcnow()
-        
-        policy_record = db.query(ConsentPolicy).filter(
-            ConsentPolicy.subject_id == subject_id,
-            ConsentPolicy.purpose == purpose,
-            ConsentPolicy.expires_at > now
-        ).first()
-        
-        if not policy_record:
-            return None
-        
-        # Confidence gate
-        if policy_record.confidence_score < 0.85:
-            return None
-        
-        return policy_record.policy_json
-    
-    finally:
-        db.close()
+    entry = _get_policy_entry(db, subject_id, purpose)
+    if isinstance(entry, PolicyDenial):
+        return None
+    return entry.source
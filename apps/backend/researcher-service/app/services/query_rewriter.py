@@ -3,11 +3,610 @@ STEP 7: Query Rewriting Engine
 
 Removes denied fields from queries using sqlglot.
 Enforces least privilege at runtime.
+
+Rewrites are expressed as a RewritePipeline of AST transforms: the query is
+parsed once, every transform is applied to the same tree and SQL is
+generated once. Compiled pipelines are cached as literal-free templates.
 """
 
-from typing import List, Optional
+import re
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
 import sqlglot
 from sqlglot import exp
+from sqlglot.dialects.postgres import Postgres
+from sqlglot.tokens import TokenType
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+
+# Queries are fingerprinted with sqlglot's postgres tokenizer, so every
+# quoting form it understands (E'..', $$..$$, B'..', ...) is lifted out as one
+# literal and kept verbatim; comments and whitespace are normalized.
+_DIALECT = Postgres()
+_LITERAL_TOKENS = frozenset({
+    TokenType.STRING,
+    TokenType.NUMBER,
+    TokenType.BYTE_STRING,
+    TokenType.BIT_STRING,
+    TokenType.HEX_STRING,
+    TokenType.HEREDOC_STRING,
+    TokenType.NATIONAL_STRING,
+    TokenType.RAW_STRING,
+    TokenType.UNICODE_STRING,
+})
+# Query literals are bound as _litN, transform parameters as _argN
+_PLACEHOLDER_RE = re.compile(r"%\((_lit|_arg)(\d+)\)s")
+_PLACEHOLDER_NAME_RE = re.compile(r"(?<!\w)_(?:lit|arg)\d+(?!\w)")
+
+# Rewrite-plan cache: (query fingerprint, transform keys) -> rewritten template
+_plan_cache = LRUCache(maxsize=settings.rewrite_plan_cache_size)
+# Fingerprint -> whether the query is a valid SELECT
+_validation_cache = LRUCache(maxsize=settings.rewrite_plan_cache_size)
+_plan_cache_bypasses = 0
+
+
+def fingerprint_query(sql: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Normalize a query into a literal-free template.
+    
+    Example:
+        Input:  SELECT age FROM patients WHERE region = 'south' LIMIT 10
+        Output: ("SELECT age FROM patients WHERE region = :_lit0 LIMIT :_lit1",
+                 ("'south'", "10"))
+    
+    Args:
+        sql: SQL query string
+    
+    Returns:
+        Tuple of (template, literals) where literals are the original
+        literal texts in placeholder order. If the query cannot be
+        tokenized it is returned unchanged with no literals.
+    """
+    try:
+        tokens = _DIALECT.tokenize(sql)
+    except Exception:
+        return sql.strip(), ()
+    
+    literals: List[str] = []
+    parts: List[str] = []
+    previous_end = None
+    for token in tokens:
+        text = sql[token.start:token.end + 1]
+        # Anything between tokens is whitespace or comments
+        if previous_end is not None and token.start > previous_end + 1:
+            parts.append(" ")
+        previous_end = token.end
+        if token.token_type in _LITERAL_TOKENS:
+            literals.append(text)
+            parts.append(f":_lit{len(literals) - 1}")
+        else:
+            parts.append(text)
+    
+    return "".join(parts), tuple(literals)
+
+
+def _sql_literal(value: Any) -> str:
+    """Render a transform parameter as a postgres literal."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, tuple):
+        # One untyped array literal ('{"a","b"}'), so postgres resolves the
+        # element type from the column it is compared with
+        elements = (
+            '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for v in value
+        )
+        value = "{" + ",".join(elements) + "}"
+    return exp.convert(value).sql(dialect="postgres")
+
+
+def _bind_literals(
+    template_sql: str,
+    literals: Tuple[str, ...],
+    params: Tuple[Any, ...] = ()
+) -> str:
+    """
+    Re-bind original literal texts and transform parameters into a template.
+    
+    Raises:
+        ValueError: If a placeholder has no matching literal or parameter
+    """
+    
+    def _replace(match: "re.Match") -> str:
+        index = int(match.group(2))
+        try:
+            if match.group(1) == "_lit":
+                return literals[index]
+            return _sql_literal(params[index])
+        except IndexError:
+            raise ValueError(f"Unbound placeholder {match.group(1)}{index}")
+    
+    return _PLACEHOLDER_RE.sub(_replace, template_sql)
+
+
+def _check_reserved_names(template: str, literals: Tuple[str, ...]) -> None:
+    """
+    Reject queries that use the rewriter's placeholder names themselves.
+    
+    The template must contain exactly the :_litN markers fingerprint_query
+    inserted; anything else named _litN/_argN came from the query text and
+    would be bound to the wrong value.
+    
+    Raises:
+        ValueError: If the query contains a reserved placeholder name
+    """
+    if len(_PLACEHOLDER_NAME_RE.findall(template)) != len(literals):
+        raise ValueError("Query must not contain _litN or _argN names")
+
+
+def _is_bindable(template_sql: str) -> bool:
+    """Check every placeholder survived generation as a bind marker."""
+    return len(_PLACEHOLDER_NAME_RE.findall(template_sql)) == len(_PLACEHOLDER_RE.findall(template_sql))
+
+
+def _parse_select(sql: str) -> exp.Select:
+    """Parse a query, requiring a SELECT statement."""
+    try:
+        parsed = sqlglot.parse_one(sql, read="postgres")
+    except Exception as e:
+        raise ValueError(f"Failed to parse query: {str(e)}")
+    
+    if not isinstance(parsed, exp.Select):
+        raise ValueError("Query must be a SELECT statement")
+    
+    return parsed
+
+
+def _require_single_scope(parsed: exp.Select) -> None:
+    """
+    Reject nested SELECTs (subqueries, derived tables, CTEs).
+    
+    Transforms add their predicates to the outermost WHERE only; a nested
+    scope would read base-table rows those predicates never see.
+    
+    Raises:
+        ValueError: If the query contains a nested SELECT
+    """
+    if parsed.args.get("with") is not None or any(
+        node is not parsed for node in parsed.find_all(exp.Select, exp.Subquery, exp.With)
+    ):
+        raise ValueError("Subqueries and CTEs are not allowed")
+
+
+def get_rewrite_cache_stats() -> Dict[str, Any]:
+    """
+    Get rewrite-plan cache metrics.
+    
+    Returns:
+        dict: hits, misses, evictions, size, maxsize, hit_rate, bypasses
+    """
+    stats = _plan_cache.stats()
+    stats["bypasses"] = _plan_cache_bypasses
+    return stats
+
+
+def clear_rewrite_cache() -> None:
+    """Drop all cached rewrite plans and validation results."""
+    global _plan_cache_bypasses
+    _plan_cache.clear()
+    _validation_cache.clear()
+    _plan_cache_bypasses = 0
+
+
+class QueryTransform:
+    """
+    Base class for AST transforms applied by a RewritePipeline.
+    
+    Subclasses expose:
+    - cache_key: hashable description of the transform's structure
+    - params: values injected into the query, bound at render time so
+      they do not fragment the plan cache
+    """
+    
+    params: Tuple[Any, ...] = ()
+    
+    @property
+    def cache_key(self) -> Hashable:
+        raise NotImplementedError
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        """
+        Transform the parsed query.
+        
+        Args:
+            parsed: Parsed SELECT (may be mutated in place)
+            placeholders: One placeholder per entry in params
+        
+        Returns:
+            exp.Select: Transformed query
+        """
+        raise NotImplementedError
+
+
+class RestrictScope(QueryTransform):
+    """
+    Validate that a query only reads permitted data; changes nothing.
+    
+    Must be the first transform so it sees the query as submitted:
+    - exactly one base table, from the allowlist, with no schema qualifier
+    - no joins, laterals, subqueries or CTEs
+    - no functions sqlglot does not recognise (pg_read_file, dblink, ...)
+    - every column reference outside a bare projected column (which
+      ProjectFields prunes) must be a permitted field: WHERE, GROUP BY,
+      ORDER BY, HAVING and function arguments included
+    
+    Raises (from apply):
+        ValueError: If the query reads anything outside its scope
+    """
+    
+    def __init__(self, tables: Sequence[str], allowed_fields: Sequence[str]):
+        self.tables = frozenset(t.lower() for t in tables)
+        self.allowed_fields = frozenset(allowed_fields)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("scope", self.tables, self.allowed_fields)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        _require_single_scope(parsed)
+        if parsed.args.get("joins") or parsed.find(exp.Lateral):
+            raise ValueError("Joins are not allowed")
+        
+        tables = list(parsed.find_all(exp.Table))
+        if len(tables) != 1:
+            raise ValueError("Query must read exactly one table")
+        table = tables[0]
+        if not isinstance(table.this, exp.Identifier) or table.db or table.catalog:
+            raise ValueError("Query must read a plain table name")
+        if table.name.lower() not in self.tables:
+            raise ValueError(f"Table {table.name} is not available for querying")
+        
+        function = parsed.find(exp.Anonymous)
+        if function is not None:
+            raise ValueError(f"Function {function.name} is not allowed")
+        
+        # Bare projected columns are pruned by ProjectFields, not rejected
+        pruned = set()
+        for expr in parsed.expressions:
+            if isinstance(expr, exp.Alias):
+                expr = expr.this
+            if isinstance(expr, exp.Column):
+                pruned.add(id(expr))
+        
+        for column in parsed.find_all(exp.Column):
+            if id(column) in pruned:
+                continue
+            if isinstance(column.this, exp.Star) or column.name not in self.allowed_fields:
+                raise ValueError(f"Column {column.sql(dialect='postgres')} is not permitted")
+        return parsed
+
+
+class ProjectFields(QueryTransform):
+    """
+    Prune the projection to permitted fields.
+    
+    Example:
+        Input:  SELECT name, aadhaar, age FROM patients
+        Allowed: [age, gender]
+        Output: SELECT age FROM patients
+    """
+    
+    def __init__(self, allowed_fields: Sequence[str]):
+        self.allowed_fields = frozenset(allowed_fields)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("project", self.allowed_fields)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        # SELECT * expands to the allowed fields (sorted so the expansion
+        # does not depend on set iteration order)
+        if any(isinstance(expr, exp.Star) for expr in parsed.expressions):
+            parsed.set("expressions", [exp.column(f) for f in sorted(self.allowed_fields)])
+            return parsed
+        
+        new_expressions = []
+        for expr in parsed.expressions:
+            if isinstance(expr, exp.Column):
+                col_name = expr.name
+            elif isinstance(expr, exp.Alias) and isinstance(expr.this, exp.Column):
+                # Renaming a column does not change which field it reads
+                col_name = expr.this.name
+            elif isinstance(expr, exp.Alias):
+                col_name = expr.alias
+            else:
+                # Other expressions (functions, literals, etc.) are kept
+                new_expressions.append(expr)
+                continue
+            
+            if col_name in self.allowed_fields:
+                new_expressions.append(expr)
+        
+        parsed.set("expressions", new_expressions)
+        return parsed
+
+
+class InjectPredicate(QueryTransform):
+    """
+    AND a filter into the WHERE clause.
+    
+    A scalar value becomes `field = value`, a list becomes
+    `field = ANY('{...}')` bound as a single array parameter, so cohorts of
+    any size share one cached plan.
+    """
+    
+    def __init__(self, field_name: str, value: Any):
+        self.field_name = field_name
+        self.is_list = isinstance(value, (list, tuple, set, frozenset))
+        self.params = (tuple(value),) if self.is_list else (value,)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("predicate", self.field_name, self.is_list)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        column = exp.column(self.field_name)
+        if self.is_list:
+            condition = exp.EQ(this=column, expression=exp.Any(this=exp.Paren(this=placeholders[0])))
+        else:
+            condition = exp.EQ(this=column, expression=placeholders[0])
+        return parsed.where(condition, copy=False)
+
+
+class TimeWindow(QueryTransform):
+    """
+    Restrict rows to a time window on a timestamp column.
+    
+    Emits plain range predicates (`column >= start AND column < end`) so the
+    database can use indexes and prune partitions.
+    """
+    
+    def __init__(
+        self,
+        column: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        if start is None and end is None:
+            raise ValueError("Time window requires a start or an end")
+        self.column = column
+        self.has_start = start is not None
+        self.has_end = end is not None
+        self.params = tuple(v for v in (start, end) if v is not None)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("time_window", self.column, self.has_start, self.has_end)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        bounds = iter(placeholders)
+        if self.has_start:
+            parsed = parsed.where(
+                exp.GTE(this=exp.column(self.column), expression=exp.cast(next(bounds), "TIMESTAMP")),
+                copy=False
+            )
+        if self.has_end:
+            parsed = parsed.where(
+                exp.LT(this=exp.column(self.column), expression=exp.cast(next(bounds), "TIMESTAMP")),
+                copy=False
+            )
+        return parsed
+
+
+class KeysetPage(QueryTransform):
+    """
+    Order by a unique key and resume after a previously seen key value.
+    
+    The key is projected as KEY_ALIAS so the executor can emit resumable
+    cursors; callers strip it before returning rows.
+    """
+    
+    KEY_ALIAS = "_keyset"
+    
+    def __init__(self, column: str, after: Any = None):
+        self.column = column
+        self.has_after = after is not None
+        self.params = (after,) if self.has_after else ()
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("keyset", self.column, self.has_after)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        if self.has_after:
+            parsed = parsed.where(
+                exp.GT(this=exp.column(self.column), expression=placeholders[0]),
+                copy=False
+            )
+        parsed.set("order", None)
+        parsed = parsed.order_by(exp.column(self.column), copy=False)
+        return parsed.select(exp.alias_(exp.column(self.column), self.KEY_ALIAS), copy=False)
+
+
+class EnforceLimit(QueryTransform):
+    """
+    Cap the number of returned rows.
+    
+    An existing LIMIT is kept if it is smaller: LIMIT LEAST(existing, cap).
+    """
+    
+    def __init__(self, max_records: int):
+        if max_records < 0:
+            raise ValueError("max_records must be non-negative")
+        self.params = (int(max_records),)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("limit",)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        cap: exp.Expression = placeholders[0]
+        existing = parsed.args.get("limit")
+        if existing is not None and existing.expression is not None:
+            cap = exp.func("LEAST", existing.expression, cap)
+        parsed.set("limit", exp.Limit(expression=cap))
+        return parsed
+
+
+class SubjectLimit(QueryTransform):
+    """
+    Cap the rows returned per subject in a cohort query.
+    
+    Example:
+        Input:  SELECT age FROM patient_records WHERE patient_id = ANY(...)
+        Output: SELECT age FROM
+                (SELECT age, ROW_NUMBER() OVER (PARTITION BY patient_id) AS _subject_rank
+                 FROM patient_records WHERE patient_id = ANY(...)) AS consent_capped
+                WHERE _subject_rank <= 100
+    """
+    
+    RANK_ALIAS = "_subject_rank"
+    
+    def __init__(self, column: str, max_records: int):
+        if max_records < 0:
+            raise ValueError("max_records must be non-negative")
+        self.column = column
+        self.params = (int(max_records),)
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("subject_limit", self.column)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        # Unnamed expressions get an alias so the outer query can select them
+        names = []
+        expressions = []
+        for i, expr in enumerate(parsed.expressions):
+            name = expr.alias_or_name
+            if not name:
+                name = f"_col{i}"
+                expr = exp.alias_(expr, name)
+            names.append(name)
+            expressions.append(expr)
+        rank = exp.Window(this=exp.RowNumber(), partition_by=[exp.column(self.column)])
+        expressions.append(exp.alias_(rank, self.RANK_ALIAS))
+        parsed.set("expressions", expressions)
+        
+        return exp.select(*[exp.column(n) for n in names]).from_(
+            parsed.subquery("consent_capped")
+        ).where(exp.LTE(this=exp.column(self.RANK_ALIAS), expression=placeholders[0]))
+
+
+class Aggregate(QueryTransform):
+    """
+    Wrap the query so only aggregate counts leave the database.
+    
+    Example:
+        Input:  SELECT age, gender FROM patients
+        Group:  [gender]
+        Output: SELECT gender, COUNT(*) AS record_count
+                FROM (SELECT age, gender FROM patients) AS consent_agg
+                GROUP BY gender
+    """
+    
+    def __init__(self, group_by: Sequence[str], count_alias: str = "record_count"):
+        self.group_by = tuple(group_by)
+        self.count_alias = count_alias
+    
+    @property
+    def cache_key(self) -> Hashable:
+        return ("aggregate", self.group_by, self.count_alias)
+    
+    def apply(self, parsed: exp.Select, placeholders: List[exp.Placeholder]) -> exp.Select:
+        # Only group by columns the inner query actually projects
+        projected = {expr.alias_or_name for expr in parsed.expressions}
+        group_cols = [exp.column(c) for c in self.group_by if c in projected]
+        count = exp.alias_(exp.Count(this=exp.Star()), self.count_alias)
+        
+        wrapped = exp.select(*group_cols, count).from_(parsed.subquery("consent_agg"))
+        if group_cols:
+            wrapped = wrapped.group_by(*[c.copy() for c in group_cols])
+        return wrapped
+
+
+class RewritePipeline:
+    """
+    Ordered list of AST transforms applied in a single parse/generate cycle.
+    
+    Usage:
+        sql = RewritePipeline([
+            ProjectFields(["age", "gender"]),
+            InjectPredicate("patient_id", subject_id),
+            EnforceLimit(1000),
+        ]).run("SELECT * FROM patient_records")
+    
+    Compiled pipelines are cached by (query fingerprint, transform keys);
+    query literals and transform parameters are re-bound on every run.
+    """
+    
+    def __init__(self, transforms: Optional[List[QueryTransform]] = None):
+        self.transforms: List[QueryTransform] = list(transforms or [])
+    
+    def add(self, transform: QueryTransform) -> "RewritePipeline":
+        """Append a transform (chainable)."""
+        self.transforms.append(transform)
+        return self
+    
+    @property
+    def cache_key(self) -> Tuple[Hashable, ...]:
+        return tuple(t.cache_key for t in self.transforms)
+    
+    def _params(self) -> Tuple[Any, ...]:
+        return tuple(p for t in self.transforms for p in t.params)
+    
+    def _compile(self, sql: str) -> str:
+        """Parse once, apply every transform, generate once."""
+        parsed = _parse_select(sql)
+        _require_single_scope(parsed)
+        offset = 0
+        for transform in self.transforms:
+            placeholders = [
+                exp.Placeholder(this=f"_arg{offset + i}")
+                for i in range(len(transform.params))
+            ]
+            offset += len(placeholders)
+            parsed = transform.apply(parsed, placeholders)
+        return parsed.sql(dialect="postgres")
+    
+    def run(self, sql: str) -> str:
+        """
+        Rewrite a query.
+        
+        Args:
+            sql: Original SELECT query
+        
+        Returns:
+            str: Rewritten SQL
+        
+        Raises:
+            ValueError: If query cannot be parsed or is not a SELECT
+        """
+        global _plan_cache_bypasses
+        
+        template, literals = fingerprint_query(sql)
+        _check_reserved_names(template, literals)
+        params = self._params()
+        cache_key = (template, self.cache_key)
+        
+        plan = _plan_cache.get(cache_key)
+        if plan is not None:
+            return _bind_literals(plan, literals, params)
+        
+        try:
+            plan = self._compile(template)
+        except ValueError:
+            plan = None
+        
+        if plan is not None and _is_bindable(plan):
+            _plan_cache.set(cache_key, plan)
+            return _bind_literals(plan, literals, params)
+        
+        # Literal positions the template cannot represent (e.g. INTERVAL '1 day');
+        # compile the original query directly without caching.
+        _plan_cache_bypasses += 1
+        return _bind_literals(self._compile(sql), (), params)
 
 
 def rewrite_query(
@@ -37,65 +636,16 @@ def rewrite_query(
     Returns:
         str: Rewritten SQL query with only allowed fields
     
+    Results are memoized by (query fingerprint, permitted field set); a
+    repeated query shape only re-binds its literals into the cached template
+    and never touches the parser.
+    
     Raises:
         ValueError: If query cannot be parsed
     """
     
     try:
-        # Parse SQL query
-        parsed = sqlglot.parse_one(original_sql, read="postgres")
-        
-        if not isinstance(parsed, exp.Select):
-            raise ValueError("Query must be a SELECT statement")
-        
-        # Extract all selected columns (excluding *)
-        selected_cols = []
-        cols_to_remove = []
-        
-        for expr in parsed.expressions:
-            if isinstance(expr, exp.Star):
-                # SELECT * - need to expand to allowed fields
-                selected_cols.append(None)  # Marker for SELECT *
-            elif isinstance(expr, exp.Column):
-                col_name = expr.name
-                selected_cols.append(col_name)
-                # Check if column is allowed
-                if col_name not in allowed_fields:
-                    cols_to_remove.append(col_name)
-            elif isinstance(expr, exp.Alias):
-                # Handle aliased columns
-                col_name = expr.alias
-                selected_cols.append(col_name)
-                if col_name not in allowed_fields:
-                    cols_to_remove.append(col_name)
-            else:
-                # Other expressions (functions, literals, etc.)
-                col_name = expr.alias or str(expr)
-                selected_cols.append(col_name)
-        
-        # If SELECT *, replace with allowed fields
-        if None in selected_cols:
-            new_expressions = [exp.column(f) for f in allowed_fields]
-            parsed.set("expressions", new_expressions)
-        else:
-            # Remove disallowed columns
-            new_expressions = []
-            for expr in parsed.expressions:
-                col_name = None
-                if isinstance(expr, exp.Column):
-                    col_name = expr.name
-                elif isinstance(expr, exp.Alias):
-                    col_name = expr.alias
-                else:
-                    col_name = expr.alias or str(expr)
-
-                if col_name not in cols_to_remove:
-                    new_expressions.append(expr)
-            parsed.set("expressions", new_expressions)
-        
-        # Return rewritten SQL
-        return parsed.sql(dialect="postgres")
-    
+        return RewritePipeline([ProjectFields(allowed_fields)]).run(original_sql)
     except Exception as e:
         raise ValueError(f"Failed to rewrite query: {str(e)}")
 
@@ -142,6 +692,9 @@ def add_field_filter(
     """
     Add a WHERE clause filter to a query.
     
+    Prefer composing InjectPredicate into a RewritePipeline when applying
+    more than one rewrite.
+    
     Args:
         sql: Original SELECT query
         field_name: Field name to filter on
@@ -152,24 +705,7 @@ def add_field_filter(
     """
     
     try:
-        parsed = sqlglot.parse_one(sql, read="postgres")
-        
-        # Create new WHERE condition
-        condition = exp.EQ(
-            this=exp.column(field_name),
-            expression=exp.Literal.string(value)
-        )
-        
-        # Add to WHERE clause
-        if parsed.args.get("where"):
-            # Combine with existing WHERE using AND
-            combined = exp.and_(parsed.args.get("where"), condition)
-            parsed.set("where", combined)
-        else:
-            parsed.set("where", condition)
-        
-        return parsed.sql(dialect="postgres")
-    
+        return RewritePipeline([InjectPredicate(field_name, value)]).run(sql)
     except Exception as e:
         raise ValueError(f"Failed to add filter: {str(e)}")
 
@@ -178,6 +714,8 @@ def add_limit(sql: str, limit: int) -> str:
     """
     Add LIMIT clause to a query.
     
+    An existing smaller LIMIT is preserved.
+    
     Args:
         sql: Original SELECT query
         limit: Maximum number of rows
@@ -187,10 +725,7 @@ def add_limit(sql: str, limit: int) -> str:
     """
     
     try:
-        parsed = sqlglot.parse_one(sql, read="postgres")
-        parsed.set("limit", exp.Limit(expression=exp.Literal.number(limit)))
-        return parsed.sql(dialect="postgres")
-    
+        return RewritePipeline([EnforceLimit(limit)]).run(sql)
     except Exception as e:
         raise ValueError(f"Failed to add limit: {str(e)}")
 
@@ -206,8 +741,16 @@ def validate_query(sql: str) -> bool:
         bool: True if valid SELECT, False otherwise
     """
     
+    template, _ = fingerprint_query(sql)
+    cached = _validation_cache.get(template)
+    if cached is not None:
+        return cached
+    
     try:
         parsed = sqlglot.parse_one(sql, read="postgres")
-        return isinstance(parsed, exp.Select)
+        is_select = isinstance(parsed, exp.Select)
     except Exception:
-        return False
+        is_select = False
+    
+    _validation_cache.set(template, is_select)
+    return is_select
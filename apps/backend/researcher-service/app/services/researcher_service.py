@@ -8,7 +8,7 @@ from datetime import datetime
 
 from app.models.researcher import Researcher
 from app.schemas.researcher import ResearcherSignup, ResearcherUpdate
-from app.services.auth_service import hash_password
+from app.services.auth_service import hash_password, invalidate_principal
 
 
 def create_researcher(db: Session, signup_data: ResearcherSignup) -> Researcher:
@@ -88,6 +88,41 @@ def update_researcher(db: Session, researcher_id: str, update_data: ResearcherUp
     
     db.commit()
     db.refresh(researcher)
+    invalidate_principal(researcher_id)
+    return researcher
+
+
+def set_researcher_active(db: Session, researcher_id: str, is_active: bool) -> Researcher:
+    """
+    Activate or deactivate a researcher account.
+    
+    Deactivation takes effect on the researcher's next request: the cached
+    principal is dropped in every worker, so authentication re-reads
+    is_active. Exposed as PUT /auth/researchers/{id}/status.
+    
+    Args:
+        db: Database session
+        researcher_id: Researcher ID
+        is_active: New account status
+        
+    Returns:
+        Updated Researcher object
+        
+    Raises:
+        HTTPException: If researcher not found
+    """
+    researcher = db.query(Researcher).filter(Researcher.id == researcher_id).first()
+    
+    if not researcher:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Researcher not found"
+        )
+    
+    researcher.is_active = is_active
+    db.commit()
+    db.refresh(researcher)
+    invalidate_principal(researcher_id)
     return researcher
 
 
@@ -3,13 +3,119 @@ Session Audit Service
 
 Handles audit logging for research sessions.
 Provides immutable audit trail for all session activities.
+
+Entries are group-committed: log_action queues the row and a background
+writer inserts everything queued by concurrent requests in one multi-row
+INSERT and one transaction every few milliseconds, instead of each request
+paying a second commit for its audit entry. If a batch fails, its entries
+are retried one at a time so only the rows that fail on their own are lost.
 """
+import logging
+import threading
+import uuid
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import List, NamedTuple, Optional, Dict, Any, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, Session
 from fastapi import Request
 
+from app.core.config import settings
+from app.database import engine
 from app.models.session_audit_log import SessionAuditLog
+from app.utils.batch_writer import BatchWriter
+from app.utils.query_stats import estimate_count
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingEntry:
+    """Queued audit row; `done` is set once it has been written (or failed)."""
+    
+    __slots__ = ("row", "done", "error")
+    
+    def __init__(self, row: Dict[str, Any], wait: bool):
+        self.row = row
+        self.done = threading.Event() if wait else None
+        self.error: Optional[Exception] = None
+
+
+def _insert_rows(entries: List[_PendingEntry]) -> None:
+    with engine.begin() as connection:
+        connection.execute(SessionAuditLog.__table__.insert(), [entry.row for entry in entries])
+
+
+def _insert_entries(entries: List[_PendingEntry]) -> None:
+    """
+    Insert a batch of audit rows in one statement and one transaction.
+    
+    If the batch fails, each entry is retried in its own transaction;
+    entries that still fail carry the error (raised to any waiter) and are
+    logged.
+    """
+    try:
+        try:
+            _insert_rows(entries)
+            return
+        except Exception as e:
+            if len(entries) == 1:
+                entries[0].error = e
+            else:
+                logger.warning(f"Session audit batch of {len(entries)} failed, retrying rows: {str(e)}")
+        
+        if len(entries) > 1:
+            for entry in entries:
+                try:
+                    _insert_rows([entry])
+                except Exception as e:
+                    entry.error = e
+        
+        for entry in entries:
+            if entry.error is not None:
+                logger.error(
+                    f"Session audit entry not written: {entry.row['action']} "
+                    f"for session {entry.row['session_id']}: {str(entry.error)}"
+                )
+    finally:
+        for entry in entries:
+            if entry.done:
+                entry.done.set()
+
+
+def _write_overflow(entries: List[_PendingEntry]) -> None:
+    """
+    Write entries that did not fit in the queue on the caller's thread,
+    applying backpressure instead of dropping audit rows.
+    """
+    _insert_entries(entries)
+
+
+session_audit_writer: BatchWriter[_PendingEntry] = BatchWriter(
+    name="session-audit-writer",
+    write_batch=_insert_entries,
+    overflow=_write_overflow,
+    max_queue=settings.session_audit_queue_size,
+    batch_size=settings.session_audit_batch_size,
+    flush_interval_seconds=settings.session_audit_flush_interval_seconds
+)
+
+
+def start_session_audit_writer() -> None:
+    """Start the background group-commit writer."""
+    session_audit_writer.start()
+
+
+def stop_session_audit_writer() -> None:
+    """Stop the writer after writing what is queued."""
+    session_audit_writer.stop()
+
+
+class AuditLogPage(NamedTuple):
+    """One page of audit logs."""
+    logs: List[SessionAuditLog]
+    total: int
+    total_is_estimate: bool
+    has_more: bool
 
 
 class SessionAuditService:
@@ -22,11 +128,17 @@ class SessionAuditService:
         researcher_id: str,
         action: str,
         details: Optional[Dict[str, Any]] = None,
-        request: Optional[Request] = None
-    ) -> SessionAuditLog:
+        request: Optional[Request] = None,
+        wait: bool = False
+    ) -> str:
         """
         Log an action performed within a session.
         
+        The entry is queued for the group-commit writer and this returns
+        immediately. With wait=True it blocks until the row is committed,
+        raising if the write failed. When the writer is not running
+        (scripts, tests) the row is written through `db` directly.
+        
         Args:
             db: Database session
             session_id: Session ID
@@ -34,9 +146,10 @@ class SessionAuditService:
             action: Action type (e.g., "session_created", "data_accessed")
             details: Action-specific details
             request: FastAPI request object for IP and user agent
-            
+            wait: Block until the entry has been written
+        
         Returns:
-            Created audit log entry
+            ID of the audit log entry
         """
         # Extract request context if available
         ip_address = None
@@ -46,75 +159,105 @@ class SessionAuditService:
             ip_address = request.client.host if request.client else None
             user_agent = request.headers.get("user-agent")
         
-        # Create audit log
-        audit_log = SessionAuditLog(
-            session_id=session_id,
-            researcher_id=researcher_id,
-            action=action,
-            details=details or {},
-            ip_address=ip_address,
-            user_agent=user_agent,
-            timestamp=datetime.utcnow()
-        )
+        # IDs are assigned here so callers get one without waiting for the insert
+        row = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "researcher_id": researcher_id,
+            "action": action,
+            "details": details or {},
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "timestamp": datetime.utcnow()
+        }
         
-        db.add(audit_log)
-        db.commit()
-        db.refresh(audit_log)
+        if not session_audit_writer.running:
+            db.add(SessionAuditLog(**row))
+            db.commit()
+            return row["id"]
         
-        return audit_log
+        entry = _PendingEntry(row, wait)
+        session_audit_writer.submit(entry)
+        if wait:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+        return row["id"]
+    
+    @staticmethod
+    def _page(
+        db: Session,
+        query: Query,
+        limit: int,
+        after: Optional[Tuple[datetime, str]],
+        exact_total: bool
+    ) -> AuditLogPage:
+        """
+        Newest-first keyset page of `query`, plus its total row count.
+        
+        The total is the planner's estimate unless exact_total is set (or
+        the database cannot estimate).
+        """
+        total = None if exact_total else estimate_count(db, query)
+        total_is_estimate = total is not None
+        if total is None:
+            total = query.count()
+        
+        ordered = query.order_by(SessionAuditLog.timestamp.desc(), SessionAuditLog.id.desc())
+        if after is not None:
+            ordered = ordered.filter(tuple_(SessionAuditLog.timestamp, SessionAuditLog.id) < tuple_(*after))
+        logs = ordered.limit(limit + 1).all()
+        
+        return AuditLogPage(logs[:limit], total, total_is_estimate, len(logs) > limit)
     
     @staticmethod
     def get_session_logs(
         db: Session,
         session_id: str,
         limit: int = 100,
-        offset: int = 0
-    ) -> tuple[List[SessionAuditLog], int]:
+        after: Optional[Tuple[datetime, str]] = None,
+        exact_total: bool = False
+    ) -> AuditLogPage:
         """
-        Get audit logs for a specific session.
+        Get audit logs for a specific session, newest first.
         
         Args:
             db: Database session
             session_id: Session ID
             limit: Maximum number of logs to return
-            offset: Pagination offset
-            
+            after: (timestamp, id) of the last log of the previous page
+            exact_total: Count rows instead of using the planner estimate
+        
         Returns:
-            Tuple of (logs, total_count)
+            AuditLogPage
         """
         query = db.query(SessionAuditLog).filter(
             SessionAuditLog.session_id == session_id
-        ).order_by(SessionAuditLog.timestamp.desc())
-        
-        total = query.count()
-        logs = query.limit(limit).offset(offset).all()
-        
-        return logs, total
+        )
+        return SessionAuditService._page(db, query, limit, after, exact_total)
     
     @staticmethod
     def get_researcher_logs(
         db: Session,
         researcher_id: str,
         limit: int = 100,
-        offset: int = 0
-    ) -> tuple[List[SessionAuditLog], int]:
+        after: Optional[Tuple[datetime, str]] = None,
+        exact_total: bool = False
+    ) -> AuditLogPage:
         """
-        Get all audit logs for a researcher across all sessions.
+        Get all audit logs for a researcher across all sessions, newest first.
         
         Args:
             db: Database session
             researcher_id: Researcher ID
             limit: Maximum number of logs to return
-            offset: Pagination offset
-            
+            after: (timestamp, id) of the last log of the previous page
+            exact_total: Count rows instead of using the planner estimate
+        
         Returns:
-            Tuple of (logs, total_count)
+            AuditLogPage
         """
         query = db.query(SessionAuditLog).filter(
             SessionAuditLog.researcher_id == researcher_id
-        ).order_by(SessionAuditLog.timestamp.desc())
-        
-        total = query.count()
-        logs = query.limit(limit).offset(offset).all()
-        
-        return logs, total
+        )
+        return SessionAuditService._page(db, query, limit, after, exact_total)
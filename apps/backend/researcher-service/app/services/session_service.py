@@ -4,12 +4,64 @@ Session Service
 Handles CRUD operations for research sessions.
 """
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
+from app.core.config import settings
+from app.database import engine
 from app.models.research_session import ResearchSession, SessionStatus
 from app.schemas.session import SessionCreate, SessionUpdate
+from app.utils.batch_writer import BatchWriter
+
+
+_sessions = ResearchSession.__table__
+
+# Atomic increment: concurrent flushes (or inline updates) never lose counts
+_increment_access = (
+    _sessions.update()
+    .where(_sessions.c.id == bindparam("session_id"))
+    .values(
+        data_access_count=_sessions.c.data_access_count + bindparam("delta"),
+        last_accessed_at=bindparam("accessed_at")
+    )
+)
+
+
+def _flush_access_counts(accesses: List[Tuple[str, datetime]]) -> None:
+    """Aggregate buffered accesses per session and apply them in one transaction."""
+    totals: Dict[str, Dict] = {}
+    for session_id, accessed_at in accesses:
+        entry = totals.setdefault(session_id, {"session_id": session_id, "delta": 0, "accessed_at": accessed_at})
+        entry["delta"] += 1
+        entry["accessed_at"] = max(entry["accessed_at"], accessed_at)
+    
+    with engine.begin() as connection:
+        connection.execute(_increment_access, list(totals.values()))
+
+
+# Accesses are queued and folded into one UPDATE per session every
+# session_access_flush_interval_seconds; if the queue is full (or a flush
+# fails) they are applied on the calling thread instead.
+access_count_writer: BatchWriter[Tuple[str, datetime]] = BatchWriter(
+    name="session-access-counter",
+    write_batch=_flush_access_counts,
+    overflow=_flush_access_counts,
+    max_queue=settings.session_access_queue_size,
+    batch_size=settings.session_access_queue_size,
+    flush_interval_seconds=settings.session_access_flush_interval_seconds
+)
+
+
+def start_access_count_writer() -> None:
+    """Start the background access count flusher."""
+    access_count_writer.start()
+
+
+def stop_access_count_writer() -> None:
+    """Stop the flusher after applying buffered counts."""
+    access_count_writer.stop()
 
 
 class SessionService:
@@ -28,7 +80,7 @@ class SessionService:
             db: Database session
             researcher_id: ID of the researcher creating the session
             session_data: Session creation data
-            
+        
         Returns:
             Created research session
         """
@@ -46,7 +98,7 @@ class SessionService:
             end_date=session_data.end_date,
             session_metadata=session_data.session_metadata,
             status=SessionStatus.ACTIVE,
-            data_access_count="0"
+            data_access_count=0
         )
         
         db.add(session)
@@ -68,10 +120,10 @@ class SessionService:
             db: Database session
             session_id: Session ID
             researcher_id: Researcher ID (for authorization)
-            
+        
         Returns:
             Research session
-            
+        
         Raises:
             HTTPException: If session not found or unauthorized
         """
@@ -111,7 +163,7 @@ class SessionService:
             status_filter: Optional status filter
             limit: Maximum number of sessions to return
             offset: Pagination offset
-            
+        
         Returns:
             Tuple of (sessions, total_count)
         """
@@ -144,10 +196,10 @@ class SessionService:
             session_id: Session ID
             researcher_id: Researcher ID (for authorization)
             update_data: Update data
-            
+        
         Returns:
             Updated session
-            
+        
         Raises:
             HTTPException: If session not found or unauthorized
         """
@@ -178,10 +230,10 @@ class SessionService:
             db: Database session
             session_id: Session ID
             researcher_id: Researcher ID (for authorization)
-            
+        
         Returns:
             Archived session
-            
+        
         Raises:
             HTTPException: If session not found or unauthorized
         """
@@ -203,16 +255,19 @@ class SessionService:
         """
         Increment data access count for a session.
         
+        The access is buffered and applied by the background flusher
+        (together with last_accessed_at), so counts can lag by up to one
+        flush interval. When the flusher is not running (scripts, tests)
+        the counter is updated immediately through `db`.
+        
         Args:
             db: Database session
             session_id: Session ID
         """
-        session = db.query(ResearchSession).filter(
-            ResearchSession.id == session_id
-        ).first()
+        accessed_at = datetime.utcnow()
+        if access_count_writer.running:
+            access_count_writer.submit((session_id, accessed_at))
+            return
         
-        if session:
-            current_count = int(session.data_access_count) if session.data_access_count else 0
-            session.data_access_count = str(current_count + 1)
-            session.last_accessed_at = datetime.utcnow()
-            db.commit()
+        db.execute(_increment_access, {"session_id": session_id, "delta": 1, "accessed_at": accessed_at})
+        db.commit()
@@ -3,6 +3,8 @@ from uuid import UUID
 import os
 import logging
 
+from app.utils.cache import ClaimsCache
+
 # Try to import UserRole enum if available; keep tolerant to avoid import errors
 try:
     from app.models.user import UserRole  # adjust import if needed
@@ -14,6 +16,14 @@ JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ISSUER = os.getenv("JWT_ISSUER", "eka-care")
 
+# Normalized user info for tokens that already passed verification.
+# The external issuer sends this service no revocation signal, so a token
+# is valid until its exp whether cached or not; entries never outlive exp.
+_claims_cache = ClaimsCache(
+    maxsize=int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("JWT_CLAIMS_CACHE_TTL_SECONDS", "300")),
+)
+
 
 class AuthenticationError(Exception):
     """Raised when authentication/validation fails."""
@@ -27,13 +37,18 @@ def verify_jwt(token: str) -> dict:
     - Else if `JWT_SECRET_KEY` is present, use HS256 verification.
     - Else fall back to a development HS256 secret (logs a warning).
 
-    Returns a dict with `id`, `email`, `role` on success.
+    Returns a dict with `id`, `email`, `role` on success. Successful results
+    are cached until the token's `exp`.
 
     Raises `AuthenticationError` on any validation failure.
     """
     if not token or not isinstance(token, str):
         raise AuthenticationError("Missing token")
 
+    cached = _claims_cache.get_claims(token)
+    if cached is not None:
+        return cached
+
     # decide algorithm / key
     if JWT_PUBLIC_KEY:
         key = JWT_PUBLIC_KEY
@@ -76,7 +91,9 @@ def verify_jwt(token: str) -> dict:
             if not role or not isinstance(role, str):
                 raise AuthenticationError("Invalid user role")
 
-        return {"id": user_id, "email": email, "role": role}
+        user = {"id": user_id, "email": email, "role": role}
+        _claims_cache.set_claims(token, user, payload.get("exp"))
+        return user
 
     except ExpiredSignatureError:
         raise AuthenticationError("JWT token expired")
@@ -86,3 +103,8 @@ def verify_jwt(token: str) -> dict:
         raise AuthenticationError(f"JWT validation failed: {str(e)}")
     except ValueError as e:
         raise AuthenticationError(f"Invalid token data: {str(e)}")
+
+
+def get_claims_cache_stats() -> dict:
+    """Hit-rate metrics for the verified-token cache."""
+    return _claims_cache.stats()
@@ -0,0 +1,153 @@
+"""
+Background batch writer.
+
+Items are queued in memory by request handlers and written in batches by a
+single background thread, so many small writes become one bulk write per
+batch. The queue is bounded: items that do not fit, and batches whose
+write fails, are handed to an overflow callback instead of being dropped
+or blocking the caller.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BatchWriter(Generic[T]):
+    """Bounded queue drained in batches by a background thread."""
+    
+    def __init__(
+        self,
+        name: str,
+        write_batch: Callable[[List[T]], None],
+        overflow: Callable[[List[T]], None],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 0.2
+    ):
+        """
+        Initialize writer (call start() to begin writing).
+        
+        Args:
+            name: Thread name, used in logs
+            write_batch: Writes one batch; raising sends the batch to overflow
+            overflow: Receives items that could not be queued or written
+            max_queue: Maximum queued items before submit() overflows
+            batch_size: Maximum items per write
+            flush_interval_seconds: Longest an item waits for its batch to fill
+        """
+        self.name = name
+        self.write_batch = write_batch
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: "queue.Queue[T]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.overflowed = 0
+    
+    @property
+    def running(self) -> bool:
+        """Whether the writer thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def submit(self, item: T) -> bool:
+        """
+        Queue an item without blocking.
+        
+        Returns:
+            bool: True if queued, False if it went to overflow instead
+        """
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self._overflow([item])
+            return False
+    
+    def _overflow(self, items: List[T]) -> None:
+        self.overflowed += len(items)
+        try:
+            self.overflow(items)
+        except Exception as e:
+            logger.error(f"{self.name}: lost {len(items)} items: {str(e)}", exc_info=True)
+    
+    def _next_batch(self) -> List[T]:
+        """Wait for one item, then gather more until full or the interval elapses."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Interval is up: take only what is already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write(self, batch: List[T]) -> None:
+        try:
+            self.write_batch(batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"{self.name}: batch write failed: {str(e)}")
+            self._overflow(batch)
+    
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+        self.flush()
+    
+    def flush(self) -> None:
+        """Write everything currently queued (on the calling thread)."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+    
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer thread after writing what is queued."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+    
+    def stats(self) -> dict:
+        """Queue depth and counters."""
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "overflowed": self.overflowed,
+        }
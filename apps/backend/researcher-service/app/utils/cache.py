@@ -0,0 +1,186 @@
+"""
+In-process caching helpers.
+
+Bounded, thread-safe LRU cache with optional per-entry TTL and
+hit/miss counters for exposing cache metrics, plus a cache of verified
+JWT claims built on it.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL and hit-rate statistics."""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of entries before least-recently-used eviction
+            ttl_seconds: Default entry lifetime in seconds (None = no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value, refreshing its LRU position.
+
+        Args:
+            key: Cache key
+            default: Value returned on miss or expiry
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl_seconds: Entry lifetime, overrides the cache default
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove an entry, returning its value (or None)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove all entries whose key matches a predicate.
+
+        Args:
+            predicate: Called with each key; True removes the entry
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: hits, misses, evictions, size, maxsize, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class ClaimsCache(LRUCache):
+    """
+    Verified JWT claims keyed by SHA-256 of the token.
+
+    Entries never outlive the token: each expires at the token's `exp`
+    claim (capped at ttl_seconds). Only successful verifications are
+    cached, so invalid or expired tokens are always re-checked.
+    """
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of the cached claims for a token, or None."""
+        claims = self.get(self._key(token))
+        return dict(claims) if claims is not None else None
+
+    def set_claims(self, token: str, claims: Dict[str, Any], exp: Any = None) -> None:
+        """
+        Cache verified claims for a token.
+
+        Args:
+            token: Raw JWT
+            claims: Claims to return on later lookups
+            exp: The token's `exp` claim (seconds since epoch); None = ttl_seconds
+        """
+        ttl = self.ttl_seconds
+        if isinstance(exp, (int, float)):
+            remaining = exp - time.time()
+            if remaining <= 0:
+                return
+            ttl = remaining if ttl is None else min(ttl, remaining)
+        self.set(self._key(token), dict(claims), ttl_seconds=ttl)
+
+    def evict_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """
+        Forget every token whose claims match a predicate, e.g. all tokens
+        of a deactivated user.
+
+        Args:
+            predicate: Called with each entry's claims; True removes the entry
+
+        Returns:
+            int: Number of tokens forgotten
+        """
+        with self._lock:
+            keys = [key for key, (claims, _) in self._data.items() if predicate(claims)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
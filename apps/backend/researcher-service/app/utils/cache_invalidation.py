@@ -0,0 +1,148 @@
+"""
+Cross-worker cache invalidation.
+
+In-process caches (consent policies, researcher principals) are
+invalidated locally by the caller, then the invalidation is published on
+a Redis pub/sub channel so every worker running start_invalidation_listener
+drops the same entries. It shares the token store's connection pool and follows its
+revocation listener: when the subscription is (re)established each cache
+is cleared, because invalidations published while it was down were missed.
+
+publish() may be called from sync code (threadpool endpoints, the consent
+replicator thread); the message is handed to the listener's event loop.
+Without a running listener (scripts, tests) invalidation is local only.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.utils.token_store import token_store
+
+
+INVALIDATION_CHANNEL = "cache-invalidations"
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """Relays cache invalidations between workers."""
+    
+    def __init__(self):
+        # kind -> (apply(payload), clear())
+        self._handlers: Dict[str, tuple] = {}
+        # Lets a worker skip its own messages
+        self._origin = uuid.uuid4().hex
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Keeps in-flight publish tasks referenced until they finish
+        self._sending: Set[asyncio.Task] = set()
+    
+    @property
+    def subscribed(self) -> bool:
+        """Whether invalidations from other workers are being received."""
+        return self._subscribed
+    
+    def register(
+        self,
+        kind: str,
+        apply: Callable[[Dict[str, Any]], Any],
+        clear: Callable[[], Any]
+    ) -> None:
+        """
+        Register a cache under a message kind.
+        
+        Args:
+            kind: Message kind, e.g. "consent_policy"
+            apply: Drops the entries a payload names (for received messages)
+            clear: Drops every entry (used after missed messages)
+        """
+        self._handlers[kind] = (apply, clear)
+    
+    def publish(self, kind: str, payload: Dict[str, Any]) -> None:
+        """Broadcast an invalidation already applied locally (best effort)."""
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return
+        message = json.dumps({"origin": self._origin, "kind": kind, "payload": payload})
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            task = loop.create_task(self._send(message))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._send(message), loop)
+    
+    async def _send(self, message: str) -> None:
+        try:
+            await token_store.redis_client.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation: {e}")
+    
+    def _clear_all(self) -> None:
+        for _, clear in self._handlers.values():
+            clear()
+    
+    def _receive(self, data: str) -> None:
+        message = json.loads(data)
+        if message.get("origin") == self._origin:
+            return
+        handler = self._handlers.get(message.get("kind"))
+        if handler is not None:
+            handler[0](message.get("payload") or {})
+    
+    async def _listen(self) -> None:
+        """Apply published invalidations, reconnecting on failure."""
+        while True:
+            pubsub = token_store.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._clear_all()
+                self._subscribed = True
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._receive(message["data"])
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+            finally:
+                self._subscribed = False
+                await pubsub.aclose()
+            await asyncio.sleep(5.0)
+    
+    def start_listener(self) -> None:
+        """Subscribe to invalidations in a background task on the running loop."""
+        if self._listener and not self._listener.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._listener = self._loop.create_task(self._listen())
+    
+    async def stop_listener(self) -> None:
+        """Stop the listener; invalidation goes back to local only."""
+        self._loop = None
+        if self._listener:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+
+# Global bus; caches register at import time
+invalidation_bus = InvalidationBus()
+
+
+def start_invalidation_listener() -> None:
+    """Start relaying cache invalidations between workers."""
+    invalidation_bus.start_listener()
+
+
+async def stop_invalidation_listener() -> None:
+    """Stop relaying cache invalidations."""
+    await invalidation_bus.stop_listener()
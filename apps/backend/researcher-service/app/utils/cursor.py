@@ -0,0 +1,66 @@
+"""
+Opaque pagination cursors.
+
+Cursors are URL-safe base64 JSON payloads signed with the service secret so
+clients cannot forge keyset positions or reset server-side counters.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from typing import Any, Dict
+
+from app.core.config import settings
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor is malformed or its signature does not match."""
+
+
+def _sign(body: bytes) -> str:
+    digest = hmac.new(settings.secret_key.encode(), body, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """
+    Encode and sign a cursor payload.
+    
+    Args:
+        payload: JSON-serializable cursor state
+        
+    Returns:
+        Opaque cursor string
+    """
+    body = base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(",", ":"), default=str).encode()
+    )
+    return f"{body.decode().rstrip('=')}.{_sign(body.rstrip(b'='))}"
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Verify and decode a cursor.
+    
+    Args:
+        cursor: Cursor string produced by encode_cursor
+        
+    Returns:
+        Cursor payload
+        
+    Raises:
+        InvalidCursorError: If the cursor is malformed or tampered with
+    """
+    try:
+        body, signature = cursor.split(".", 1)
+    except ValueError:
+        raise InvalidCursorError("Malformed cursor")
+    
+    if not hmac.compare_digest(signature, _sign(body.encode())):
+        raise InvalidCursorError("Invalid cursor signature")
+    
+    try:
+        padded = body + "=" * (-len(body) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
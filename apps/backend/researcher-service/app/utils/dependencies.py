@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.services import auth_service
+from app.services.auth_service import ResearcherPrincipal
 from app.models.researcher import Researcher
 
 
@@ -17,12 +18,37 @@ security = HTTPBearer()
 def get_current_researcher(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> Researcher:
+) -> ResearcherPrincipal:
     """
     Dependency to get the current authenticated researcher.
     
     Extracts and validates the JWT token from the Authorization header,
-    then retrieves the corresponding researcher from the database.
+    then resolves the researcher's principal (id, institution, is_active),
+    served from cache when warm.
+    
+    Args:
+        credentials: HTTP Bearer credentials from request header
+        db: Database session
+        
+    Returns:
+        Authenticated researcher principal
+        
+    Raises:
+        HTTPException: If token is invalid or researcher not found
+    """
+    token = credentials.credentials
+    return auth_service.get_current_principal(db, token)
+
+
+def get_current_researcher_profile(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Researcher:
+    """
+    Dependency to get the current authenticated researcher's full record.
+    
+    Always loads the Researcher row; use for profile endpoints that return
+    more than the principal's fields.
     
     Args:
         credentials: HTTP Bearer credentials from request header
@@ -0,0 +1,204 @@
+"""
+Monthly range partitions for append-only tables (PostgreSQL).
+
+Audit tables are declared `PARTITION BY RANGE (timestamp)`; this module
+creates one partition per calendar month plus a DEFAULT partition, so
+inserts never fail when maintenance falls behind, and detaches partitions
+that have aged out so they can be archived or dropped without a bulk DELETE.
+On other databases every function is a no-op.
+"""
+
+import logging
+import threading
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection, Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: Table, month: date) -> str:
+    """Name of the partition holding `month`, e.g. session_audit_logs_2026_10."""
+    return f"{table.name}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(connection: Connection, table: Table) -> bool:
+    """Whether `table` exists as a partitioned (not a plain, pre-partitioning) table."""
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass(:table))"
+    ), {"table": table.name}).scalar()
+
+
+def _create_month_partition(connection: Connection, table: Table, start: date) -> None:
+    """
+    Create the partition for the month starting at `start`.
+    
+    PostgreSQL refuses to create a partition while the DEFAULT partition
+    holds rows in its range (written while maintenance was behind), so the
+    DEFAULT partition is detached, those rows are moved into the new
+    partition and it is attached again, all in the caller's transaction.
+    Detaching also drops the append-only triggers cloned onto it.
+    """
+    name = partition_name(table, start)
+    end = _month_start(start, 1)
+    in_range = f"timestamp >= '{start.isoformat()}' AND timestamp < '{end.isoformat()}'"
+    
+    if connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar():
+        return
+    stranded = connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {table.name}_default WHERE {in_range})"
+    )).scalar()
+    if stranded:
+        connection.execute(text(f"ALTER TABLE {table.name} DETACH PARTITION {table.name}_default"))
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table.name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if stranded:
+        moved = connection.execute(text(
+            f"WITH moved AS (DELETE FROM {table.name}_default WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )).rowcount
+        connection.execute(text(
+            f"ALTER TABLE {table.name} ATTACH PARTITION {table.name}_default DEFAULT"
+        ))
+        logger.info(f"Moved {moved} rows from {table.name}_default into new partition {name}")
+
+
+def ensure_monthly_partitions(connection: Connection, table: Table, months_ahead: int = 2) -> None:
+    """
+    Create the DEFAULT partition and monthly partitions up to `months_ahead`
+    months after the current one (existing partitions are left alone).
+    
+    A table that exists but is not partitioned is skipped with a warning.
+    
+    Args:
+        connection: Connection inside a transaction
+        table: Partitioned table
+        months_ahead: Future months to create in advance
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    
+    if not is_partitioned(connection, table):
+        logger.warning(
+            f"{table.name} is not a partitioned table; skipping partition maintenance "
+            f"(recreate it with PARTITION BY RANGE (timestamp) and copy the rows over)"
+        )
+        return
+    
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {table.name}_default PARTITION OF {table.name} DEFAULT"
+    ))
+    today = datetime.utcnow().date()
+    for offset in range(months_ahead + 1):
+        _create_month_partition(connection, table, _month_start(today, offset))
+
+
+def detach_partitions_before(connection: Connection, table: Table, before: date) -> List[str]:
+    """
+    Detach monthly partitions whose whole range is older than `before`.
+    
+    Detached partitions become ordinary tables that can be archived and
+    dropped; they no longer appear in queries on the parent table.
+    
+    Args:
+        connection: Connection inside a transaction
+        table: Partitioned table
+        before: Partitions ending on or before this date are detached
+    
+    Returns:
+        Names of the detached partitions
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+    
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": table.name}).scalars().all()
+    
+    detached = []
+    for name in sorted(rows):
+        try:
+            year, month = name[len(table.name) + 1:].split("_")
+            start = date(int(year), int(month), 1)
+        except ValueError:
+            # DEFAULT (or a manually created) partition
+            continue
+        if _month_start(start, 1) <= before:
+            connection.execute(text(f"ALTER TABLE {table.name} DETACH PARTITION {name}"))
+            detached.append(name)
+            logger.info(f"Detached partition {name}")
+    return detached
+
+
+class PartitionMaintainer:
+    """
+    Keeps monthly partitions ahead of the clock.
+    
+    Runs ensure_monthly_partitions for each table once at startup and then
+    periodically in a background thread, so a long-running process never
+    spills a whole month into the DEFAULT partition. With a retention period
+    it also detaches months that have aged out (they are left as plain
+    tables to archive and drop). Each table is handled in its own
+    transaction and failures are logged, never raised.
+    """
+    
+    def __init__(
+        self,
+        engine: Engine,
+        tables: Iterable[Table],
+        interval_seconds: float,
+        retention_months: Optional[int] = None
+    ):
+        self.engine = engine
+        self.tables = list(tables)
+        self.interval_seconds = interval_seconds
+        self.retention_months = retention_months
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def run_once(self) -> None:
+        """Create missing partitions for every table and detach expired ones."""
+        if self.engine.dialect.name != "postgresql":
+            return
+        for table in self.tables:
+            try:
+                with self.engine.begin() as connection:
+                    ensure_monthly_partitions(connection, table)
+                    if self.retention_months:
+                        cutoff = _month_start(datetime.utcnow().date(), -self.retention_months)
+                        detach_partitions_before(connection, table, cutoff)
+            except Exception as e:
+                logger.error(f"Partition maintenance failed for {table.name}: {str(e)}", exc_info=True)
+    
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+    
+    def start(self) -> None:
+        """Start the background maintenance thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="partition-maintenance", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background maintenance thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
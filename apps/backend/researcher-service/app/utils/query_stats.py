@@ -0,0 +1,38 @@
+"""
+Row count estimates from planner statistics.
+
+An exact COUNT(*) reads every matching row (or index entry), so it grows
+with the table. For list APIs an approximate total is usually enough:
+PostgreSQL's EXPLAIN returns the planner's row estimate without running
+the query.
+"""
+
+import json
+from typing import Optional
+
+from sqlalchemy.orm import Query, Session
+
+
+def estimate_count(db: Session, query: Query) -> Optional[int]:
+    """
+    Planner estimate of the number of rows `query` returns.
+    
+    Args:
+        db: Database session
+        query: ORM query (without LIMIT/OFFSET)
+    
+    Returns:
+        int: Estimated row count, or None if the database cannot estimate
+        (anything but PostgreSQL) and the caller should count exactly
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    
+    compiled = query.statement.compile(bind)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
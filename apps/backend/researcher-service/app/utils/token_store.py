@@ -3,41 +3,273 @@ STEP 8: Token Storage and Revocation
 
 Redis-backed token store with SHA-256 hashing and TTL.
 Supports policy-based revocation.
+
+Multi-key operations run in one round trip: writes are pipelined in
+MULTI/EXEC, and reads that depend on earlier reads run as server-side Lua
+scripts.
+
+Revocation uses epochs: each subject and (subject, purpose) has a
+generation counter, and tokens record the generations current when they
+were issued (group tokens record them for every subject they cover).
+Revoking is a single INCR; a token is valid only while its recorded
+generations still match, and revoked records simply expire with their TTL.
+
+Verified tokens can be cached in-process until their Redis TTL runs out.
+Revocations are published on a pub/sub channel; every worker running
+start_revocation_listener evicts cached entries as they arrive, and the
+cache is bypassed whenever that subscription is down.
+
+The store is asynchronous (redis.asyncio) so Redis round trips never block
+the event loop. Connections come from one shared pool configured by
+Settings (REDIS_URL, timeouts, pool size) and are opened on first use.
+REDIS_URL=fakeredis:// runs against an in-process fake for local
+benchmarking (needs fakeredis[lua] from requirements-dev.txt).
 """
 
-import redis
+import asyncio
+import contextlib
 import hashlib
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+
+# Revocation epoch keys (no TTL: they must outlive every token issued under them)
+SUBJECT_EPOCH_KEY = "epoch:subject:{subject_id}"
+PURPOSE_EPOCH_KEY = "epoch:subject:{subject_id}:purpose:{purpose}"
+
+# Pub/sub channel carrying revocations to every worker's verify cache
+REVOCATION_CHANNEL = "token-revocations"
+
+# Token records are hashes (token:{hash}) so a status flip is one HSET.
+# Group tokens keep their per-subject epochs in a companion hash with the
+# same TTL: token:{hash}:epochs  subject_id -> "subject epoch,purpose epoch"
+GROUP_EPOCHS_KEY = "token:{token_hash}:epochs"
+
+# Index sets, both expiring with the newest token they hold:
+#   subject:{id}:purpose:{p}     every token (individual or group) for the pair
+#   subject:{id}:purposes        purposes with an index set for the subject
+SUBJECT_PURPOSE_KEY = "subject:{subject_id}:purpose:{purpose}"
+SUBJECT_PURPOSES_KEY = "subject:{subject_id}:purposes"
+
+# Lua helpers shared by the scripts below.
+# group_epochs_current: whether every subject epoch recorded for a group
+#   token still matches (MGET in chunks to stay under Lua's unpack limit).
+# epochs_current: whether a token record's epochs match the live counters.
+# is_active: record exists, is not revoked, and its epochs are current.
+# revoke_record: mark one active token record revoked in place.
+_LUA_HELPERS = """
+local function group_epochs_current(key, purpose)
+    local snapshot = redis.call('HGETALL', key .. ':epochs')
+    local chunk = 500
+    for first = 1, #snapshot, 2 * chunk do
+        local last = math.min(first + 2 * chunk - 1, #snapshot)
+        local epoch_keys = {}
+        for i = first, last, 2 do
+            local subject_key = 'epoch:subject:' .. snapshot[i]
+            epoch_keys[#epoch_keys + 1] = subject_key
+            epoch_keys[#epoch_keys + 1] = subject_key .. ':purpose:' .. purpose
+        end
+        local current = redis.call('MGET', unpack(epoch_keys))
+        for i = first, last, 2 do
+            local subject_epoch, purpose_epoch = string.match(snapshot[i + 1], '^(%d+),(%d+)$')
+            local offset = i - first
+            if (tonumber(current[offset + 1]) or 0) ~= tonumber(subject_epoch)
+                or (tonumber(current[offset + 2]) or 0) ~= tonumber(purpose_epoch) then
+                return false
+            end
+        end
+    end
+    return true
+end
+
+local function epochs_current(key)
+    local fields = redis.call('HMGET', key, 'subject_id', 'purpose', 'epochs', 'group_id')
+    if fields[4] then
+        return group_epochs_current(key, fields[2])
+    end
+    if not fields[3] then
+        return true
+    end
+    local subject_epoch, purpose_epoch = string.match(fields[3], '^(%d+),(%d+)$')
+    local subject_key = 'epoch:subject:' .. fields[1]
+    local current = redis.call('MGET', subject_key, subject_key .. ':purpose:' .. fields[2])
+    return (tonumber(current[1]) or 0) == tonumber(subject_epoch)
+        and (tonumber(current[2]) or 0) == tonumber(purpose_epoch)
+end
+
+local function is_active(key)
+    return redis.call('HGET', key, 'status') == 'active' and epochs_current(key)
+end
+
+local function revoke_record(key, revoked_at)
+    if redis.call('HGET', key, 'status') ~= 'active' then
+        return 0
+    end
+    redis.call('HSET', key, 'status', 'revoked', 'revoked_at', revoked_at)
+    return 1
+end
+"""
+
+# KEYS[1] = token key. Returns {record fields, remaining ms} if active and
+# not revoked by epoch.
+_LUA_VERIFY = _LUA_HELPERS + """
+if not is_active(KEYS[1]) then
+    return false
+end
+return {redis.call('HGETALL', KEYS[1]), redis.call('PTTL', KEYS[1])}
+"""
+
+# KEYS[1] = token key; ARGV[1] = revoked_at
+_LUA_REVOKE_TOKEN = _LUA_HELPERS + """
+return revoke_record(KEYS[1], ARGV[1])
+"""
+
+# KEYS[1] = subject epoch, KEYS[2] = subject purposes set; ARGV[1] = subject_id
+# The INCR alone revokes; token records are not read. Returns how many
+# tokens were indexed for the subject (SCARD per purpose, an upper bound:
+# already expired or revoked entries are included), then unlinks the index
+# sets since nothing in them is valid any more.
+_LUA_REVOKE_SUBJECT = """
+local indexed = 0
+for _, purpose in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    local purpose_key = 'subject:' .. ARGV[1] .. ':purpose:' .. purpose
+    indexed = indexed + redis.call('SCARD', purpose_key)
+    redis.call('UNLINK', purpose_key)
+end
+redis.call('INCR', KEYS[1])
+redis.call('UNLINK', KEYS[2])
+return indexed
+"""
+
+# KEYS[1] = (subject, purpose) epoch, KEYS[2] = (subject, purpose) token set
+# Same as _LUA_REVOKE_SUBJECT for one purpose: INCR, count, unlink.
+_LUA_REVOKE_PURPOSE = """
+local indexed = redis.call('SCARD', KEYS[2])
+redis.call('INCR', KEYS[1])
+redis.call('UNLINK', KEYS[2])
+return indexed
+"""
+
+# KEYS[1] = subject purposes set; ARGV[1] = subject_id,
+# ARGV[2] = purpose (empty = all purposes)
+_LUA_COUNT_ACTIVE = _LUA_HELPERS + """
+local purposes = {ARGV[2]}
+if ARGV[2] == '' then
+    purposes = redis.call('SMEMBERS', KEYS[1])
+end
+
+local count = 0
+for _, purpose in ipairs(purposes) do
+    local purpose_key = 'subject:' .. ARGV[1] .. ':purpose:' .. purpose
+    for _, token_hash in ipairs(redis.call('SMEMBERS', purpose_key)) do
+        if is_active('token:' .. token_hash) then
+            count = count + 1
+        end
+    end
+end
+return count
+"""
+
+
+def _encode_metadata(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """Flatten token metadata into hash fields."""
+    fields = dict(metadata)
+    fields["allowed_fields"] = json.dumps(fields["allowed_fields"], separators=(",", ":"))
+    if "epochs" in fields:
+        fields["epochs"] = ",".join(str(epoch) for epoch in fields["epochs"])
+    return {name: str(value) for name, value in fields.items()}
+
+
+def _decode_metadata(fields: Dict[str, str]) -> Dict[str, Any]:
+    """Inverse of _encode_metadata."""
+    metadata: Dict[str, Any] = dict(fields)
+    metadata["allowed_fields"] = json.loads(metadata["allowed_fields"])
+    if "epochs" in metadata:
+        metadata["epochs"] = [int(epoch) for epoch in metadata["epochs"].split(",")]
+    if "subject_count" in metadata:
+        metadata["subject_count"] = int(metadata["subject_count"])
+    return metadata
+
 
 class TokenStore:
     """Redis-backed token store with revocation support."""
     
     def __init__(
         self,
-        host: str = "localhost",
-        port: int = 6379,
-        db: int = 0,
-        ttl_seconds: int = 300
+        url: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        client: Optional[redis.Redis] = None,
+        verify_cache_size: Optional[int] = None
     ):
         """
-        Initialize Redis connection.
+        Initialize the store. No connection is made until first use.
         
         Args:
-            host: Redis host (default: localhost)
-            port: Redis port (default: 6379)
-            db: Redis database number (default: 0)
-            ttl_seconds: Token TTL in seconds (default: 300 = 5 minutes)
+            url: Redis URL (default: settings.redis_url; fakeredis:// for an in-process fake)
+            ttl_seconds: Token TTL in seconds (default: settings.token_ttl_seconds)
+            client: Existing async client to use instead (must decode responses)
+            verify_cache_size: Max verified tokens cached in-process
+                (default: settings.token_verify_cache_size; 0 = no cache)
         """
-        self.redis_client = redis.Redis(
-            host=host,
-            port=port,
-            db=db,
-            decode_responses=True
-        )
-        self.ttl_seconds = ttl_seconds
+        self.url = url or settings.redis_url
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.token_ttl_seconds
+        if verify_cache_size is None:
+            verify_cache_size = settings.token_verify_cache_size
+        
+        self._client: Optional[redis.Redis] = None
+        if client is not None:
+            self._use_client(client)
+        
+        # token hash -> verified metadata; only consulted while subscribed to
+        # REVOCATION_CHANNEL, otherwise revocations could be missed
+        self._verified = LRUCache(maxsize=verify_cache_size) if verify_cache_size else None
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+        # Bumped on every revocation so a verify racing one never caches
+        # the pre-revocation result
+        self._revocations_seen = 0
+    
+    def _use_client(self, client: redis.Redis) -> None:
+        """Adopt a client and register the Lua scripts on it."""
+        self._client = client
+        # Registered once; executed with EVALSHA (falls back to EVAL)
+        self._verify_script = client.register_script(_LUA_VERIFY)
+        self._revoke_token_script = client.register_script(_LUA_REVOKE_TOKEN)
+        self._revoke_subject_script = client.register_script(_LUA_REVOKE_SUBJECT)
+        self._revoke_purpose_script = client.register_script(_LUA_REVOKE_PURPOSE)
+        self._count_active_script = client.register_script(_LUA_COUNT_ACTIVE)
+    
+    @property
+    def redis_client(self) -> redis.Redis:
+        """
+        Async Redis client, created on first use.
+        
+        Connections come from a shared pool with connect/read timeouts and
+        periodic health checks (PING before reusing an idle connection).
+        """
+        if self._client is None:
+            if self.url.startswith("fakeredis://"):
+                from fakeredis import FakeAsyncRedis
+                
+                client = FakeAsyncRedis(decode_responses=True)
+            else:
+                pool = redis.ConnectionPool.from_url(
+                    self.url,
+                    max_connections=settings.redis_max_connections,
+                    socket_connect_timeout=settings.redis_connect_timeout_seconds,
+                    socket_timeout=settings.redis_socket_timeout_seconds,
+                    health_check_interval=settings.redis_health_check_interval_seconds,
+                    decode_responses=True
+                )
+                client = redis.Redis(connection_pool=pool)
+            self._use_client(client)
+        return self._client
     
     def _hash_token(self, token: str) -> str:
         """
@@ -51,13 +283,43 @@ class TokenStore:
         """
         return hashlib.sha256(token.encode()).hexdigest()
     
-    def store_token(
+    async def current_epochs(self, subject_id: str, purpose: str) -> List[int]:
+        """
+        Get the current revocation epochs for a subject and purpose.
+        
+        Embed these in a token at issue time (and pass them to store_token);
+        the token stays valid until either epoch is bumped by revocation.
+        
+        Args:
+            subject_id: Subject/patient ID
+            purpose: Purpose of access
+        
+        Returns:
+            list: [subject epoch, subject+purpose epoch]
+        """
+        values = await self.redis_client.mget(
+            SUBJECT_EPOCH_KEY.format(subject_id=subject_id),
+            PURPOSE_EPOCH_KEY.format(subject_id=subject_id, purpose=purpose)
+        )
+        return [int(value or 0) for value in values]
+    
+    def _index_token(self, pipe, token_hash: str, subject_id: str, purpose: str) -> None:
+        """Queue the index-set writes for one (subject, purpose) on a pipeline."""
+        purpose_key = SUBJECT_PURPOSE_KEY.format(subject_id=subject_id, purpose=purpose)
+        purposes_key = SUBJECT_PURPOSES_KEY.format(subject_id=subject_id)
+        pipe.sadd(purpose_key, token_hash)
+        pipe.expire(purpose_key, self.ttl_seconds)
+        pipe.sadd(purposes_key, purpose)
+        pipe.expire(purposes_key, self.ttl_seconds)
+    
+    async def store_token(
         self,
         token: str,
         subject_id: str,
         purpose: str,
         allowed_fields: list,
-        request_id: str
+        request_id: str,
+        epochs: Optional[List[int]] = None
     ) -> bool:
         """
         Store token in Redis with metadata.
@@ -66,8 +328,9 @@ class TokenStore:
         
         Stores:
         - Hash(token) as key
-        - Metadata as JSON value
+        - Metadata as a Redis hash, including the revocation epochs
         - TTL of 300 seconds (5 minutes)
+        - Token hash in the (subject, purpose) index set
         
         Args:
             token: Raw JWT token
@@ -75,6 +338,7 @@ class TokenStore:
             purpose: Purpose of access
             allowed_fields: List of allowed fields
             request_id: Request ID for tracing
+            epochs: Epochs from current_epochs at issue time (read now if omitted)
         
         Returns:
             bool: True if stored successfully
@@ -83,6 +347,9 @@ class TokenStore:
         try:
             token_hash = self._hash_token(token)
             
+            if epochs is None:
+                epochs = await self.current_epochs(subject_id, purpose)
+            
             # Build metadata
             metadata = {
                 "subject_id": subject_id,
@@ -90,21 +357,18 @@ class TokenStore:
                 "allowed_fields": allowed_fields,
                 "request_id": request_id,
                 "created_at": datetime.utcnow().isoformat(),
-                "status": "active"
+                "status": "active",
+                "epochs": list(epochs)
             }
             
-            # Store with TTL
+            # Store with TTL plus (subject, purpose) -> token_hash index,
+            # atomically in one round trip
             key = f"token:{token_hash}"
-            self.redis_client.setex(
-                key,
-                self.ttl_seconds,
-                json.dumps(metadata)
-            )
-            
-            # Also store reverse index: subject_id -> token_hash
-            subject_key = f"subject:{subject_id}:tokens"
-            self.redis_client.sadd(subject_key, token_hash)
-            self.redis_client.expire(subject_key, self.ttl_seconds)
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=_encode_metadata(metadata))
+                pipe.expire(key, self.ttl_seconds)
+                self._index_token(pipe, token_hash, subject_id, purpose)
+                await pipe.execute()
             
             return True
         
@@ -112,39 +376,119 @@ class TokenStore:
             print(f"Failed to store token: {str(e)}")
             return False
     
-    def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+    async def store_group_token(
+        self,
+        token: str,
+        subject_ids: List[str],
+        purpose: str,
+        allowed_fields: list,
+        request_id: str,
+        group_id: str
+    ) -> bool:
         """
-        Verify token exists and is not revoked.
+        Store a token covering a group of subjects (bulk access).
+        
+        The token records every subject's current epochs, so bumping any
+        of them revokes it, and is indexed under every subject for
+        counting. Epochs are read in one round trip and all writes go out
+        in a second.
         
         Args:
             token: Raw JWT token
+            subject_ids: Subjects the token grants access to
+            purpose: Purpose of access
+            allowed_fields: List of allowed fields
+            request_id: Request ID for tracing
+            group_id: Bulk access group ID
         
         Returns:
-            dict: Token metadata if valid, None if revoked or not found
+            bool: True if stored successfully
         """
         
         try:
             token_hash = self._hash_token(token)
-            key = f"token:{token_hash}"
             
-            data = self.redis_client.get(key)
+            metadata = {
+                "group_id": group_id,
+                "subject_count": len(subject_ids),
+                "purpose": purpose,
+                "allowed_fields": allowed_fields,
+                "request_id": request_id,
+                "created_at": datetime.utcnow().isoformat(),
+                "status": "active"
+            }
+            
+            subject_ids = list(dict.fromkeys(subject_ids))
+            epoch_keys = []
+            for subject_id in subject_ids:
+                epoch_keys.append(SUBJECT_EPOCH_KEY.format(subject_id=subject_id))
+                epoch_keys.append(PURPOSE_EPOCH_KEY.format(subject_id=subject_id, purpose=purpose))
+            values = await self.redis_client.mget(epoch_keys) if epoch_keys else []
+            epochs = {
+                subject_id: f"{int(values[2 * i] or 0)},{int(values[2 * i + 1] or 0)}"
+                for i, subject_id in enumerate(subject_ids)
+            }
             
-            if not data:
-                return None
+            key = f"token:{token_hash}"
+            epochs_key = GROUP_EPOCHS_KEY.format(token_hash=token_hash)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping=_encode_metadata(metadata))
+                pipe.expire(key, self.ttl_seconds)
+                if epochs:
+                    pipe.hset(epochs_key, mapping=epochs)
+                    pipe.expire(epochs_key, self.ttl_seconds)
+                for subject_id in subject_ids:
+                    self._index_token(pipe, token_hash, subject_id, purpose)
+                await pipe.execute()
+            
+            return True
+        
+        except Exception as e:
+            print(f"Failed to store group token: {str(e)}")
+            return False
+    
+    async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify token exists and is not revoked.
+        
+        Checks the record's status and its revocation epochs against the
+        live counters in one round trip. While the revocation listener is
+        running, valid tokens are then served from memory until they
+        expire or are revoked.
+        
+        Args:
+            token: Raw JWT token
+        
+        Returns:
+            dict: Token metadata if valid, None if revoked or not found
+        """
+        
+        try:
+            token_hash = self._hash_token(token)
+            use_cache = self._verified is not None and self._subscribed
+            if use_cache:
+                cached = self._verified.get(token_hash)
+                if cached is not None:
+                    return dict(cached)
+                revocations_seen = self._revocations_seen
             
-            metadata = json.loads(data)
+            key = f"token:{token_hash}"
+            result = await self._verify_script(keys=[key])
             
-            # Check if revoked
-            if metadata.get("status") == "revoked":
+            if not result:
                 return None
             
-            return metadata
+            fields, ttl_ms = result
+            metadata = _decode_metadata(dict(zip(fields[::2], fields[1::2])))
+            if use_cache and ttl_ms > 0 and revocations_seen == self._revocations_seen:
+                self._verified.set(token_hash, metadata, ttl_seconds=ttl_ms / 1000)
+            return dict(metadata)
         
         except Exception as e:
             print(f"Failed to verify token: {str(e)}")
             return None
     
-    def revoke_token(self, token: str) -> bool:
+    async def revoke_token(self, token: str) -> bool:
         """
         Revoke a single token.
         
@@ -164,150 +508,172 @@ class TokenStore:
             token_hash = self._hash_token(token)
             key = f"token:{token_hash}"
             
-            # Get existing metadata
-            data = self.redis_client.get(key)
-            if not data:
-                return False
-            
-            metadata = json.loads(data)
-            metadata["status"] = "revoked"
-            metadata["revoked_at"] = datetime.utcnow().isoformat()
-            
-            # Update metadata
-            self.redis_client.setex(
-                key,
-                self.ttl_seconds,
-                json.dumps(metadata)
+            revoked = await self._revoke_token_script(
+                keys=[key],
+                args=[datetime.utcnow().isoformat()]
             )
-            
-            return True
+            await self._publish_revocation({"token_hash": token_hash})
+            return bool(revoked)
         
         except Exception as e:
             print(f"Failed to revoke token: {str(e)}")
             return False
     
-    def revoke_by_subject(self, subject_id: str) -> int:
+    async def revoke_by_subject(self, subject_id: str) -> int:
         """
         Revoke all tokens for a subject (policy-based revocation).
         
         STEP 10: Policy-Based Revocation
         
+        Bumps the subject's epoch, which invalidates every token issued
+        before it (individual and group) without reading or rewriting their
+        records; they expire with their TTL. The subject's index sets are
+        dropped.
+        
         Args:
             subject_id: Subject/patient ID
         
         Returns:
-            int: Number of tokens revoked
+            int: Number of tokens indexed for the subject (an upper bound on
+                the tokens revoked)
         """
         
         try:
-            subject_key = f"subject:{subject_id}:tokens"
-            
-            # Get all token hashes for subject
-            token_hashes = self.redis_client.smembers(subject_key)
-            revoked_count = 0
-            
-            for token_hash in token_hashes:
-                key = f"token:{token_hash}"
-                
-                # Get metadata
-                data = self.redis_client.get(key)
-                if data:
-                    metadata = json.loads(data)
-                    metadata["status"] = "revoked"
-                    metadata["revoked_at"] = datetime.utcnow().isoformat()
-                    
-                    # Update
-                    self.redis_client.setex(
-                        key,
-                        self.ttl_seconds,
-                        json.dumps(metadata)
-                    )
-                    revoked_count += 1
-            
-            # Clear subject token set
-            self.redis_client.delete(subject_key)
-            
-            return revoked_count
+            revoked = int(await self._revoke_subject_script(
+                keys=[
+                    SUBJECT_EPOCH_KEY.format(subject_id=subject_id),
+                    SUBJECT_PURPOSES_KEY.format(subject_id=subject_id),
+                ],
+                args=[subject_id]
+            ))
+            await self._publish_revocation({"subject_id": subject_id})
+            return revoked
         
         except Exception as e:
             print(f"Failed to revoke by subject: {str(e)}")
             return 0
     
-    def revoke_by_purpose(self, subject_id: str, purpose: str) -> int:
+    async def revoke_by_purpose(self, subject_id: str, purpose: str) -> int:
         """
         Revoke all tokens for a subject with specific purpose.
         
+        Bumps the (subject, purpose) epoch, which invalidates the tokens
+        (individual and group) issued for that purpose without reading
+        their records; tokens for other purposes are unaffected.
+        
         Args:
             subject_id: Subject/patient ID
             purpose: Purpose to revoke
         
         Returns:
-            int: Number of tokens revoked
+            int: Number of tokens indexed for the purpose (an upper bound on
+                the tokens revoked)
         """
         
         try:
-            subject_key = f"subject:{subject_id}:tokens"
-            token_hashes = self.redis_client.smembers(subject_key)
-            revoked_count = 0
-            
-            for token_hash in token_hashes:
-                key = f"token:{token_hash}"
-                data = self.redis_client.get(key)
-                
-                if data:
-                    metadata = json.loads(data)
-                    
-                    # Only revoke if purpose matches
-                    if metadata.get("purpose") == purpose:
-                        metadata["status"] = "revoked"
-                        metadata["revoked_at"] = datetime.utcnow().isoformat()
-                        
-                        self.redis_client.setex(
-                            key,
-                            self.ttl_seconds,
-                            json.dumps(metadata)
-                        )
-                        revoked_count += 1
-            
-            return revoked_count
+            revoked = int(await self._revoke_purpose_script(
+                keys=[
+                    PURPOSE_EPOCH_KEY.format(subject_id=subject_id, purpose=purpose),
+                    SUBJECT_PURPOSE_KEY.format(subject_id=subject_id, purpose=purpose),
+                ],
+            ))
+            await self._publish_revocation({"subject_id": subject_id, "purpose": purpose})
+            return revoked
         
         except Exception as e:
             print(f"Failed to revoke by purpose: {str(e)}")
             return 0
     
-    def get_token_count(self, subject_id: str) -> int:
+    async def get_token_count(self, subject_id: str, purpose: Optional[str] = None) -> int:
         """
         Get number of active tokens for a subject.
         
         Args:
             subject_id: Subject/patient ID
+            purpose: Only count tokens for this purpose (None = all purposes)
         
         Returns:
             int: Number of active tokens
         """
         
         try:
-            subject_key = f"subject:{subject_id}:tokens"
-            count = 0
-            
-            token_hashes = self.redis_client.smembers(subject_key)
-            
-            for token_hash in token_hashes:
-                key = f"token:{token_hash}"
-                data = self.redis_client.get(key)
-                
-                if data:
-                    metadata = json.loads(data)
-                    if metadata.get("status") == "active":
-                        count += 1
-            
-            return count
+            return int(await self._count_active_script(
+                keys=[SUBJECT_PURPOSES_KEY.format(subject_id=subject_id)],
+                args=[subject_id, purpose or ""]
+            ))
         
         except Exception as e:
             print(f"Failed to get token count: {str(e)}")
             return 0
     
-    def health_check(self) -> bool:
+    async def _publish_revocation(self, revocation: Dict[str, Any]) -> None:
+        """Evict locally, then tell the other workers to do the same."""
+        self._evict_revoked(revocation)
+        try:
+            await self.redis_client.publish(REVOCATION_CHANNEL, json.dumps(revocation))
+        except Exception as e:
+            print(f"Failed to publish revocation: {str(e)}")
+    
+    def _evict_revoked(self, revocation: Dict[str, Any]) -> None:
+        """Drop cached verifications a revocation may have invalidated."""
+        self._revocations_seen += 1
+        if self._verified is None:
+            return
+        if "token_hash" in revocation:
+            self._verified.pop(revocation["token_hash"])
+        else:
+            # Group tokens don't list their subjects, so subject-wide
+            # revocations (rare) drop every cached verification
+            self._verified.pop_where(lambda token_hash: True)
+    
+    async def _listen(self) -> None:
+        """Apply published revocations to the verify cache, reconnecting on failure."""
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # Entries cached before (re)subscribing may have missed revocations
+                self._evict_revoked({})
+                self._subscribed = True
+                while True:
+                    # Explicit read timeout: the pool's socket timeout is
+                    # sized for commands, not for waiting on messages
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._evict_revoked(json.loads(message["data"]))
+            except Exception as e:
+                print(f"Revocation listener disconnected: {str(e)}")
+            finally:
+                self._subscribed = False
+                await pubsub.aclose()
+            await asyncio.sleep(5.0)
+    
+    def start_revocation_listener(self) -> None:
+        """Subscribe to revocations in a background task, enabling the verify cache."""
+        if self._verified is None or (self._listener and not self._listener.done()):
+            return
+        self._listener = asyncio.get_running_loop().create_task(self._listen())
+    
+    async def stop_revocation_listener(self) -> None:
+        """Stop the revocation listener; verification goes back to Redis."""
+        if self._listener:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+    
+    def get_verify_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get verify cache statistics.
+        
+        Returns:
+            dict: LRU stats plus whether the cache is in use
+        """
+        if self._verified is None:
+            return {"enabled": False}
+        return {"enabled": self._subscribed, **self._verified.stats()}
+    
+    async def health_check(self) -> bool:
         """
         Check Redis connection health.
         
@@ -316,11 +682,18 @@ class TokenStore:
         """
         
         try:
-            self.redis_client.ping()
+            await self.redis_client.ping()
             return True
         except Exception:
             return False
+    
+    async def close(self) -> None:
+        """Stop the listener and release pooled connections."""
+        await self.stop_revocation_listener()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 
-# Global token store instance
-token_store = TokenStore(host="localhost", port=6379, db=0, ttl_seconds=300)
+# Global token store instance (connects lazily, configured from Settings)
+token_store = TokenStore()
@@ -0,0 +1,123 @@
+import json
+import os
+
+import pytest
+
+import app.database  # noqa: F401  (loads models before the services importing them)
+from app.database import SessionLocal, engine
+from app.models.access_audit_event import AccessAuditEvent
+from app.services import audit
+from app.utils.batch_writer import BatchWriter
+
+
+def _event(subject_id="p1"):
+    return audit.AuditEvent(
+        event_type="ACCESS_REQUEST",
+        user_id="r1",
+        subject_id=subject_id,
+        purpose="RESEARCH",
+        decision="ALLOW",
+        organization="org",
+        permitted_fields=["age"],
+        justifications=["consent"],
+    )
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit.settings, "audit_spill_path", str(tmp_path / "spill.jsonl"))
+    AccessAuditEvent.__table__.create(bind=engine, checkfirst=True)
+    yield
+    AccessAuditEvent.__table__.drop(bind=engine)
+
+
+def _stored_subjects():
+    with SessionLocal() as db:
+        return sorted(row.subject_id for row in db.query(AccessAuditEvent))
+
+
+def test_events_are_slotted():
+    event = _event()
+    with pytest.raises(AttributeError):
+        event.extra = 1
+    assert audit.AuditEvent.from_dict(event.to_dict()).to_dict() == event.to_dict()
+
+
+def test_writer_batches_events_into_table(table):
+    batches = []
+
+    def write(events):
+        batches.append(len(events))
+        audit.write_events(events)
+
+    writer = BatchWriter("test-audit", write, audit.spill_events, batch_size=2)
+    for i in range(5):
+        assert writer.submit(_event(f"p{i}"))
+    writer.flush()
+
+    assert batches == [2, 2, 1]
+    assert _stored_subjects() == ["p0", "p1", "p2", "p3", "p4"]
+
+
+def test_overflow_spills_and_is_loaded_on_start(table):
+    writer = BatchWriter("test-audit", audit.write_events, audit.spill_events, max_queue=1)
+    assert writer.submit(_event("queued"))
+    assert not writer.submit(_event("spilled"))
+
+    with open(audit.settings.audit_spill_path) as spill:
+        assert json.loads(spill.readline())["subject_id"] == "spilled"
+
+    assert audit.load_spilled_events() == 1
+    writer.flush()
+    assert _stored_subjects() == ["queued", "spilled"]
+    assert audit.load_spilled_events() == 0
+
+
+def test_unreadable_spill_lines_are_quarantined(table):
+    path = audit.settings.audit_spill_path
+    audit.spill_events([_event("good")])
+    with open(path, "a") as spill:
+        spill.write("{not json\n")
+
+    assert audit.load_spilled_events() == 1
+    assert _stored_subjects() == ["good"]
+    with open(f"{path}.rejected") as rejected:
+        assert rejected.read() == "{not json\n"
+    assert not os.path.exists(f"{path}.loading")
+
+
+def test_interrupted_load_is_resumed(table, monkeypatch):
+    path = audit.settings.audit_spill_path
+    audit.spill_events([_event("first")])
+
+    def crash(events, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(audit, "write_events", crash)
+    with pytest.raises(KeyboardInterrupt):
+        audit.load_spilled_events()
+    assert os.path.exists(path) and not os.path.exists(f"{path}.loading")
+
+    # A .loading file left by a crashed process is picked up as well
+    os.replace(path, f"{path}.loading")
+    audit.spill_events([_event("second")])
+    monkeypatch.undo()
+    monkeypatch.setattr(audit.settings, "audit_spill_path", path)
+    assert audit.load_spilled_events() == 1
+    assert audit.load_spilled_events() == 1
+    assert _stored_subjects() == ["first", "second"]
+
+
+def test_reloading_a_loaded_file_skips_stored_events(table):
+    path = audit.settings.audit_spill_path
+    audit.spill_events([_event("once")])
+    with open(path) as spill:
+        contents = spill.read()
+
+    assert audit.load_spilled_events() == 1
+    # Crash after the write but before the .loading file was removed
+    with open(f"{path}.loading", "w") as replay:
+        replay.write(contents)
+    assert audit.load_spilled_events() == 1
+    assert _stored_subjects() == ["once"]
+    assert not os.path.exists(path)
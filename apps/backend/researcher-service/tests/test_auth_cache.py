@@ -0,0 +1,101 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import app.database  # noqa: F401  (loads models before the services importing them)
+from app.services import auth_service
+from app.utils.cache import ClaimsCache
+
+
+def test_decode_access_token_is_cached():
+    token = auth_service.create_access_token({"sub": "r-1"})
+    before = auth_service.get_claims_cache_stats()["hits"]
+
+    first = auth_service.decode_access_token(token)
+    first["sub"] = "tampered"
+    second = auth_service.decode_access_token(token)
+
+    assert second["sub"] == "r-1"
+    assert auth_service.get_claims_cache_stats()["hits"] == before + 1
+
+
+def test_expired_tokens_are_not_cached():
+    token = auth_service.create_access_token({"sub": "r-1"}, timedelta(seconds=-1))
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            auth_service.decode_access_token(token)
+
+
+def test_claims_expire_with_the_token():
+    cache = ClaimsCache(maxsize=10, ttl_seconds=300)
+    cache.set_claims("a", {"sub": "1"}, exp=time.time() + 0.05)
+    cache.set_claims("b", {"sub": "2"}, exp=time.time() - 1)
+
+    assert cache.get_claims("a") == {"sub": "1"}
+    assert cache.get_claims("b") is None
+    time.sleep(0.06)
+    assert cache.get_claims("a") is None
+
+
+@pytest.fixture
+def db():
+    from app.database import SessionLocal, engine
+    from app.models.researcher import Researcher
+
+    Researcher.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    yield session
+    session.query(Researcher).delete()
+    session.commit()
+    session.close()
+
+
+def test_principal_is_cached_until_the_researcher_changes(db):
+    from app.models.researcher import Researcher
+    from app.schemas.researcher import ResearcherUpdate
+    from app.services import researcher_service
+
+    researcher = Researcher(email="a@example.org", hashed_password="x", full_name="A", institution="Old")
+    db.add(researcher)
+    db.commit()
+    token = auth_service.create_access_token({"sub": researcher.id})
+
+    assert auth_service.get_current_principal(db, token).institution == "Old"
+    # Changed behind the service's back: still served from cache
+    db.query(Researcher).update({"institution": "Stale"})
+    db.commit()
+    assert auth_service.get_current_principal(db, token).institution == "Old"
+
+    researcher_service.update_researcher(db, researcher.id, ResearcherUpdate(institution="New"))
+    assert auth_service.get_current_principal(db, token).institution == "New"
+
+    researcher_service.set_researcher_active(db, researcher.id, False)
+    assert auth_service._claims_cache.get_claims(token) is None
+    with pytest.raises(HTTPException) as exc:
+        auth_service.get_current_principal(db, token)
+    assert exc.value.status_code == 403
+
+
+def test_status_endpoint_deactivates_cached_principal(db, monkeypatch):
+    from app.core.config import settings
+    from app.models.researcher import Researcher
+    from app.routers import auth as auth_router
+    from app.schemas.researcher import ResearcherStatusUpdate
+
+    monkeypatch.setattr(settings, "internal_api_key", "secret")
+    researcher = Researcher(email="b@example.org", hashed_password="x", full_name="B")
+    db.add(researcher)
+    db.commit()
+    token = auth_service.create_access_token({"sub": researcher.id})
+    assert auth_service.get_current_principal(db, token).is_active
+
+    with pytest.raises(HTTPException) as exc:
+        auth_router.set_researcher_status(researcher.id, ResearcherStatusUpdate(is_active=False), "wrong", db)
+    assert exc.value.status_code == 401
+
+    auth_router.set_researcher_status(researcher.id, ResearcherStatusUpdate(is_active=False), "secret", db)
+    with pytest.raises(HTTPException) as exc:
+        auth_service.get_current_principal(db, token)
+    assert exc.value.status_code == 403
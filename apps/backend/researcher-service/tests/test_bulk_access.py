@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import SessionLocal, engine
+from app.models.consent_policy import ConsentPolicy
+from app.schemas.access_request import BulkAccessRequest
+from app.services import access_service
+from app.services.policy_service import clear_policy_cache, fetch_compiled_policies
+
+
+FULL = {"allowed_fields": ["age", "diagnosis"], "denied_fields": [], "conditions": {}}
+AGE_ONLY = {"allowed_fields": ["age"], "denied_fields": ["diagnosis"], "conditions": {}}
+CAPPED = {"allowed_fields": ["age", "diagnosis"], "denied_fields": [], "conditions": {"max_records": 10}}
+
+
+@pytest.fixture
+def consent_rows():
+    ConsentPolicy.__table__.create(bind=engine, checkfirst=True)
+    expires = datetime.utcnow() + timedelta(days=30)
+    rows = [
+        ("p1", FULL, 0.95), ("p2", FULL, 0.9), ("p3", AGE_ONLY, 0.99),
+        ("p4", CAPPED, 0.9), ("p5", CAPPED, 0.9), ("p6", FULL, 0.5),
+    ]
+    db = SessionLocal()
+    db.add_all([
+        ConsentPolicy(
+            id=f"c-{subject}", subject_id=subject, purpose="RESEARCH",
+            policy_json=policy, confidence_score=score, expires_at=expires
+        )
+        for subject, policy, score in rows
+    ])
+    db.commit()
+    db.close()
+    clear_policy_cache()
+    yield
+    ConsentPolicy.__table__.drop(bind=engine)
+
+
+def _request(**kwargs):
+    return BulkAccessRequest(
+        purpose="RESEARCH",
+        requested_fields=["age", "diagnosis"],
+        query="SELECT * FROM patients",
+        **kwargs
+    )
+
+
+def test_bulk_request_requires_exactly_one_cohort_source():
+    with pytest.raises(ValueError):
+        BulkAccessRequest(purpose="RESEARCH", requested_fields=["age"], query="SELECT age FROM t")
+    with pytest.raises(ValueError):
+        _request(subject_ids=["p1"], cohort_id="s1")
+
+
+def test_fetch_compiled_policies_reports_denials(consent_rows):
+    policies, denied = fetch_compiled_policies(SessionLocal(), ["p1", "p6", "p9"], "RESEARCH")
+    
+    assert set(policies) == {"p1"}
+    assert denied["p6"].startswith("Consent confidence too low")
+    assert denied["p9"].startswith("No valid consent")
+
+
+def test_bulk_access_groups_by_permitted_fields(consent_rows):
+    subjects = ["p1", "p2", "p3", "p4", "p5", "p6", "p1"]
+    result = access_service.handle_bulk_access_request(
+        _request(subject_ids=subjects), subjects, user={}, db=SessionLocal()
+    )
+    
+    groups = {tuple(g.subject_ids): g for g in result.groups}
+    assert set(groups) == {("p1", "p2"), ("p4", "p5"), ("p3",)}
+    assert """patient_id = ANY('{"p1","p2"}')""" in groups[("p1", "p2")].rewritten_query
+    assert groups[("p3",)].permitted_fields == ["age"]
+    # max_records is enforced for each subject, not pooled
+    capped = groups[("p4", "p5")].rewritten_query
+    assert "ROW_NUMBER() OVER (PARTITION BY patient_id) AS _subject_rank" in capped
+    assert capped.endswith("WHERE _subject_rank <= 10")
+    assert set(result.denied) == {"p6"}
+    assert result.decision == "PARTIAL_ALLOW"
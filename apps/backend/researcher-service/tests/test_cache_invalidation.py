@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from app.utils import cache_invalidation
+from app.utils.cache_invalidation import InvalidationBus
+from app.utils.token_store import TokenStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TokenStore(client=fakeredis.FakeAsyncRedis(decode_responses=True), verify_cache_size=0)
+    monkeypatch.setattr(cache_invalidation, "token_store", store)
+    return store
+
+
+async def _wait_for(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    return condition()
+
+
+async def test_invalidations_reach_other_workers(store):
+    sender, receiver = InvalidationBus(), InvalidationBus()
+    received, cleared = [], []
+    sender.register("policy", lambda payload: pytest.fail("own message applied"), lambda: None)
+    receiver.register("policy", received.append, lambda: cleared.append(True))
+    sender.start_listener()
+    receiver.start_listener()
+    try:
+        assert await _wait_for(lambda: sender.subscribed and receiver.subscribed)
+        # Subscribing clears the cache: earlier invalidations may have been missed
+        assert cleared == [True]
+        
+        sender.publish("policy", {"subject_id": "p1"})
+        assert await _wait_for(lambda: received)
+        assert received == [{"subject_id": "p1"}]
+        
+        # From a worker thread (sync endpoints, the replicator)
+        await asyncio.to_thread(sender.publish, "policy", {"subject_id": "p2"})
+        assert await _wait_for(lambda: len(received) == 2)
+    finally:
+        await sender.stop_listener()
+        await receiver.stop_listener()
+    assert not receiver.subscribed
+
+
+def test_publish_without_listener_is_local_only():
+    InvalidationBus().publish("policy", {"subject_id": "p1"})
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.database import SessionLocal, engine
+from app.models.consent_policy import ConsentPolicy
+from app.models.consented_cohort import ConsentedSubject
+from app.services import cohort_service
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # The cohort table is only read while replication maintains it
+    monkeypatch.setattr(settings, "consent_replication_enabled", True)
+    cohort_service._cohort_sizes.clear()
+    ConsentPolicy.__table__.create(bind=engine, checkfirst=True)
+    ConsentedSubject.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    yield session
+    session.close()
+    ConsentPolicy.__table__.drop(bind=engine)
+    ConsentedSubject.__table__.drop(bind=engine)
+
+
+def _add(db, policy_id, subject_id, purpose="RESEARCH", score=0.9, days=1):
+    db.add(ConsentPolicy(
+        id=policy_id, subject_id=subject_id, purpose=purpose, policy_json={},
+        confidence_score=score, expires_at=datetime.utcnow() + timedelta(days=days)
+    ))
+    db.commit()
+
+
+def test_rebuild_applies_confidence_and_expiry(db):
+    _add(db, "c1", "p1")
+    _add(db, "c2", "p1", purpose="TREATMENT")
+    _add(db, "c3", "p2", score=0.5)
+    _add(db, "c4", "p3", days=-1)
+    
+    assert cohort_service.rebuild_consented_cohort(db) == 2
+    assert cohort_service.get_cohort_sizes(db) == {"RESEARCH": 1, "TREATMENT": 1}
+
+
+def test_refresh_tracks_consent_changes(db):
+    _add(db, "c1", "p1")
+    cohort_service.rebuild_consented_cohort(db)
+    assert cohort_service.get_cohort_sizes(db, "RESEARCH") == {"RESEARCH": 1}
+    
+    _add(db, "c2", "p2")
+    cohort_service.refresh_consented_subjects(db, ["p2"])
+    assert cohort_service.get_cohort_sizes(db, "RESEARCH") == {"RESEARCH": 2}
+    
+    # Revocation: the policy row is expired, then the subject refreshed
+    db.query(ConsentPolicy).filter(ConsentPolicy.id == "c1").update(
+        {ConsentPolicy.expires_at: datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    cohort_service.refresh_consented_subjects(db, ["p1"], "RESEARCH")
+    assert cohort_service.get_cohort_sizes(db, "RESEARCH") == {"RESEARCH": 1}
+
+
+def test_expire_sweep_removes_lapsed_members(db):
+    db.add(ConsentedSubject(purpose="RESEARCH", subject_id="p1", expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    
+    assert cohort_service.expire_consented_subjects(db) == 1
+    assert cohort_service.get_cohort_sizes(db, "RESEARCH") == {"RESEARCH": 0}
+
+
+def test_sizes_fall_back_to_policies_without_replication(db, monkeypatch):
+    monkeypatch.setattr(settings, "consent_replication_enabled", False)
+    _add(db, "c1", "p1")
+    _add(db, "c2", "p1")
+    _add(db, "c3", "p2", score=0.5)
+    
+    # Nothing has populated consented_cohort
+    assert cohort_service.get_cohort_sizes(db) == {"RESEARCH": 1}
@@ -0,0 +1,143 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.database import SessionLocal, engine
+from app.models.consent_policy import ConsentPolicy
+from app.models.consented_cohort import ConsentedSubject
+from app.models.replication_state import ReplicationState
+from app.services.consent_replication import ConsentReplicator, transform_version
+
+
+INTERPRETED = {
+    "allowed_data": ["age", "diagnosis"],
+    "denied_data": ["name"],
+    "purpose": ["research", "care", "AI_training"],
+    "expiry": None,
+    "conditions": ["anonymized_only"],
+    "ambiguity_flags": [],
+}
+
+
+@pytest.fixture
+def source_tables():
+    ConsentPolicy.__table__.create(bind=engine, checkfirst=True)
+    ReplicationState.__table__.create(bind=engine, checkfirst=True)
+    ConsentedSubject.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE consents (id TEXT PRIMARY KEY, patient_id TEXT, status TEXT, confidence_score REAL, "
+            "updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE consent_versions (id TEXT PRIMARY KEY, consent_id TEXT, version_number INTEGER, "
+            "extracted_policy JSON, valid_to DATETIME, created_at DATETIME)"
+        ))
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE consent_versions"))
+        conn.execute(text("DROP TABLE consents"))
+    ConsentPolicy.__table__.drop(bind=engine)
+    ReplicationState.__table__.drop(bind=engine)
+    ConsentedSubject.__table__.drop(bind=engine)
+
+
+def _add_version(version_id, consent_id, number, policy, created_at, status="active"):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT OR REPLACE INTO consents VALUES (:id, :patient, :status, 0.9, :created)"),
+            {"id": consent_id, "patient": f"patient-{consent_id}", "status": status, "created": created_at},
+        )
+        conn.execute(
+            text("INSERT INTO consent_versions VALUES (:id, :consent, :n, :policy, NULL, :created)"),
+            {"id": version_id, "consent": consent_id, "n": number,
+             "policy": json.dumps(policy), "created": created_at},
+        )
+
+
+def test_transform_maps_purposes_and_conditions():
+    now = datetime(2026, 1, 1)
+    rows = transform_version({
+        "consent_id": "c1", "patient_id": "p1", "status": "active",
+        "confidence_score": 0.9, "extracted_policy": INTERPRETED, "created_at": now,
+    }, now)
+    
+    assert [row["id"] for row in rows] == ["c1:RESEARCH", "c1:TREATMENT"]
+    assert rows[0]["policy_json"]["conditions"] == {"anonymization_required": True}
+    assert rows[0]["expires_at"] == now + timedelta(days=365)
+
+
+def test_replication_applies_latest_version_and_advances_watermark(source_tables):
+    old = datetime.utcnow() - timedelta(hours=1)
+    _add_version("v1", "c1", 1, INTERPRETED, old)
+    _add_version("v2", "c1", 2, {**INTERPRETED, "purpose": ["research"], "allowed_data": ["age"]},
+                 old + timedelta(minutes=1))
+    _add_version("v3", "c2", 1, {}, old + timedelta(minutes=2))
+    
+    replicator = ConsentReplicator(settle_seconds=60)
+    db = SessionLocal()
+    # v3 is still being interpreted, so the watermark stops before it
+    assert replicator.run_once(db) == 2
+    assert replicator.run_once(db) == 0
+    
+    research = db.get(ConsentPolicy, "c1:RESEARCH")
+    assert research.policy_json["allowed_fields"] == ["age"]
+    assert db.get(ConsentPolicy, "c1:TREATMENT") is None
+    assert db.get(ReplicationState, "consent_versions").watermark_id == "v2"
+    assert db.get(ConsentedSubject, ("RESEARCH", "patient-c1")) is not None
+    
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE consent_versions SET extracted_policy = :policy WHERE id = 'v3'"),
+            {"policy": json.dumps(INTERPRETED)},
+        )
+    assert replicator.run_once(db) == 1
+    assert db.get(ConsentPolicy, "c2:RESEARCH") is not None
+    assert db.get(ReplicationState, "consent_versions").watermark_id == "v3"
+    
+    # A revoked consent's next version is replicated as already expired
+    _add_version("v4", "c1", 3, INTERPRETED, old + timedelta(minutes=3), status="revoked")
+    assert replicator.run_once(db) == 1
+    db.expire_all()
+    assert db.get(ConsentPolicy, "c1:RESEARCH").expires_at <= datetime.utcnow()
+    assert db.get(ConsentedSubject, ("RESEARCH", "patient-c1")) is None
+    db.close()
+
+
+def test_status_only_revocation_expires_replicated_policies(source_tables):
+    old = datetime.utcnow() - timedelta(hours=1)
+    _add_version("v1", "c1", 1, INTERPRETED, old)
+    
+    replicator = ConsentReplicator(settle_seconds=60)
+    db = SessionLocal()
+    assert replicator.run_once(db) == 1
+    assert replicator.run_status_once(db) == 0
+    
+    # consent-ingestion revokes by updating the consent, without a new version
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE consents SET status = 'revoked', updated_at = :now WHERE id = 'c1'"),
+            {"now": datetime.utcnow()},
+        )
+    assert replicator.run_status_once(db) == 1
+    assert replicator.run_status_once(db) == 0
+    db.expire_all()
+    assert db.get(ConsentPolicy, "c1:RESEARCH").expires_at <= datetime.utcnow()
+    assert db.get(ConsentedSubject, ("RESEARCH", "patient-c1")) is None
+    assert db.get(ReplicationState, "consent_status").watermark_id == "c1"
+    db.close()
+
+
+def test_stale_pending_version_stops_holding_back_the_watermark(source_tables):
+    old = datetime.utcnow() - timedelta(hours=2)
+    _add_version("v1", "c1", 1, {}, old)
+    _add_version("v2", "c2", 1, INTERPRETED, old + timedelta(minutes=1))
+    
+    db = SessionLocal()
+    assert ConsentReplicator(settle_seconds=60).run_once(db) == 0
+    assert ConsentReplicator(settle_seconds=60, pending_timeout_seconds=3600).run_once(db) == 2
+    assert db.get(ConsentPolicy, "c2:RESEARCH") is not None
+    assert db.get(ReplicationState, "consent_versions").watermark_id == "v2"
+    db.close()
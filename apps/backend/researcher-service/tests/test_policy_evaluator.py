@@ -0,0 +1,148 @@
+from datetime import datetime
+
+import pytest
+
+from app.services import query_rewriter
+from app.services.policy_evaluator import (
+    CompiledPolicy,
+    FieldDictionary,
+    FieldDictionaryFull,
+    combine_decisions,
+    compile_conditions,
+    compile_policy,
+    evaluate_policy,
+    parse_time_window,
+)
+from app.services.query_rewriter import ProjectFields, RewritePipeline
+
+
+NOW = datetime(2025, 1, 31)
+
+
+def setup_function():
+    query_rewriter.clear_rewrite_cache()
+
+
+@pytest.mark.parametrize("window, start", [
+    (30, datetime(2025, 1, 1)),
+    ("30d", datetime(2025, 1, 1)),
+    ("P30D", datetime(2025, 1, 1)),
+    ({"start": "2024-06-01"}, datetime(2024, 6, 1)),
+])
+def test_parse_time_window(window, start):
+    assert parse_time_window(window, now=NOW)[0] == start
+
+
+def test_parse_time_window_date_only_end_is_inclusive():
+    assert parse_time_window({"start": "2024-01-01", "end": "2024-12-31"}) == (
+        datetime(2024, 1, 1), datetime(2025, 1, 1)
+    )
+    assert parse_time_window({"end": "2024-12-31T12:00:00"})[1] == datetime(2024, 12, 31, 12)
+
+
+def test_parse_time_window_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_time_window("sometimes", now=NOW)
+
+
+def test_compile_conditions_enforces_in_sql():
+    policy = {
+        "allowed_fields": ["age", "gender"],
+        "conditions": {
+            "time_window": "30d",
+            "aggregation_level": "gender",
+            "max_records": 1000,
+        },
+    }
+    
+    sql = RewritePipeline([
+        ProjectFields(["age", "gender"]),
+        *compile_conditions(policy, now=NOW),
+    ]).run("SELECT * FROM patient_records")
+    
+    assert sql == (
+        "SELECT gender, COUNT(*) AS record_count FROM "
+        "(SELECT age, gender FROM patient_records "
+        "WHERE created_at >= CAST('2025-01-01T00:00:00' AS TIMESTAMP) LIMIT 1000) AS consent_agg "
+        "GROUP BY gender"
+    )
+
+
+def test_max_records_caps_source_rows_before_aggregation():
+    policy = {
+        "allowed_fields": ["age", "gender"],
+        "conditions": {"aggregation_level": "gender", "max_records": 100},
+    }
+    
+    sql = RewritePipeline([
+        ProjectFields(["age", "gender"]),
+        *compile_conditions(policy, records_consumed=40),
+    ]).run("SELECT * FROM patient_records")
+    
+    assert sql == (
+        "SELECT gender, COUNT(*) AS record_count FROM "
+        "(SELECT age, gender FROM patient_records LIMIT 60) AS consent_agg "
+        "GROUP BY gender"
+    )
+
+
+def test_compile_conditions_without_conditions():
+    assert compile_conditions({"allowed_fields": ["age"]}) == []
+
+
+POLICY = {
+    "allowed_fields": ["age", "gender", "medical_history"],
+    "denied_fields": ["name", "aadhaar"],
+}
+
+
+def test_evaluate_policy_partial_allow():
+    decision = evaluate_policy(POLICY, ["age", "name", "gender"])
+    
+    assert decision.decision == "PARTIAL_ALLOW"
+    assert sorted(decision.permitted_fields) == ["age", "gender"]
+    assert decision.justifications[0] == "Partial access: 2 of 3 fields allowed"
+    assert decision.justifications[1] == "Explicitly denied fields: ['name']"
+
+
+def test_evaluate_policy_allow_and_deny():
+    assert evaluate_policy(POLICY, ["age", "age"]).decision == "ALLOW"
+    assert evaluate_policy(POLICY, ["aadhaar", "unknown_field"]).decision == "DENY"
+    assert evaluate_policy(POLICY, []).decision == "DENY"
+
+
+def test_compiled_policy_memoizes_decisions():
+    compiled = compile_policy(POLICY)
+    
+    assert compile_policy(dict(POLICY)) is compiled
+    assert compiled.decide(["gender", "age"]) is compiled.decide(["age", "gender"])
+
+
+def test_combine_decisions_intersects_permitted_fields():
+    combined = combine_decisions([
+        evaluate_policy(POLICY, ["age", "gender"]),
+        evaluate_policy({"allowed_fields": ["gender"]}, ["age", "gender"]),
+    ])
+    
+    assert combined.permitted_fields == ["gender"]
+    assert combined.decision == "PARTIAL_ALLOW"
+
+
+def test_requested_fields_do_not_grow_the_field_dictionary():
+    from app.services.policy_evaluator import field_dictionary
+    
+    policy = CompiledPolicy({"allowed_fields": ["age"], "denied_fields": []})
+    before = len(field_dictionary._names)
+    decision = policy.decide(["age"] + [f"junk_{i}" for i in range(50)])
+    
+    assert len(field_dictionary._names) == before
+    assert decision.decision == "PARTIAL_ALLOW"
+    assert decision.permitted_fields == ["age"]
+
+
+def test_full_field_dictionary_fails_loudly():
+    dictionary = FieldDictionary(max_fields=1)
+    dictionary.assign("age")
+    with pytest.raises(FieldDictionaryFull):
+        dictionary.mask(["age", "gender"], assign=True)
+    assert dictionary.mask(["gender"]) == (0, ("gender",))
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal, engine
+from app.models.consent_policy import ConsentPolicy
+from app.services import policy_service
+
+
+POLICY = {"allowed_fields": ["age"], "denied_fields": [], "conditions": {}}
+
+
+@pytest.fixture
+def db():
+    ConsentPolicy.__table__.create(bind=engine, checkfirst=True)
+    policy_service.clear_policy_cache()
+    session = SessionLocal()
+    yield session
+    session.close()
+    ConsentPolicy.__table__.drop(bind=engine)
+
+
+def _add(db, subject_id, score=0.9, policy=POLICY):
+    db.add(ConsentPolicy(
+        id=f"c-{subject_id}", subject_id=subject_id, purpose="RESEARCH",
+        policy_json=policy, confidence_score=score,
+        expires_at=datetime.utcnow() + timedelta(days=1)
+    ))
+    db.commit()
+
+
+def test_valid_policy_is_served_from_cache(db):
+    _add(db, "p1")
+    first = policy_service.fetch_compiled_policy(db, "p1", "RESEARCH")
+    
+    db.query(ConsentPolicy).delete()
+    db.commit()
+    
+    assert policy_service.fetch_compiled_policy(db, "p1", "RESEARCH") is first
+    assert policy_service.get_policy_cache_stats()["hits"] == 1
+
+
+def test_invalidation_reloads_changed_consent(db):
+    _add(db, "p1")
+    policy_service.fetch_compiled_policy(db, "p1", "RESEARCH")
+    
+    db.query(ConsentPolicy).delete()
+    db.commit()
+    assert policy_service.invalidate_consent_policy("p1") == 1
+    
+    with pytest.raises(HTTPException) as exc:
+        policy_service.fetch_compiled_policy(db, "p1", "RESEARCH")
+    assert exc.value.status_code == 403
+
+
+def test_confidence_gate_is_cached_as_denial(db):
+    _add(db, "p2", score=0.5)
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            policy_service.fetch_compiled_policy(db, "p2", "RESEARCH")
+        assert "confidence too low" in exc.value.detail
+    assert policy_service.get_consent_policy_safe(db, "p2", "RESEARCH") is None
+    assert policy_service.get_policy_cache_stats()["misses"] == 1
+
+
+def test_fetch_does_not_close_request_session(db):
+    _add(db, "p3")
+    record = db.query(ConsentPolicy).one()
+    policy_service.fetch_compiled_policy(db, "p3", "RESEARCH")
+    assert record in db
+
+
+def test_single_and_bulk_lookups_pick_the_same_row(db):
+    for row_id, score in (("c-a", 0.5), ("c-b", 0.95), ("c-c", 0.9)):
+        db.add(ConsentPolicy(
+            id=row_id, subject_id="p4", purpose="RESEARCH",
+            policy_json={**POLICY, "allowed_fields": [row_id]}, confidence_score=score,
+            expires_at=datetime.utcnow() + timedelta(days=1)
+        ))
+    db.commit()
+    
+    single = policy_service.fetch_compiled_policy(db, "p4", "RESEARCH")
+    policy_service.clear_policy_cache()
+    bulk, denied = policy_service.fetch_compiled_policies(db, ["p4"], "RESEARCH")
+    
+    assert not denied
+    assert single.source["allowed_fields"] == bulk["p4"].source["allowed_fields"] == ["c-b"]
+
+
+def test_revoked_subject_is_denied_on_the_next_request(db):
+    _add(db, "p5")
+    policy_service.fetch_compiled_policy(db, "p5", "RESEARCH")
+    
+    assert policy_service.expire_consent_policies(db, "p5") == 1
+    policy_service.invalidate_consent_policy("p5")
+    
+    with pytest.raises(HTTPException) as exc:
+        policy_service.fetch_compiled_policy(db, "p5", "RESEARCH")
+    assert exc.value.status_code == 403
+    policies, denied = policy_service.fetch_compiled_policies(db, ["p5"], "RESEARCH")
+    assert not policies and "p5" in denied
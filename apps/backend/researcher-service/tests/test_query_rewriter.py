@@ -0,0 +1,204 @@
+from datetime import datetime
+
+import pytest
+
+from app.services import query_rewriter
+from app.services.query_rewriter import (
+    Aggregate,
+    EnforceLimit,
+    InjectPredicate,
+    ProjectFields,
+    RestrictScope,
+    RewritePipeline,
+    SubjectLimit,
+    TimeWindow,
+    fingerprint_query,
+    rewrite_query,
+    validate_query,
+)
+
+
+def setup_function():
+    query_rewriter.clear_rewrite_cache()
+
+
+def test_fingerprint_strips_literals():
+    template, literals = fingerprint_query("SELECT age FROM patients WHERE region = 'south'  LIMIT 10")
+    assert template == "SELECT age FROM patients WHERE region = :_lit0 LIMIT :_lit1"
+    assert literals == ("'south'", "10")
+
+
+def test_fingerprint_keeps_quoted_identifiers():
+    template, literals = fingerprint_query('SELECT "col 1" FROM t WHERE x = 2')
+    assert template == 'SELECT "col 1" FROM t WHERE x = :_lit0'
+    assert literals == ("2",)
+
+
+def test_fingerprint_handles_postgres_quoting():
+    sql = "SELECT age FROM t WHERE a = E'it\\'s' AND b = $$x'y$$ AND c = $q$z$q$ -- note\n LIMIT 5"
+    template, literals = fingerprint_query(sql)
+    
+    assert template == "SELECT age FROM t WHERE a = :_lit0 AND b = :_lit1 AND c = :_lit2 LIMIT :_lit3"
+    assert literals == ("E'it\\'s'", "$$x'y$$", "$q$z$q$", "5")
+    assert rewrite_query(sql, ["age"]) == "SELECT age FROM t WHERE a = E'it\\'s' AND b = $$x'y$$ AND c = $q$z$q$ LIMIT 5"
+
+
+def test_rewrite_query_removes_denied_columns():
+    sql = rewrite_query("SELECT name, aadhaar, age FROM patients", ["age", "gender"])
+    assert sql == "SELECT age FROM patients"
+
+
+def test_rewrite_query_rebinds_literals_from_cache():
+    first = rewrite_query("SELECT name, age FROM patients WHERE region = 'south'", ["age"])
+    second = rewrite_query("SELECT name, age FROM patients WHERE region = 'north'", ["age"])
+    
+    assert first == "SELECT age FROM patients WHERE region = 'south'"
+    assert second == "SELECT age FROM patients WHERE region = 'north'"
+    stats = query_rewriter.get_rewrite_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_rewrite_query_cache_is_keyed_by_field_set():
+    rewrite_query("SELECT * FROM patients", ["gender", "age"])
+    sql = rewrite_query("SELECT * FROM patients", ["age", "gender"])
+    
+    assert sql == "SELECT age, gender FROM patients"
+    assert query_rewriter.get_rewrite_cache_stats()["hits"] == 1
+    assert rewrite_query("SELECT * FROM patients", ["age"]) == "SELECT age FROM patients"
+
+
+def test_rewrite_query_bypasses_cache_for_unbindable_literals():
+    sql = rewrite_query("SELECT age FROM t WHERE d > NOW() - INTERVAL '1 day'", ["age"])
+    
+    assert "INTERVAL '1 DAY'" in sql
+    assert query_rewriter.get_rewrite_cache_stats()["bypasses"] == 1
+
+
+def test_validate_query():
+    assert validate_query("SELECT age FROM patients WHERE id = 5")
+    assert not validate_query("DELETE FROM patients WHERE id = 5")
+
+
+def test_pipeline_applies_transforms_in_one_pass():
+    sql = RewritePipeline([
+        ProjectFields(["age", "gender"]),
+        InjectPredicate("patient_id", "p-1"),
+        EnforceLimit(100),
+    ]).run("SELECT name, age, gender FROM patient_records WHERE age > 40")
+    
+    assert sql == (
+        "SELECT age, gender FROM patient_records "
+        "WHERE age > 40 AND patient_id = 'p-1' LIMIT 100"
+    )
+
+
+def test_pipeline_parameters_do_not_fragment_cache():
+    pipeline_sql = "SELECT age FROM patient_records"
+    first = RewritePipeline([InjectPredicate("patient_id", "p-1")]).run(pipeline_sql)
+    second = RewritePipeline([InjectPredicate("patient_id", "p'2")]).run(pipeline_sql)
+    
+    assert first.endswith("WHERE patient_id = 'p-1'")
+    assert second.endswith("WHERE patient_id = 'p''2'")
+    assert query_rewriter.get_rewrite_cache_stats()["hits"] == 1
+
+
+def test_pipeline_list_predicate_and_existing_limit():
+    sql = RewritePipeline([
+        InjectPredicate("patient_id", ["a", 'b"c']),
+        EnforceLimit(50),
+    ]).run("SELECT age FROM patient_records LIMIT 10")
+    
+    assert sql == (
+        "SELECT age FROM patient_records "
+        """WHERE patient_id = ANY('{"a","b\\"c"}') LIMIT LEAST(10, 50)"""
+    )
+
+
+def test_list_predicate_shares_plan_across_cohort_sizes():
+    pipeline_sql = "SELECT age FROM patient_records"
+    RewritePipeline([InjectPredicate("patient_id", ["a"])]).run(pipeline_sql)
+    RewritePipeline([InjectPredicate("patient_id", ["a", "b", "c"])]).run(pipeline_sql)
+    
+    assert query_rewriter.get_rewrite_cache_stats()["hits"] == 1
+
+
+def test_subject_limit_caps_rows_per_subject():
+    sql = RewritePipeline([
+        InjectPredicate("patient_id", ["a", "b"]),
+        SubjectLimit("patient_id", 5),
+    ]).run("SELECT age, age + 1 FROM patient_records")
+    
+    assert sql == (
+        "SELECT age, _col1 FROM (SELECT age, age + 1 AS _col1, "
+        "ROW_NUMBER() OVER (PARTITION BY patient_id) AS _subject_rank "
+        """FROM patient_records WHERE patient_id = ANY('{"a","b"}')) AS consent_capped """
+        "WHERE _subject_rank <= 5"
+    )
+
+
+def test_pipeline_time_window_and_aggregation():
+    sql = RewritePipeline([
+        ProjectFields(["age", "gender"]),
+        TimeWindow("created_at", start=datetime(2024, 1, 1)),
+        Aggregate(["gender"]),
+    ]).run("SELECT age, gender FROM patient_records")
+    
+    assert sql == (
+        "SELECT gender, COUNT(*) AS record_count FROM "
+        "(SELECT age, gender FROM patient_records "
+        "WHERE created_at >= CAST('2024-01-01T00:00:00' AS TIMESTAMP)) AS consent_agg "
+        "GROUP BY gender"
+    )
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT age FROM patients WHERE id = :_lit3",
+    "SELECT age FROM patients WHERE id = %(_arg0)s",
+    "SELECT _lit0 FROM patients",
+])
+def test_reserved_placeholder_names_are_rejected(sql):
+    with pytest.raises(ValueError):
+        rewrite_query(sql, ["age"])
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT age FROM (SELECT age, patient_id FROM patient_records) AS t",
+    "WITH t AS (SELECT age FROM patient_records) SELECT age FROM t",
+    "SELECT age FROM patient_records WHERE age > (SELECT 1)",
+])
+def test_nested_selects_are_rejected(sql):
+    with pytest.raises(ValueError):
+        RewritePipeline([InjectPredicate("patient_id", "p-1")]).run(sql)
+
+
+def _scoped(sql):
+    return RewritePipeline([
+        RestrictScope(["patient_records"], ["age", "gender"]),
+        ProjectFields(["age", "gender"]),
+    ]).run(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT LOWER(hashed_password) FROM patient_records",
+    "SELECT age FROM researchers",
+    "SELECT age FROM public.patient_records",
+    "SELECT age FROM patient_records JOIN researchers ON true",
+    "SELECT age FROM patient_records, researchers",
+    "SELECT age FROM patient_records WHERE aadhaar LIKE '1%'",
+    "SELECT age FROM patient_records ORDER BY name",
+    "SELECT pg_read_file('/etc/passwd') AS age FROM patient_records",
+    "SELECT LOWER(x), id AS _keyset FROM (SELECT hashed_password AS x FROM researchers) AS t",
+])
+def test_restrict_scope_rejects_reads_outside_consent(sql):
+    with pytest.raises(ValueError):
+        _scoped(sql)
+
+
+def test_restrict_scope_prunes_bare_columns():
+    assert _scoped("SELECT name, aadhaar AS age, age FROM patient_records WHERE gender = 'f'") == (
+        "SELECT age FROM patient_records WHERE gender = 'f'"
+    )
+    assert _scoped("SELECT COUNT(*), MAX(age) FROM patient_records") == (
+        "SELECT COUNT(*), MAX(age) FROM patient_records"
+    )
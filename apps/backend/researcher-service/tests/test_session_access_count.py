@@ -0,0 +1,53 @@
+import pytest
+
+import app.database  # noqa: F401  (loads models before the services importing them)
+from app.database import SessionLocal, engine
+from app.models.research_session import ResearchSession
+from app.services import session_service
+from app.services.session_service import SessionService, access_count_writer
+
+
+@pytest.fixture
+def db():
+    ResearchSession.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    session.add(ResearchSession(id="s1", researcher_id="r1", title="T", purpose="RESEARCH", requested_fields=["age"]))
+    session.commit()
+    yield session
+    session.query(ResearchSession).filter_by(id="s1").delete()
+    session.commit()
+    session.close()
+
+
+def _count(db):
+    db.expire_all()
+    return db.get(ResearchSession, "s1")
+
+
+def test_increment_is_atomic_without_writer(db):
+    SessionService.increment_access_count(db, "s1")
+    SessionService.increment_access_count(db, "s1")
+
+    session = _count(db)
+    assert session.data_access_count == 2
+    assert session.last_accessed_at is not None
+
+
+def test_buffered_increments_are_flushed_together(db, monkeypatch):
+    monkeypatch.setattr(type(access_count_writer), "running", property(lambda self: True))
+    for _ in range(5):
+        SessionService.increment_access_count(db, "s1")
+    assert _count(db).data_access_count == 0
+
+    flushed = []
+    def record(batch):
+        flushed.append(len(batch))
+        session_service._flush_access_counts(batch)
+
+    monkeypatch.setattr(access_count_writer, "write_batch", record)
+    access_count_writer.flush()
+
+    assert flushed == [5]
+    session = _count(db)
+    assert session.data_access_count == 5
+    assert session.last_accessed_at is not None
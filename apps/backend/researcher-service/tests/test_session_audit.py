@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+import app.database  # noqa: F401  (loads models before the services importing them)
+from app.database import SessionLocal, engine
+from app.models.session_audit_log import SessionAuditLog
+from app.services import session_audit_service
+from app.services.session_audit_service import SessionAuditService, session_audit_writer
+
+
+@pytest.fixture
+def db():
+    # SQLite does not enforce the session/researcher foreign keys by default
+    SessionAuditLog.__table__.create(bind=engine, checkfirst=True)
+    session = SessionLocal()
+    yield session
+    session.close()
+    SessionAuditLog.__table__.drop(bind=engine)
+
+
+@pytest.fixture
+def writer():
+    session_audit_service.start_session_audit_writer()
+    yield session_audit_writer
+    session_audit_service.stop_session_audit_writer()
+
+
+def test_entries_are_written_in_one_batch(db, monkeypatch):
+    batches = []
+    insert = session_audit_service._insert_entries
+
+    def record(entries):
+        batches.append(len(entries))
+        insert(entries)
+
+    monkeypatch.setattr(session_audit_writer, "write_batch", record)
+    monkeypatch.setattr(type(session_audit_writer), "running", property(lambda self: True))
+
+    ids = [SessionAuditService.log_action(db, "s1", "r1", f"action_{i}") for i in range(3)]
+    assert db.query(SessionAuditLog).count() == 0
+    session_audit_writer.flush()
+
+    assert batches == [3]
+    assert sorted(log.id for log in db.query(SessionAuditLog)) == sorted(ids)
+
+
+def test_wait_returns_after_commit(db, writer):
+    log_id = SessionAuditService.log_action(db, "s1", "r1", "session_created", {"title": "T"}, wait=True)
+
+    log = db.query(SessionAuditLog).filter_by(id=log_id).one()
+    assert log.action == "session_created"
+    assert log.details == {"title": "T"}
+
+
+def test_without_writer_entries_are_written_inline(db):
+    log_id = SessionAuditService.log_action(db, "s1", "r1", "session_archived")
+    assert db.query(SessionAuditLog).filter_by(id=log_id).count() == 1
+
+
+def test_logs_are_paged_by_keyset(db):
+    for i in range(5):
+        db.add(SessionAuditLog(
+            id=f"log-{i}", session_id="s1", researcher_id="r1", action="data_accessed",
+            timestamp=datetime(2026, 1, 1, 12, 0, i // 2)
+        ))
+    db.commit()
+
+    seen = []
+    after = None
+    while True:
+        page = SessionAuditService.get_session_logs(db, "s1", limit=2, after=after)
+        assert page.total == 5 and not page.total_is_estimate
+        seen += [log.id for log in page.logs]
+        if not page.has_more:
+            break
+        after = (page.logs[-1].timestamp, page.logs[-1].id)
+
+    assert seen == ["log-4", "log-3", "log-2", "log-1", "log-0"]
+
+
+def test_failed_batch_only_loses_the_bad_row(db):
+    good = session_audit_service._PendingEntry({"id": "a1", "session_id": "s1", "researcher_id": "r1",
+                                                "action": "ok", "timestamp": datetime.utcnow()}, wait=True)
+    bad = session_audit_service._PendingEntry({"id": "a2", "session_id": "s1", "researcher_id": "r1",
+                                               "action": None, "timestamp": datetime.utcnow()}, wait=True)
+
+    session_audit_service._insert_entries([good, bad])
+
+    assert good.error is None and bad.error is not None
+    assert good.done.is_set() and bad.done.is_set()
+    assert [log.id for log in db.query(SessionAuditLog)] == ["a1"]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+from app.services import data_access_service
+from app.services.query_rewriter import KeysetPage, ProjectFields, RewritePipeline
+from app.utils.cursor import InvalidCursorError, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def records_table():
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS stream_records"))
+        conn.execute(text("CREATE TABLE stream_records (id INTEGER PRIMARY KEY, age INTEGER, name TEXT)"))
+        conn.execute(
+            text("INSERT INTO stream_records (id, age, name) VALUES (:id, :age, :name)"),
+            [{"id": i, "age": 20 + i, "name": f"p{i}"} for i in range(1, 8)]
+        )
+    yield "stream_records"
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE stream_records"))
+
+
+def test_cursor_roundtrip_and_tamper_detection():
+    cursor = encode_cursor({"k": 42, "n": 3})
+    assert decode_cursor(cursor) == {"k": 42, "n": 3}
+    
+    body, signature = cursor.split(".")
+    forged = encode_cursor({"k": 0, "n": 0}).split(".")[0] + "." + signature
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(forged)
+
+
+def test_keyset_batches_resume_after_last_key(records_table):
+    def run(after=None):
+        sql = RewritePipeline([
+            ProjectFields(["age"]),
+            KeysetPage("id", after=after),
+        ]).run(f"SELECT name, age FROM {records_table}")
+        return list(data_access_service.iter_query_batches(sql, batch_size=3, key_alias=KeysetPage.KEY_ALIAS))
+    
+    batches = run()
+    assert [len(rows) for rows, _ in batches] == [3, 3, 1]
+    assert batches[0] == ([{"age": 21}, {"age": 22}, {"age": 23}], 3)
+    
+    resumed = run(after=batches[0][1])
+    assert resumed[0][0][0] == {"age": 24}
+
+
+def test_encode_ndjson_emits_checkpoints_and_trailer():
+    chunks = list(data_access_service.encode_ndjson([
+        ([{"age": 21}, {"age": 22}], "c1"),
+        ([{"age": 23}], None),
+    ]))
+    lines = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    
+    assert lines == [
+        {"age": 21},
+        {"age": 22},
+        {"_checkpoint": "c1"},
+        {"age": 23},
+        {"_done": True, "record_count": 3},
+    ]
@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from app.utils.token_store import TokenStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def store():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    try:
+        await client.eval("return 1", 0)
+    except Exception:
+        pytest.skip("fakeredis without Lua support")
+    return TokenStore(client=client, ttl_seconds=300, verify_cache_size=0)
+
+
+async def test_store_and_verify(store):
+    assert await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    metadata = await store.verify_token("t1")
+    assert metadata["subject_id"] == "p1"
+    assert metadata["status"] == "active"
+    assert await store.verify_token("unknown") is None
+
+
+async def test_revoke_by_purpose_only_touches_matching_tokens(store):
+    await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    await store.store_token("t2", "p1", "TREATMENT", ["age"], "r2")
+
+    assert await store.revoke_by_purpose("p1", "RESEARCH") == 1
+    assert await store.verify_token("t1") is None
+    assert await store.verify_token("t2") is not None
+    assert await store.get_token_count("p1") == 1
+
+
+async def test_revoke_by_subject_keeps_ttl(store):
+    for i in range(5):
+        await store.store_token(f"t{i}", "p1", "RESEARCH", ["age"], f"r{i}")
+
+    assert await store.revoke_by_subject("p1") == 5
+    for i in range(5):
+        assert await store.verify_token(f"t{i}") is None
+    assert await store.get_token_count("p1") == 0
+    assert 0 < await store.redis_client.ttl(f"token:{store._hash_token('t0')}") <= 300
+
+
+async def test_revoke_single_token(store):
+    await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    assert await store.revoke_token("t1")
+    assert await store.verify_token("t1") is None
+    assert not await store.revoke_token("missing")
+
+
+async def test_tokens_issued_after_revocation_are_valid(store):
+    await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    await store.revoke_by_subject("p1")
+
+    assert await store.current_epochs("p1", "RESEARCH") == [1, 0]
+    await store.store_token("t2", "p1", "RESEARCH", ["age"], "r2")
+    assert await store.verify_token("t1") is None
+    assert (await store.verify_token("t2"))["epochs"] == [1, 0]
+    assert await store.get_token_count("p1") == 1
+
+
+async def test_revocation_reaches_group_tokens(store):
+    await store.store_group_token("g1", ["p1", "p2"], "RESEARCH", ["age"], "r1", "grp1")
+    await store.store_group_token("g2", ["p1"], "TREATMENT", ["age"], "r2", "grp2")
+
+    assert await store.revoke_by_purpose("p2", "RESEARCH") == 1
+    assert await store.verify_token("g1") is None
+    assert await store.verify_token("g2") is not None
+    # Counts every token indexed for p1, including the already revoked g1
+    assert await store.revoke_by_subject("p1") == 2
+    assert await store.verify_token("g2") is None
+
+
+async def _wait_for(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not await condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    return await condition()
+
+
+async def test_verify_cache_is_evicted_by_published_revocations(store):
+    worker = TokenStore(client=store.redis_client, ttl_seconds=300, verify_cache_size=100)
+    worker.start_revocation_listener()
+
+    async def subscribed():
+        return worker.get_verify_cache_stats()["enabled"]
+
+    async def revoked():
+        return await worker.verify_token("t1") is None
+
+    try:
+        assert await _wait_for(subscribed)
+        await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+        assert await worker.verify_token("t1") is not None
+        assert await worker.verify_token("t1") is not None
+        assert worker.get_verify_cache_stats()["hits"] == 1
+
+        # Revoked through another store instance (another worker)
+        await store.revoke_by_subject("p1")
+        assert await _wait_for(revoked)
+    finally:
+        await worker.stop_revocation_listener()
+    assert not worker.get_verify_cache_stats()["enabled"]
+
+
+async def test_fakeredis_url_mode():
+    store = TokenStore(url="fakeredis://", ttl_seconds=300, verify_cache_size=0)
+    try:
+        await store.redis_client.eval("return 1", 0)
+    except Exception:
+        pytest.skip("fakeredis without Lua support")
+
+    assert await store.health_check()
+    assert await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    assert await store.verify_token("t1") is not None
+    await store.close()
+
+
+async def test_metadata_is_a_hash_and_purpose_counts_are_scoped(store):
+    await store.store_token("t1", "p1", "RESEARCH", ["age", "sex"], "r1")
+    await store.store_token("t2", "p1", "TREATMENT", ["age"], "r2")
+    await store.store_group_token("g1", ["p1", "p2"], "RESEARCH", ["age"], "r3", "grp1")
+
+    key = f"token:{store._hash_token('t1')}"
+    assert await store.redis_client.type(key) == "hash"
+    assert (await store.verify_token("t1"))["allowed_fields"] == ["age", "sex"]
+    assert (await store.verify_token("g1"))["subject_count"] == 2
+
+    assert await store.get_token_count("p1") == 3
+    assert await store.get_token_count("p1", "RESEARCH") == 2
+    assert await store.revoke_token("t1")
+    assert await store.redis_client.hget(key, "status") == "revoked"
+    assert await store.get_token_count("p1", "RESEARCH") == 1
+
+
+async def test_subject_revocation_does_not_touch_token_records(store):
+    await store.store_token("t1", "p1", "RESEARCH", ["age"], "r1")
+    await store.store_group_token("g1", ["p2", "p1"], "RESEARCH", ["age"], "r2", "grp1")
+    await store.store_group_token("g2", ["p2"], "RESEARCH", ["age"], "r3", "grp2")
+
+    await store.revoke_by_subject("p1")
+    for token in ("t1", "g1"):
+        key = f"token:{store._hash_token(token)}"
+        assert await store.redis_client.hget(key, "status") == "active"
+        assert await store.verify_token(token) is None
+    assert await store.verify_token("g2") is not None
+
+
+async def test_purpose_revocation_does_not_touch_token_records(store):
+    await store.store_group_token("g1", ["p1", "p2"], "RESEARCH", ["age"], "r1", "grp1")
+    await store.store_group_token("g2", ["p1"], "TREATMENT", ["age"], "r2", "grp2")
+
+    assert await store.revoke_by_purpose("p2", "RESEARCH") == 1
+    key = f"token:{store._hash_token('g1')}"
+    assert await store.redis_client.hget(key, "status") == "active"
+    assert await store.verify_token("g1") is None
+    assert await store.verify_token("g2") is not None
@@ -33,9 +33,24 @@ CREATE TABLE IF NOT EXISTS consent_versions (
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_consents_patient ON consents(patient_id);
 CREATE INDEX IF NOT EXISTS idx_consents_status ON consents(status);
+CREATE INDEX IF NOT EXISTS idx_consents_updated ON consents(updated_at, id);
 CREATE INDEX IF NOT EXISTS idx_consent_versions_consent ON consent_versions(consent_id);
 CREATE INDEX IF NOT EXISTS idx_consent_versions_version ON consent_versions(consent_id, version_number);
 
+-- Keep consents.updated_at current for updates made outside the ORM
+-- (researcher-service replicates revocations by tailing it)
+CREATE OR REPLACE FUNCTION consents_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS consents_touch_updated_at ON consents;
+CREATE TRIGGER consents_touch_updated_at
+    BEFORE UPDATE ON consents
+    FOR EACH ROW EXECUTE FUNCTION consents_touch_updated_at();
+
 -- Display created tables
 SELECT 
     tablename,
@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS consents (
         status IN ('active', 'revoked', 'expired')
     ),
     confidence_score NUMERIC(3,2),
-    created_at TIMESTAMP DEFAULT now()
+    created_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP DEFAULT now()
 );
 
 -- 3. Consent Versions (Legal/Historical)
@@ -110,6 +111,7 @@ CREATE TABLE IF NOT EXISTS audit_logs (
 
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_consents_patient ON consents(patient_id);
+CREATE INDEX IF NOT EXISTS idx_consents_updated ON consents(updated_at, id);
 CREATE INDEX IF NOT EXISTS idx_policy_purpose ON policy_rules(purpose);
 CREATE INDEX IF NOT EXISTS idx_requests_study ON data_access_requests(study_id);
 CREATE INDEX IF NOT EXISTS idx_audit_actor ON audit_logs(actor_id);